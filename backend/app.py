@@ -3,23 +3,45 @@ Main Flask application
 """
 
 import logging
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request
 from datetime import datetime, timezone
 from flask_cors import CORS
 from pathlib import Path
 import os
-import json
+import random
+import threading
+import time
+from collections import deque
+from queue import Queue
+from multiprocessing import parent_process
+
+import numpy as np
 
 # Minimal single-file backend: only depends on itinerary_planner.py
 from typing import Any, Dict, List, Tuple
 from itinerary_planner import (
+    SolverStats,
     TourPlanningProblem,
-    a_star_search,
-    csp_constructive_plan,
-    create_initial_state,
-    load_attractions,
     find_hotels_for_itinerary
 )
+from catalog import HotelIndex
+from data_store import DataStore
+from record_index import paginate
+from solver_pool import (
+    DEADLINE_ALGORITHMS,
+    SOLVER_BATCH_MAX,
+    PoolBusy,
+    SolveTimeout,
+    build_problem,
+    get_pool,
+    pool_stats,
+    rebase_problem,
+    solve_batch,
+    solve_plan,
+)
+from result_cache import ResultCache, cache_key, canonicalize_spec, seed_for, shared_key
+from encoded_response import EncodedBody
+from metrics import COUNT_BUCKETS, REGISTRY, SIZE_BUCKETS
 
 # Configure logging
 logging.basicConfig(
@@ -29,22 +51,117 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 BASE_DIR = Path(__file__).resolve().parent
-DATA_DIR = (BASE_DIR / ".." / "Data").resolve()
 
-def load_json(filename: str, default=None):
-    path = DATA_DIR / filename
-    if not path.exists():
-        return default if default is not None else []
-    with path.open("r", encoding="utf-8") as f:
-        return json.load(f)
+# Candidate locations, first existing file wins
+ATTRACTIONS_PATHS = [
+    BASE_DIR / 'attractions.json',
+    BASE_DIR / 'data' / 'attractions.json',
+    BASE_DIR / 'Data' / 'attractions.json',
+    BASE_DIR / '..' / 'Data' / 'attractions.json',
+    Path.cwd() / 'backend' / 'attractions.json',
+    Path.cwd() / 'backend' / 'data' / 'attractions.json',
+    Path.cwd() / 'backend' / 'Data' / 'attractions.json',
+    Path.cwd() / 'Data' / 'attractions.json',
+]
+HOTELS_PATHS = [
+    BASE_DIR / 'hotels.json',
+    BASE_DIR / 'data' / 'hotels.json',
+    BASE_DIR / 'Data' / 'hotels.json',
+    BASE_DIR / '..' / 'Data' / 'cleaned_hotels.json',
+    Path.cwd() / 'Data' / 'cleaned_hotels.json',
+    Path.cwd() / 'backend' / 'hotels.json',
+    Path.cwd() / 'backend' / 'data' / 'hotels.json',
+    Path.cwd() / 'backend' / 'Data' / 'cleaned_hotels.json',
+]
+
+# Compiled binary catalog (compiled_catalog.py), mapped instead of parsing the JSON while it is up to date
+CATALOG_PATHS = [Path(os.environ['CATALOG_PATH'])] if os.environ.get('CATALOG_PATH') else [
+    BASE_DIR / 'catalog.bin',
+    BASE_DIR / 'data' / 'catalog.bin',
+    BASE_DIR / 'Data' / 'catalog.bin',
+    BASE_DIR / '..' / 'Data' / 'catalog.bin',
+    Path.cwd() / 'Data' / 'catalog.bin',
+]
+
+# Both datasets, loaded once per file change and shared by all requests of this process
+DATA_STORE = DataStore([str(p) for p in ATTRACTIONS_PATHS], [str(p) for p in HOTELS_PATHS],
+                       catalog_paths=[str(p) for p in CATALOG_PATHS])
+
+# Solved plans keyed on the canonical request, shared by all requests of this process
+RESULT_CACHE = ResultCache()
+
+# Encoded catalog responses, keyed on endpoint + query string, dropped on data reload
+RESPONSE_CACHE = ResultCache(maxsize=int(os.environ.get('RESPONSE_CACHE_SIZE', 512)), ttl=float('inf'))
+CATALOG_MAX_AGE_SEC = int(os.environ.get('CATALOG_MAX_AGE_SEC', 60))
+
+# Default time budget of "anneal" solves, which always run to it
+ANNEAL_TIME_LIMIT_SEC = float(os.environ.get('ANNEAL_TIME_LIMIT_SEC', 2.0))
+
+# Solver instrumentation, aggregated over every solve of this process and served at /api/metrics
+SOLVE_SECONDS = REGISTRY.histogram(
+    'itinerary_solve_seconds', 'Wall time of itinerary solves, result cache lookups included',
+    ['algorithm', 'outcome'])
+SOLVER_PHASE_SECONDS = REGISTRY.histogram(
+    'itinerary_solver_phase_seconds', 'Time spent per solver phase in one solve', ['phase'])
+SOLVER_COUNTS = REGISTRY.histogram(
+    'itinerary_solver_counts', 'Per-solve solver counters: nodes expanded, peak frontier, backtracks, ...',
+    ['counter'], COUNT_BUCKETS)
+SOLVER_EVENTS = REGISTRY.counter(
+    'itinerary_solver_events_total', 'Solver events: domain cache hits, CSP to A* fallbacks, ...', ['event'])
+SOLVER_POOL = REGISTRY.gauge('itinerary_solver_pool', 'Solver worker pool state at scrape time', ['state'])
+
+
+# HTTP instrumentation, per route template, recorded by the request hooks of create_app()
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    'http_request_duration_seconds', 'Request latency until the last byte of the body', ['route', 'group'])
+HTTP_REQUESTS = REGISTRY.counter('http_requests_total', 'Requests served', ['route', 'method', 'status'])
+HTTP_RESPONSE_BYTES = REGISTRY.histogram(
+    'http_response_size_bytes', 'Response body size as sent (after compression)', ['route'], SIZE_BUCKETS)
+HTTP_IN_FLIGHT = REGISTRY.gauge('http_requests_in_flight', 'Requests being served', ['group'])
+HTTP_SLOW_REQUESTS = REGISTRY.counter(
+    'http_slow_requests_total', 'Requests over the slow-request threshold of their group', ['route'])
+
+# Itinerary generation gets its own latency objectives, separate from the catalog endpoints
+PLANNER_ROUTE_PREFIX = '/api/itinerary/generate'
+OPS_ROUTES = {'/health', '/api/health', '/metrics', '/api/metrics', '/api/metrics/slow'}
+# Latency (ms) above which a request counts as slow, per route group
+SLOW_REQUEST_MS = {
+    'planner': float(os.environ.get('SLOW_PLANNER_REQUEST_MS', 5000)),
+    'catalog': float(os.environ.get('SLOW_REQUEST_MS', 250)),
+    'ops': float(os.environ.get('SLOW_REQUEST_MS', 250)),
+}
+# Share of slow requests that are logged with their parameters and kept in SLOW_REQUESTS
+SLOW_REQUEST_SAMPLE_RATE = float(os.environ.get('SLOW_REQUEST_SAMPLE_RATE', 0.2))
+SLOW_REQUESTS = deque(maxlen=int(os.environ.get('SLOW_REQUEST_LOG_SIZE', 100)))
+
+
+def route_group(rule: str) -> str:
+    """'planner', 'ops' or 'catalog' for a route template."""
+    if rule.startswith(PLANNER_ROUTE_PREFIX):
+        return 'planner'
+    return 'ops' if rule in OPS_ROUTES else 'catalog'
+
+
+def record_solver_stats(stats: SolverStats) -> None:
+    """Add one solve's (or hotel selection's) stats to the solver metrics."""
+    for phase, seconds in stats.timings.items():
+        SOLVER_PHASE_SECONDS.observe(seconds, phase=phase)
+    for name, n in stats.counts.items():
+        SOLVER_COUNTS.observe(n, counter=name)
+    for name, n in stats.events.items():
+        SOLVER_EVENTS.inc(n, event=name)
 
-ATTRACTIONS = load_json("attractions.json", default=[])
-HOTELS = load_json("cleaned_hotels.json", default=[])
 
 def load_data():
-    """Optional no-op loader to satisfy run_server.py imports.
-    Data files are read on-demand by endpoints.
     """
+    Load the datasets and pre-warm the solver worker pool for them.
+
+    Raises CatalogTooLarge when the attractions' distance matrix would
+    exceed MAX_DISTANCE_MATRIX_MB.
+    """
+    DATA_STORE.start_watcher()
+    if DATA_STORE.snapshot.attractions:
+        get_pool(DATA_STORE.snapshot.catalog)
     return True
 
 def create_app():
@@ -55,150 +172,92 @@ def create_app():
     FRONTEND_ORIGIN = os.environ.get("FRONTEND_ORIGIN", "*")
     CORS(app, resources={r"/api/*": {"origins": FRONTEND_ORIGIN}})
 
+    # Spawned solver workers import this module too; only the server process watches the files
+    if parent_process() is None:
+        DATA_STORE.start_watcher()
+
+    # -------- Request instrumentation --------
+    def _request_params() -> Dict[str, Any]:
+        """The canonical parameters of the current request, for the slow-request log."""
+        canonical = g.get('canonical_request')
+        if canonical is not None:
+            return canonical
+        params = {k: v[0] if len(v) == 1 else v for k, v in sorted(request.args.lists())}
+        body = request.get_json(silent=True) if request.is_json else None
+        if isinstance(body, dict):
+            params.update(body)
+        return params
+
+    def _streamed(body, finish):
+        """Pass a streamed body through, then record the request once it is sent or abandoned."""
+        sent = 0
+        try:
+            for chunk in body:
+                sent += len(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+                yield chunk
+        finally:
+            close = getattr(body, 'close', None)
+            if close is not None:
+                close()
+            finish(sent)
+
+    @app.before_request
+    def _start_request():
+        rule = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        g.timing = (time.perf_counter(), rule, route_group(rule))
+        HTTP_IN_FLIGHT.inc(group=g.timing[2])
+
+    @app.after_request
+    def _record_request(response: Response) -> Response:
+        timing = g.pop('timing', None)
+        if timing is None:
+            return response
+        started, rule, group = timing
+        method, status = request.method, response.status_code
+        # streamed bodies finish after the request context is gone
+        params = _request_params() if response.is_streamed else None
+
+        def finish(size):
+            elapsed = time.perf_counter() - started
+            HTTP_IN_FLIGHT.dec(group=group)
+            HTTP_REQUEST_SECONDS.observe(elapsed, route=rule, group=group)
+            HTTP_REQUESTS.inc(route=rule, method=method, status=str(status))
+            HTTP_RESPONSE_BYTES.observe(size, route=rule)
+            if elapsed * 1000 <= SLOW_REQUEST_MS[group]:
+                return
+            HTTP_SLOW_REQUESTS.inc(route=rule)
+            if random.random() < SLOW_REQUEST_SAMPLE_RATE:
+                entry = {
+                    'timestamp': datetime.now(timezone.utc).isoformat(),
+                    'route': rule,
+                    'method': method,
+                    'status': status,
+                    'durationMs': round(elapsed * 1000, 1),
+                    'bytes': size,
+                    'params': params if params is not None else _request_params(),
+                }
+                SLOW_REQUESTS.appendleft(entry)
+                logger.warning('Slow request: %s', app.json.dumps(entry))
+
+        if response.is_streamed:
+            response.response = _streamed(response.response, finish)
+        else:
+            finish(response.calculate_content_length() or 0)
+        return response
+
     # -------- Helpers (inline) --------
     def _parse_location(loc_str: str) -> Tuple[float, float]:
-        """Accepts 'lat,lon' or city names and returns coordinates"""
-        try:
-            # Check if it's GPS coordinates (lat,lon format)
-            if ',' in loc_str and not any(char.isalpha() for char in loc_str):
-                lat_s, lon_s = loc_str.split(',', 1)
-                lat = float(lat_s.strip())
-                lon = float(lon_s.strip())
-                # Validate coordinate ranges
-                if -90 <= lat <= 90 and -180 <= lon <= 180:
-                    return lat, lon
-        except Exception:
-            pass
-        
-        # City name mapping (major Algerian cities)
-        city_coordinates = {
-            'algiers': (36.737232, 3.086472),
-            'alger': (36.737232, 3.086472),
-            'oran': (35.696944, -0.633056),
-            'constantine': (36.365, 6.614722),
-            'annaba': (36.9, 7.766667),
-            'tlemcen': (34.886667, -1.315278),
-            'ghardaia': (32.483333, 3.666667),
-            'setif': (36.19, 5.41),
-            'blida': (36.47, 2.83),
-            'batna': (35.55, 6.17),
-            'bechar': (31.62, -2.22),
-            'djelfa': (34.67, 3.25),
-            'sidi bel abbes': (35.2, -0.63),
-            'biskra': (34.85, 5.73),
-            'tiaret': (35.37, 1.32),
-            'el oued': (33.37, 6.87),
-            'skikda': (36.87, 6.91),
-            'jijel': (36.82, 5.77),
-            'mostaganem': (35.94, 0.09),
-            'm\'sila': (35.7, 4.54),
-            'boumerdes': (36.76, 3.47),
-            'tipaza': (36.59, 2.45),
-            'medea': (36.26, 2.75),
-            'bouira': (36.37, 3.9),
-            'tizi ouzou': (36.72, 4.05),
-            'bejaia': (36.75, 5.08),
-            'bouira': (36.37, 3.9),
-            'laghouat': (33.8, 2.87),
-            'ouargla': (31.95, 5.33),
-            'tamanrasset': (22.79, 5.53),
-            'adrar': (27.87, -0.29),
-            'el bayadh': (33.68, 1.02),
-            'illizi': (26.5, 8.47),
-            'bordj bou arreridj': (36.07, 4.76),
-            'boumerdes': (36.76, 3.47),
-            'el tarf': (36.77, 8.31),
-            'tindouf': (27.67, -8.15),
-            'tissemsilt': (35.61, 1.81),
-            'el oued': (33.37, 6.87),
-            'khenchela': (35.43, 7.14),
-            'souk ahras': (36.28, 7.95),
-            'mila': (36.45, 6.26),
-            'ain defla': (36.26, 1.97),
-            'naama': (33.27, -0.32),
-            'ain temouchent': (35.31, -1.14),
-            'guelma': (36.46, 7.43),
-            'relizane': (35.74, 0.56),
-            'el m\'ghair': (33.95, 5.92),
-            'el meniaa': (30.5, 2.88),
-            'ouled djellal': (34.42, 5.07),
-            'bordj badji mokhtar': (21.32, 0.95),
-            'beni abbes': (30.13, -2.17),
-            'timimoun': (29.26, 0.23),
-            'touggourt': (33.1, 6.06),
-            'djanet': (24.55, 9.48),
-            'in guezzam': (19.57, 5.77),
-            'in salah': (27.21, 2.46)
-        }
-        
-        # Try to match city name (case insensitive)
-        loc_lower = loc_str.lower().strip()
-        
-        # Remove common suffixes
-        for suffix in [', algeria', ', dz', ' wilaya', ' province']:
-            if loc_lower.endswith(suffix):
-                loc_lower = loc_lower[:-len(suffix)].strip()
-        
-        # Direct match
-        if loc_lower in city_coordinates:
-            return city_coordinates[loc_lower]
-        
-        # Partial match (for cases like "Algiers, Algeria")
-        for city, coords in city_coordinates.items():
-            if city in loc_lower or loc_lower in city:
-                return coords
-        
-        # Default to Algiers if no match found
-        logger.warning(f"Location '{loc_str}' not recognized, defaulting to Algiers")
-        return 36.737232, 3.086472
-
-    def _get_attractions(limit: int | None = None) -> List[Dict[str, Any]]:
-        # Try common locations for attractions.json
-        candidates = [
-            os.path.join(os.path.dirname(__file__), 'attractions.json'),
-            os.path.join(os.path.dirname(__file__), 'data', 'attractions.json'),
-            os.path.join(os.path.dirname(__file__), 'Data', 'attractions.json'),
-            os.path.join(os.path.dirname(__file__), '..', 'Data', 'attractions.json'),
-            os.path.join(os.getcwd(), 'backend', 'attractions.json'),
-            os.path.join(os.getcwd(), 'backend', 'data', 'attractions.json'),
-            os.path.join(os.getcwd(), 'backend', 'Data', 'attractions.json'),
-            os.path.join(os.getcwd(), 'Data', 'attractions.json'),
-        ]
-        data: List[Dict[str, Any]] = []
-        for path in candidates:
-            if os.path.exists(path):
-                try:
-                    data = load_attractions(path)
-                    break
-                except Exception:
-                    continue
-        # If still empty, return []
-        if limit and data:
-            return data[:limit]
-        return data
-
-    def _get_hotels() -> List[Dict[str, Any]]:
-        # Try common locations for cleaned_hotels.json
-        candidates = [
-            os.path.join(os.path.dirname(__file__), 'hotels.json'),
-            os.path.join(os.path.dirname(__file__), 'data', 'hotels.json'),
-            os.path.join(os.path.dirname(__file__), 'Data', 'hotels.json'),
-            os.path.join(os.path.dirname(__file__), '..', 'Data', 'cleaned_hotels.json'),
-            os.path.join(os.getcwd(), 'Data', 'cleaned_hotels.json'),
-            os.path.join(os.getcwd(), 'backend', 'hotels.json'),
-            os.path.join(os.getcwd(), 'backend', 'data', 'hotels.json'),
-            os.path.join(os.getcwd(), 'backend', 'Data', 'cleaned_hotels.json'),
-        ]
-        data: List[Dict[str, Any]] = []
-        for path in candidates:
-            if os.path.exists(path):
-                try:
-                    with open(path, encoding='utf-8') as f:
-                        data = json.load(f)
-                    break
-                except Exception:
-                    continue
-        return data
+        """
+        Accepts 'lat,lon' or a place name and returns coordinates
+
+        Raises:
+            ValueError: The name matches no known place closely enough.
+        """
+        result = DATA_STORE.snapshot.gazetteer.lookup(loc_str)
+        if result.coordinates is None:
+            hint = ', '.join(c.name for c in result.candidates[:3])
+            raise ValueError(f"Location '{loc_str}' not recognized" + (f" (did you mean: {hint}?)" if hint else ""))
+        return result.coordinates
 
     def _build_constraints(req: Dict[str, Any]) -> Dict[str, Any]:
         return {
@@ -214,36 +273,38 @@ def create_app():
                          problem: TourPlanningProblem,
                          wilaya: str,
                          activities: List[str],
-                         budget: float) -> Dict[str, Any]:
-        # Hotels suggestion is optional; try to load hotels.json if present
-        hotels_data: List[Dict[str, Any]] = []
-        hotels_candidates = [
-            os.path.join(os.path.dirname(__file__), 'hotels.json'),
-            os.path.join(os.path.dirname(__file__), 'data', 'hotels.json'),
-            os.path.join(os.path.dirname(__file__), 'Data', 'hotels.json'),
-            os.path.join(os.path.dirname(__file__), '..', 'Data', 'cleaned_hotels.json'),
-            os.path.join(os.getcwd(), 'Data', 'cleaned_hotels.json'),
-        ]
-        for hp in hotels_candidates:
-            if os.path.exists(hp):
-                try:
-                    with open(hp, encoding='utf-8') as hf:
-                        hotels_data = json.load(hf)
-                except Exception:
-                    pass
-                break
+                         budget: float,
+                         hotel_index: HotelIndex,
+                         stats: SolverStats = None) -> Dict[str, Any]:
+        hotels_by_day, total_hotel_cost = _plan_hotels(goal_node, problem, hotel_index, stats)
+        result = _format_summary(goal_node, problem, activities, budget, total_hotel_cost)
+        result['days'] = list(_format_days(goal_node, problem, wilaya, hotels_by_day))
+        return result
 
-        hotels_by_day, total_hotel_cost = find_hotels_for_itinerary(
+    def _plan_hotels(goal_node: Any, problem: TourPlanningProblem, hotel_index: HotelIndex,
+                     stats: SolverStats = None):
+        hotel_stats = SolverStats()
+        planned = find_hotels_for_itinerary(
             goal_node.state['itinerary'],
-            problem.attractions,
-            hotels_data,
+            problem.catalog,
+            hotel_index,
             problem.constraints['max_total_budget'],
             goal_node.state['total_cost'],
             problem.constraints.get('min_hotel_stars', 3),
             problem.constraints.get('max_hotel_stars', 5),
+            stats=hotel_stats,
         )
+        record_solver_stats(hotel_stats)
+        if stats is not None:
+            stats.merge(hotel_stats.to_dict())
+        return planned
 
-        result: Dict[str, Any] = {
+    def _format_summary(goal_node: Any,
+                        problem: TourPlanningProblem,
+                        activities: List[str],
+                        budget: float,
+                        total_hotel_cost: float) -> Dict[str, Any]:
+        return {
             'success': True,
             'title': 'Algeria Adventure: 7-Day Itinerary',
             'summary': f"A customized itinerary based on your preferences for {', '.join(activities)}.",
@@ -252,16 +313,22 @@ def create_app():
             'hotelCost': round(total_hotel_cost, 2),
             'remainingBudget': round(budget - goal_node.state['total_cost'] - total_hotel_cost, 2),
             'satisfaction': round(problem._calculate_satisfaction(goal_node.state), 2),
-            'days': []
+            # best-so-far result returned when the solver hit its time limit
+            'approximate': bool(goal_node.approximate),
         }
 
+    def _format_days(goal_node: Any,
+                     problem: TourPlanningProblem,
+                     wilaya: str,
+                     hotels_by_day: Dict[int, List[Dict[str, Any]]]):
+        """Yield the response entry of each day in order."""
         for day_idx, day_plan in enumerate(goal_node.state['itinerary'], start=1):
             day_entries = []
             total_day_cost = 0.0
 
-            for name in day_plan:
-                att = problem._att_by_name[name]
-                cost_val = problem._parse_cost(att.get('cost', '0'))
+            for att_id in day_plan:
+                att = problem.catalog.records[att_id]
+                cost_val = float(problem.catalog.ticket_dzd[att_id])
                 total_day_cost += cost_val
                 gps_coords = att.get('gps', [36.737232, 3.086472])
                 if isinstance(gps_coords, list) and len(gps_coords) >= 2:
@@ -299,7 +366,7 @@ def create_app():
                     'amenities': []
                 }
 
-            result['days'].append({
+            yield {
                 'day': day_idx,
                 'title': f'Day {day_idx}: Adventure Day',
                 'location': wilaya,
@@ -317,112 +384,473 @@ def create_app():
                     'coordinates': entry['gps']
                 } for i, entry in enumerate(day_entries)],
                 'accommodation': accommodation
-            })
+            }
 
-        return result
+    def _parse_generate_request(data: Dict[str, Any]):
+        """
+        Validate an itinerary request and build its canonical solver spec.
 
-    # -------- API endpoints (simplified) --------
-    @app.post('/api/itinerary/generate')
-    def generate_itinerary():
-        try:
-            data = request.get_json()
-            if not data:
-                return jsonify({"success": False, "error": "No JSON data provided"}), 400
+        Returns:
+            (spec, cache key, wilaya, activities, budget)
 
-            required = ['wilaya', 'location', 'activities', 'budget']
-            missing = [k for k in required if not data.get(k)]
-            if missing:
-                return jsonify({"success": False, "error": f"Missing required fields: {', '.join(missing)}"}), 400
+        Raises:
+            ValueError: Missing or malformed fields.
+        """
+        required = ['wilaya', 'location', 'activities', 'budget']
+        missing = [k for k in required if not data.get(k)]
+        if missing:
+            raise ValueError(f"Missing required fields: {', '.join(missing)}")
 
-            wilaya = str(data['wilaya'])
-            activities = list(data.get('activities') or [])
-            budget = float(data.get('budget', 0))
+        wilaya = str(data['wilaya'])
+        activities = list(data.get('activities') or [])
+        budget = float(data.get('budget', 0))
+        algorithm = str(data.get('algorithm', 'csp')).lower()
 
-            start_location = _parse_location(str(data.get('location', '')))
-            user_prefs = {
+        # Plain-data description of the solve, so it can be shipped to a worker process
+        spec = {
+            'start_location': _parse_location(str(data.get('location', ''))),
+            'user_prefs': {
                 'categories': activities,
                 'hotel_stars': (
                     int(data.get('minHotelStars', 3)),
                     int(data.get('maxHotelStars', 5))
                 )
-            }
-            constraints = _build_constraints(data)
+            },
+            'constraints': _build_constraints(data),
+            'activities': activities,
+            'algorithm': algorithm,
+            'time_limit': float(data.get('cspTimeLimitSec',
+                                         ANNEAL_TIME_LIMIT_SEC if algorithm == 'anneal' else 10.0)),
+            'beam_width': max(1, int(data.get('beamWidth', 64))),
+            'max_nodes': max(1, int(data.get('maxNodes', 20000))),
+            'max_iterations': max(1, int(data['maxIterations'])) if data.get('maxIterations') else None,
+        }
 
-            all_attractions = _get_attractions()
-            # Filter by wilaya/city if field exists
-            attractions = [a for a in all_attractions if not activities or a.get('category') in activities]
+        # Equivalent requests share one canonical spec and cache entry; requests
+        # that only differ in start and budget share a sampling seed, and so a
+        # cached CSP domain template
+        spec = canonicalize_spec(spec)
+        key = cache_key(spec)
+        spec['seed'] = seed_for(shared_key(spec))
+        return spec, key, wilaya, activities, budget
 
-            initial_state = create_initial_state(start_location, user_prefs)
-            problem = TourPlanningProblem(initial_state, attractions, user_prefs, constraints)
+    BUSY_ERROR = 'The planner is busy right now. Please try again in a moment.'
+    TIMEOUT_ERROR = 'No itinerary could be found within the time limit. Try relaxing your requirements.'
+    INFEASIBLE_ERROR = 'No feasible itinerary found with the given constraints. Try relaxing your requirements.'
+    UNEXPECTED_ERROR = 'An unexpected error occurred while generating your itinerary. Please try again.'
 
-            algorithm = str(data.get('algorithm', 'csp')).lower()
-            time_limit = float(data.get('cspTimeLimitSec', 10.0))
+    def _solve(spec: Dict[str, Any], key, problem: TourPlanningProblem,
+               cancel=None, on_progress=None, stats: SolverStats = None) -> Tuple[Any, str | None, int]:
+        """
+        Solve (or fetch from the result cache) one itinerary request.
+
+        The solver's timings and counters go to the solver metrics and, when
+        given, to `stats`.
+
+        Returns:
+            (goal_node, None, 200) on success, else (None, error message, HTTP status).
+        """
+        catalog = problem.catalog
+        stats = stats if stats is not None else SolverStats()
+        started = time.monotonic()
+        goal_node, killed = None, False
+        outcome = 'error'  # unless the solve gets to a verdict
+        try:
+            try:
+                goal_node = RESULT_CACHE.get(key, catalog.version)
+                if goal_node is not None:
+                    stats.event('result_cache.hit')
+                    outcome = 'cached'
+                    return goal_node, None, 200
+                goal_node = solve_plan(catalog, spec, problem, cancel=cancel, on_progress=on_progress, stats=stats)
+                # approximate plans depend on timing, so only complete ones are reused
+                if goal_node is not None and not goal_node.approximate:
+                    RESULT_CACHE.put(key, goal_node, catalog.version)
+            except PoolBusy:
+                logger.warning('Solver queue full, rejecting itinerary request')
+                outcome = 'busy'
+                return None, BUSY_ERROR, 503
+            except SolveTimeout:
+                killed = True
 
-            goal_node = None
-            if algorithm == 'csp':
-                try:
-                    goal_node = csp_constructive_plan(problem, time_limit_sec=time_limit)
-                    if goal_node is None:
-                        logger.info('CSP failed to find solution, falling back to A*')
-                except Exception:
-                    logger.exception('CSP failed with exception; falling back to A*')
-            
-            # Fallback to A* if CSP didn't produce a result
             if goal_node is None:
-                logger.info('Using A* search as fallback')
-                goal_node = a_star_search(problem)
+                timed_out = killed or (spec['algorithm'] in DEADLINE_ALGORITHMS
+                                       and time.monotonic() - started >= spec['time_limit'])
+                outcome = 'timeout' if timed_out else 'infeasible'
+                return None, TIMEOUT_ERROR if timed_out else INFEASIBLE_ERROR, 400
+            outcome = 'approximate' if goal_node.approximate else 'solved'
+            return goal_node, None, 200
+        finally:
+            elapsed = time.monotonic() - started
+            stats.add_time('solve', elapsed)
+            SOLVE_SECONDS.observe(elapsed, algorithm=spec['algorithm'], outcome=outcome)
+            record_solver_stats(stats)
 
+    # -------- API endpoints (simplified) --------
+    @app.post('/api/itinerary/generate')
+    def generate_itinerary():
+        try:
+            data = request.get_json()
+            if not data:
+                return jsonify({"success": False, "error": "No JSON data provided"}), 400
+
+            spec, key, wilaya, activities, budget = _parse_generate_request(data)
+            g.canonical_request = spec
+
+            # One snapshot for the whole request, so catalog and hotels stay consistent
+            snapshot = DATA_STORE.snapshot
+            problem = build_problem(snapshot.catalog, spec)
+
+            # opt-in solver internals; never part of the cache key
+            stats = SolverStats() if data.get('debug') else None
+            goal_node, error, status = _solve(spec, key, problem, stats=stats)
             if goal_node is None:
-                return jsonify({
-                    'success': False,
-                    'error': 'No feasible itinerary found with the given constraints. Try relaxing your requirements.'
-                }), 400
+                body = {'success': False, 'error': error}
+                if stats is not None:
+                    body['debug'] = stats.to_dict()
+                return jsonify(body), status
 
-            return jsonify({"data": _format_response(goal_node, problem, wilaya, activities, budget)})
+            body = {"data": _format_response(goal_node, problem, wilaya, activities, budget,
+                                             snapshot.hotel_index, stats)}
+            if stats is not None:
+                body["debug"] = stats.to_dict()
+            return jsonify(body)
         except ValueError as e:
             return jsonify({"success": False, "error": str(e)}), 400
         except Exception:
             logger.exception("Unexpected error in itinerary generation")
-            return jsonify({"success": False, "error": "An unexpected error occurred while generating your itinerary. Please try again."}), 500
+            return jsonify({"success": False, "error": UNEXPECTED_ERROR}), 500
+
+    @app.post('/api/itinerary/generate-batch')
+    def generate_itinerary_batch():
+        """
+        Generate several itineraries in one call.
+
+        Items are validated and looked up in the result cache one by one;
+        the rest are grouped by everything but start location and budget
+        (`shared_key`), so each group builds its planning problem and CSP
+        domain once. Groups are solved in parallel in the worker pool.
+        Every item gets its own result or error, in request order.
+        """
+        try:
+            data = request.get_json(silent=True)
+            items = data.get('requests') if isinstance(data, dict) else None
+            if not isinstance(items, list) or not items:
+                return jsonify({"success": False, "error": "A non-empty 'requests' list is required"}), 400
+            if len(items) > SOLVER_BATCH_MAX:
+                return jsonify({"success": False, "error": f"At most {SOLVER_BATCH_MAX} requests per batch"}), 400
+
+            snapshot = DATA_STORE.snapshot
+            catalog = snapshot.catalog
+            results: List[Dict[str, Any] | None] = [None] * len(items)
+            parsed = {}
+            # shared key -> cache key -> indices of the items asking for that plan
+            groups: Dict[Any, Dict[Any, List[int]]] = {}
+            for i, item in enumerate(items):
+                try:
+                    if not isinstance(item, dict) or not item:
+                        raise ValueError("No JSON data provided")
+                    parsed[i] = _parse_generate_request(item)
+                except ValueError as e:
+                    results[i] = {"success": False, "error": str(e), "status": 400}
+                    continue
+                spec, key = parsed[i][:2]
+                groups.setdefault(shared_key(spec), {}).setdefault(key, []).append(i)
+            g.canonical_request = {'requests': [parsed[i][0] if i in parsed else None for i in range(len(items))]}
+
+            # one problem per group, rebased for the other start locations and budgets
+            problems = {}
+            goal_nodes = {}
+            to_solve = []
+            for members in groups.values():
+                base = None
+                pending = []
+                for key, indices in members.items():
+                    spec = parsed[indices[0]][0]
+                    if base is None:
+                        problem = base = build_problem(catalog, spec)
+                    else:
+                        problem = rebase_problem(base, spec)
+                    for i in indices:
+                        problems[i] = problem
+                    goal_node = RESULT_CACHE.get(key, catalog.version)
+                    if goal_node is not None:
+                        goal_nodes[key] = goal_node
+                    else:
+                        pending.append((key, spec, problem))
+                if pending:
+                    to_solve.append(pending)
+
+            outcomes = solve_batch(catalog,
+                                   [[spec for _, spec, _ in pending] for pending in to_solve],
+                                   [[problem for _, _, problem in pending] for pending in to_solve])
+            errors = {}
+            for pending, group_outcomes in zip(to_solve, outcomes):
+                for (key, spec, _), (goal_node, error) in zip(pending, group_outcomes):
+                    if goal_node is not None:
+                        goal_nodes[key] = goal_node
+                        if not goal_node.approximate:
+                            RESULT_CACHE.put(key, goal_node, catalog.version)
+                    elif isinstance(error, PoolBusy):
+                        errors[key] = (BUSY_ERROR, 503)
+                    elif isinstance(error, SolveTimeout):
+                        errors[key] = (TIMEOUT_ERROR, 400)
+                    elif error is not None:
+                        logger.error("Batch itinerary item failed: %s", error)
+                        errors[key] = (UNEXPECTED_ERROR, 500)
+                    else:
+                        errors[key] = (INFEASIBLE_ERROR, 400)
+
+            for i, (spec, key, wilaya, activities, budget) in parsed.items():
+                if key in goal_nodes:
+                    results[i] = {"success": True, "data": _format_response(
+                        goal_nodes[key], problems[i], wilaya, activities, budget, snapshot.hotel_index)}
+                else:
+                    error, status = errors[key]
+                    results[i] = {"success": False, "error": error, "status": status}
+
+            return jsonify({
+                "success": True,
+                "count": len(results),
+                "succeeded": sum(1 for r in results if r["success"]),
+                "groups": len(groups),
+                "results": results,
+            })
+        except Exception:
+            logger.exception("Unexpected error in batch itinerary generation")
+            return jsonify({"success": False, "error": UNEXPECTED_ERROR}), 500
+
+    @app.post('/api/itinerary/generate-stream')
+    def generate_itinerary_stream():
+        """
+        Streaming variant of /api/itinerary/generate.
+
+        Emits NDJSON lines (or Server-Sent Events with `?format=sse` or
+        `Accept: text/event-stream`): "progress" events while the solver
+        runs, one "day" event per day once the plan is final, then "done"
+        with the summary (or a single "error"). Closing the connection
+        cancels the solve.
+        """
+        try:
+            data = request.get_json(silent=True)
+            if not data:
+                return jsonify({"success": False, "error": "No JSON data provided"}), 400
+            spec, key, wilaya, activities, budget = _parse_generate_request(data)
+            g.canonical_request = spec
+            snapshot = DATA_STORE.snapshot
+            problem = build_problem(snapshot.catalog, spec)
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+
+        sse = (request.args.get('format') == 'sse'
+               or 'text/event-stream' in request.headers.get('Accept', ''))
+
+        def encode(event: str, payload: Dict[str, Any]) -> str:
+            body = app.json.dumps(dict(payload, event=event))
+            return f"event: {event}\ndata: {body}\n\n" if sse else body + "\n"
+
+        def events():
+            cancel = threading.Event()
+            queue: Queue = Queue()
+            stats = SolverStats() if data.get('debug') else None
+
+            def run():
+                try:
+                    outcome = _solve(spec, key, problem, cancel=cancel,
+                                     on_progress=lambda info: queue.put(('progress', info)), stats=stats)
+                except Exception:
+                    logger.exception("Unexpected error in streaming itinerary generation")
+                    outcome = (None, UNEXPECTED_ERROR, 500)
+                queue.put(('result', outcome))
+
+            threading.Thread(target=run, name='stream-solve', daemon=True).start()
+            try:
+                yield encode('accepted', {'algorithm': spec['algorithm']})
+                while True:
+                    kind, payload = queue.get()
+                    if kind != 'progress':
+                        break
+                    yield encode('progress', payload)
+
+                goal_node, error, status = payload
+                debug = {} if stats is None else {'debug': stats.to_dict()}
+                if goal_node is None:
+                    yield encode('error', {'success': False, 'error': error, 'status': status, **debug})
+                    return
+                hotels_by_day, total_hotel_cost = _plan_hotels(goal_node, problem, snapshot.hotel_index, stats)
+                for day in _format_days(goal_node, problem, wilaya, hotels_by_day):
+                    yield encode('day', {'day': day})
+                debug = {} if stats is None else {'debug': stats.to_dict()}
+                yield encode('done', {'data': _format_summary(goal_node, problem, activities, budget, total_hotel_cost),
+                                      **debug})
+            finally:
+                # runs on normal completion and when the client disconnects (GeneratorExit)
+                cancel.set()
+
+        return Response(events(), mimetype='text/event-stream' if sse else 'application/x-ndjson',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    def _cached_json(build) -> Response:
+        """
+        Serve `build(snapshot)` (a JSON-able dict) encoded once per data version.
+
+        Later hits reuse the stored bytes and precompressed variants;
+        `If-None-Match` with a current ETag is answered with 304.
+        """
+        snapshot = DATA_STORE.snapshot
+        key = (request.endpoint, tuple(sorted(request.args.items(multi=True))))
+        encoded = RESPONSE_CACHE.get(key, snapshot.version)
+        if encoded is None:
+            encoded = EncodedBody(app.json.dumps(build(snapshot)).encode('utf-8') + b'\n')
+            RESPONSE_CACHE.put(key, encoded, snapshot.version)
+
+        headers = {
+            'Cache-Control': f'public, max-age={CATALOG_MAX_AGE_SEC}',
+            'Vary': 'Accept-Encoding',
+        }
+        body, encoding = encoded.negotiate(request.accept_encodings)
+        # the 304 names the variant this client would get, like the 200 does
+        headers['ETag'] = f'"{encoded.etag(encoding)}"'
+        if encoded.matches(request.if_none_match):
+            return Response(status=304, headers=headers)
+
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        return Response(body, mimetype='application/json', headers=headers)
+
+    def _page_args(snapshot) -> Tuple[int | None, int, int | None]:
+        """
+        Read limit/offset/cursor; a cursor is '<data fingerprint>:<last id>' from a previous page.
+
+        The fingerprint comes from the dataset contents, not this process's
+        reload count, so any worker (or a restarted one) accepts a cursor
+        exactly when it serves the same data.
+        """
+        limit = request.args.get('limit', type=int)
+        offset = request.args.get('offset', default=0, type=int)
+        cursor = request.args.get('cursor')
+        after = None
+        if cursor:
+            try:
+                version, last_id = (int(part) for part in cursor.split(':', 1))
+            except ValueError:
+                raise ValueError("Invalid cursor")
+            if version != snapshot.fingerprint:
+                raise ValueError("Cursor is stale because the data was reloaded; start again from the first page")
+            after = last_id
+        return limit, offset, after
+
+    def _listing(snapshot, index, ids, key: str, facet_fields: Dict[str, str]) -> Dict[str, Any]:
+        limit, offset, after = _page_args(snapshot)
+        page, next_id = paginate(ids, limit=limit, offset=offset, after=after)
+        body = {
+            "success": True,
+            key: [index.records[i] for i in page],
+            "count": len(page),
+            "total": len(ids),
+            "offset": int(np.searchsorted(ids, after, side='right')) if after is not None else offset,
+            "nextCursor": f"{snapshot.fingerprint}:{next_id}" if next_id is not None else None,
+        }
+        if request.args.get('facets', '').lower() in ('1', 'true', 'yes'):
+            body["facets"] = {name: index.facet_counts(field, ids) for name, field in facet_fields.items()}
+        return body
 
     @app.get('/api/itinerary/attractions')
     @app.get('/api/attractions')
     def get_attractions():
-        try:
+        def build(snapshot):
             wilaya = request.args.get('wilaya')
             category = request.args.get('category')
-            limit = request.args.get('limit', type=int)
-            data = _get_attractions(limit=None)
+            index = snapshot.attraction_query
+            filters = []
             if wilaya:
-                data = [a for a in data if a.get('city') == wilaya or a.get('wilaya') == wilaya]
+                filters.append(np.union1d(index.ids_for('city', wilaya), index.ids_for('wilaya', wilaya)))
             if category:
-                data = [a for a in data if a.get('category') == category]
-            if isinstance(limit, int) and limit > 0:
-                data = data[:limit]
-            return jsonify({"success": True, "attractions": data, "count": len(data)})
+                filters.append(index.ids_for('category', category))
+            ids = index.intersect(filters, index.all_ids)
+            return _listing(snapshot, index, ids, "attractions", {"categories": "category", "wilayas": "city"})
+
+        try:
+            return _cached_json(build)
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
         except Exception:
             logger.exception("Error fetching attractions")
             return jsonify({"success": False, "error": "Failed to fetch attractions"}), 500
 
+    @app.get('/api/attractions/nearby')
+    def get_nearby_attractions():
+        """
+        Attractions within `radius_km` of (lat, lon), or its `limit` nearest, closest first.
+
+        Not kept in RESPONSE_CACHE: coordinates are free-form floats, so
+        nearly every query is distinct and would only evict the listings.
+        """
+        def build(snapshot):
+            lat = request.args.get('lat', type=float)
+            lon = request.args.get('lon', type=float)
+            if lat is None or lon is None or not (-90 <= lat <= 90 and -180 <= lon <= 180):
+                raise ValueError("Valid 'lat' and 'lon' query parameters are required")
+            radius_km = request.args.get('radius_km', type=float)
+            limit = request.args.get('limit', type=int)
+            if radius_km is not None and radius_km < 0:
+                raise ValueError("'radius_km' must not be negative")
+            if limit is not None and limit < 1:
+                raise ValueError("'limit' must be positive")
+            if radius_km is None and limit is None:
+                radius_km = 10.0
+
+            catalog = snapshot.catalog
+            category = request.args.get('category')
+            mask = catalog.category_mask([category]) if category else None
+            if radius_km is None:
+                ids, dist = catalog.spatial.nearest(lat, lon, limit, mask=mask)
+            else:
+                ids, dist = catalog.spatial.within(lat, lon, radius_km)
+                if mask is not None:
+                    keep = mask[ids]
+                    ids, dist = ids[keep], dist[keep]
+                if limit is not None:
+                    ids, dist = ids[:limit], dist[:limit]
+            return {
+                "success": True,
+                "attractions": [dict(catalog.records[i], distance_km=round(d, 3))
+                                for i, d in zip(ids.tolist(), dist.tolist())],
+                "count": len(ids),
+                "center": [lat, lon],
+                "radius_km": radius_km,
+            }
+
+        try:
+            return jsonify(build(DATA_STORE.snapshot))
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        except Exception:
+            logger.exception("Error fetching nearby attractions")
+            return jsonify({"success": False, "error": "Failed to fetch nearby attractions"}), 500
+
     @app.get('/api/itinerary/hotels')
     @app.get('/api/hotels')
     def get_hotels():
-        try:
+        def build(snapshot):
             wilaya = request.args.get('wilaya')
             min_stars = request.args.get('min_stars', type=int)
             max_stars = request.args.get('max_stars', type=int)
-            limit = request.args.get('limit', type=int)
-            # Load hotels using helper function
-            hotels = _get_hotels()
+            index = snapshot.hotel_query
+            filters = []
             if wilaya:
-                hotels = [h for h in hotels if h.get('city') == wilaya or h.get('wilaya') == wilaya]
-            if isinstance(min_stars, int):
-                hotels = [h for h in hotels if float(h.get('avg_review', 0)) >= min_stars]
-            if isinstance(max_stars, int):
-                hotels = [h for h in hotels if float(h.get('avg_review', 5)) <= max_stars]
-            if isinstance(limit, int) and limit > 0:
-                hotels = hotels[:limit]
-            return jsonify({"success": True, "hotels": hotels, "count": len(hotels)})
+                filters.append(np.union1d(index.ids_for('city', wilaya), index.ids_for('wilaya', wilaya)))
+            if isinstance(min_stars, int) or isinstance(max_stars, int):
+                # whole-star buckets, then an exact check for e.g. 4.5 against max_stars=4
+                in_buckets = index.ids_in_range('stars', min_stars, max_stars)
+                filters.append(index.filter_range(in_buckets, 'avg_review', min_stars, max_stars))
+            ids = index.intersect(filters, index.all_ids)
+            return _listing(snapshot, index, ids, "hotels", {"wilayas": "city", "stars": "stars"})
+
+        try:
+            return _cached_json(build)
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
         except Exception:
             logger.exception("Error fetching hotels")
             return jsonify({"success": False, "error": "Failed to fetch hotels"}), 500
@@ -432,9 +860,11 @@ def create_app():
     def get_wilayas():
         try:
             # Derive wilayas from hotels dataset to only show cities with hotels
-            hotels_data = _get_hotels()
-            wilayas = sorted(list({h.get('city') for h in hotels_data if h.get('city')}))
-            return jsonify({"success": True, "wilayas": wilayas})
+            return _cached_json(lambda snapshot: {
+                "success": True,
+                "wilayas": snapshot.hotel_query.values('city'),
+                "counts": snapshot.hotel_query.counts['city'],
+            })
         except Exception:
             logger.exception("Error fetching wilayas")
             return jsonify({"success": False, "error": "Failed to fetch wilayas"}), 500
@@ -443,9 +873,11 @@ def create_app():
     @app.get('/api/categories')
     def get_categories():
         try:
-            data = _get_attractions()
-            categories = sorted(list({a.get('category', 'Unknown') for a in data}))
-            return jsonify({"success": True, "categories": categories})
+            return _cached_json(lambda snapshot: {
+                "success": True,
+                "categories": snapshot.attraction_query.values('category'),
+                "counts": snapshot.attraction_query.counts['category'],
+            })
         except Exception:
             logger.exception("Error fetching categories")
             return jsonify({"success": False, "error": "Failed to fetch categories"}), 500
@@ -459,40 +891,66 @@ def create_app():
             location_str = data['location'].strip()
             if not location_str:
                 return jsonify({"success": False, "error": "Location string cannot be empty"}), 400
-            lat, lon = _parse_location(location_str)
-            return jsonify({"success": True, "coordinates": [lat, lon], "location": location_str})
+            result = DATA_STORE.snapshot.gazetteer.lookup(location_str)
+            body = {
+                "success": result.coordinates is not None,
+                "location": location_str,
+                "match": result.match,
+                "kind": result.kind,
+                "confidence": result.confidence,
+                "candidates": [
+                    {"name": c.name, "coordinates": list(c.coordinates),
+                     # distance in km for coordinates input, similarity otherwise
+                     ("distance_km" if result.kind == "coordinates" else "score"): c.score}
+                    for c in result.candidates
+                ],
+            }
+            if result.coordinates is None:
+                body["error"] = f"Location '{location_str}' not recognized"
+                return jsonify(body), 404
+            body["coordinates"] = list(result.coordinates)
+            return jsonify(body)
         except Exception:
             logger.exception("Error geocoding location")
             return jsonify({"success": False, "error": "Failed to geocode location"}), 500
     
+    @app.get('/metrics')
+    @app.get('/api/metrics')
+    def metrics():
+        """Solver and HTTP metrics of this process in the Prometheus text format, or JSON with ?format=json"""
+        for state, value in pool_stats().items():
+            SOLVER_POOL.set(value, state=state)
+        if request.args.get('format') == 'json':
+            return jsonify(REGISTRY.to_dict())
+        return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+    @app.get('/api/metrics/slow')
+    def slow_requests():
+        """The most recent sampled slow requests, newest first"""
+        return jsonify({
+            "success": True,
+            "thresholdsMs": SLOW_REQUEST_MS,
+            "sampleRate": SLOW_REQUEST_SAMPLE_RATE,
+            "requests": list(SLOW_REQUESTS),
+        })
+
     # Health check endpoints
     @app.get('/health')
     @app.get('/api/health')
     def health_check():
         """Health check endpoint with basic stats"""
         try:
-            attractions = _get_attractions()
-            # Try loading hotels similarly to other endpoints
-            hotels_count = 0
-            for hp in [
-                os.path.join(os.path.dirname(__file__), 'hotels.json'),
-                os.path.join(os.path.dirname(__file__), 'data', 'hotels.json'),
-                os.path.join(os.path.dirname(__file__), 'Data', 'hotels.json'),
-            ]:
-                if os.path.exists(hp):
-                    try:
-                        with open(hp, encoding='utf-8') as f:
-                            hotels = json.load(f)
-                            hotels_count = len(hotels) if isinstance(hotels, list) else 0
-                    except Exception:
-                        hotels_count = 0
-                    break
-
+            snapshot = DATA_STORE.snapshot
             return jsonify({
                 "status": "healthy",
                 "timestamp": datetime.now(timezone.utc).isoformat(),
-                "attractions_loaded": len(attractions),
-                "hotels_loaded": hotels_count,
+                "attractions_loaded": len(snapshot.attractions),
+                "hotels_loaded": len(snapshot.hotels),
+                "data_version": snapshot.version,
+                "data_source": "compiled" if snapshot.catalog.source is not None else "json",
+                "solver_pool": pool_stats(),
+                "result_cache": RESULT_CACHE.stats(),
+                "response_cache": RESPONSE_CACHE.stats(),
                 "version": "1.0.0",
             })
         except Exception:
@@ -516,15 +974,20 @@ def create_app():
             "endpoints": {
                 "health": "/api/health",
                 "generate_itinerary": "/api/itinerary/generate",
+                "generate_itinerary_stream": "/api/itinerary/generate-stream",
+                "generate_itinerary_batch": "/api/itinerary/generate-batch",
                 "attractions": "/api/attractions",
+                "attractions_nearby": "/api/attractions/nearby",
                 "hotels": "/api/hotels",
                 "wilayas": "/api/wilayas",
                 "categories": "/api/categories",
-                "geocode": "/api/itinerary/geocode"
+                "geocode": "/api/itinerary/geocode",
+                "metrics": "/api/metrics",
+                "slow_requests": "/api/metrics/slow"
             },
             "algorithms": {
                 "default": "csp",
-                "available": ["csp", "astar"]
+                "available": ["csp", "astar", "beam", "anneal"]
             }
         })
     
@@ -561,4 +1024,5 @@ def create_app():
 app = create_app()
 
 if __name__ == '__main__':
+    load_data()
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,11 @@
+"""
+Offline benchmarks for the planners and the API hot paths
+
+`synthetic` builds attraction and hotel datasets of any size, clustered
+around the wilaya seats; `run` sweeps solvers and request parameters over
+them and compares latency percentiles with a stored baseline. Nothing here
+needs a running server or network access:
+
+    python -m benchmarks --sizes 300,3000 --repeat 5
+    python -m benchmarks --save-baseline
+"""
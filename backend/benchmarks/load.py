@@ -0,0 +1,532 @@
+"""
+Concurrent load driver for the API
+
+Sends a realistic mix of requests to the app and reports, per endpoint,
+throughput, latency percentiles and histograms, error rates and the load at
+which the service saturates. The app is driven in-process through Flask
+test clients (the default), through a server started here on a free port
+(`--serve`), or through an already running server (`--url`).
+
+Load models:
+    closed  `--concurrency` clients, each sending its next request as soon
+            as the previous one is answered (after an optional think time)
+    open    requests arrive as a Poisson process at `--rate` per second,
+            whatever the response times; latency is measured from the
+            scheduled arrival, so requests queued in the driver count
+
+`--steps` repeats the run at several concurrencies (closed) or rates (open)
+and reports the first step at which each endpoint saturates: its error rate
+exceeds `--max-error-rate`, its p95 exceeds `--slo-ms`, or its throughput
+stops following the offered load.
+
+The mix is drawn from the data the server reports: wilayas in proportion to
+their hotels, activities in proportion to their attractions, log-normal
+budgets around 60,000 DZD rounded like form input, and a share of
+misspelled place names for the geocoder:
+
+    python -m benchmarks.load --concurrency 8 --duration 20
+    python -m benchmarks.load --model open --steps 5,10,20,40 --duration 15
+    python -m benchmarks.load --url http://localhost:5000 --mix generate=1,attractions=3
+"""
+
+import argparse
+import atexit
+import json
+import logging
+import math
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Sequence, Tuple
+
+import numpy as np
+
+from benchmarks.synthetic import make_attractions, make_hotels, write_dataset
+
+# Relative frequency of each endpoint in the default mix
+DEFAULT_MIX = {
+    'generate': 2, 'attractions': 3, 'nearby': 2, 'hotels': 2,
+    'geocode': 2, 'wilayas': 1, 'categories': 1, 'health': 1,
+}
+ENDPOINTS = tuple(DEFAULT_MIX)
+
+# Upper bucket edges of the latency histograms (ms); the last bucket is open
+HISTOGRAM_EDGES_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+BUDGET_MEDIAN_DZD = 60000.0
+BUDGET_SIGMA = 0.6
+BUDGET_STEP_DZD = 5000.0
+ACTIVITY_COUNTS = ((1, 0.3), (2, 0.45), (3, 0.25))
+MAX_ATTRACTIONS = ((2, 0.3), (3, 0.5), (4, 0.2))
+TRAVEL_HOURS = ((4.0, 0.2), (6.0, 0.5), (8.0, 0.3))
+CAR_SHARE = 0.4
+COORDINATE_LOCATION_SHARE = 0.5
+MISSPELLED_SHARE = 0.2
+# Spread of request positions around a wilaya seat (degrees)
+POSITION_JITTER_DEG = 0.05
+NEARBY_RADII_KM = (5.0, 10.0, 25.0, 50.0)
+
+# A step saturates when an endpoint's throughput falls below this share of
+# the offered load (open), or grows by less than this share of the added
+# concurrency (closed)
+THROUGHPUT_FOLLOW_RATIO = 0.9
+
+
+class Request(NamedTuple):
+    endpoint: str
+    method: str
+    path: str
+    body: Dict[str, Any] | None
+
+
+class Sample(NamedTuple):
+    endpoint: str
+    latency_ms: float
+    status: int  # 0 when no response was received
+    finished: float  # seconds from the start of the run
+
+
+def _choice(rng: np.random.Generator, options: Sequence[Tuple[Any, float]]):
+    values, weights = zip(*options)
+    p = np.asarray(weights, dtype=np.float64)
+    return values[int(rng.choice(len(values), p=p / p.sum()))]
+
+
+def _misspell(rng: np.random.Generator, name: str) -> str:
+    """Drop, double or swap one letter."""
+    if len(name) < 4:
+        return name
+    i = int(rng.integers(1, len(name) - 1))
+    edit = int(rng.integers(3))
+    if edit == 0:
+        return name[:i] + name[i + 1:]
+    if edit == 1:
+        return name[:i] + name[i] + name[i:]
+    return name[:i - 1] + name[i] + name[i - 1] + name[i + 1:]
+
+
+class RequestMix:
+    """
+    Random requests with realistic parameters.
+
+    Args:
+        weights: Relative frequency per endpoint name.
+        wilayas: {name: (hotel count, (lat, lon))} for places the server can geocode.
+        categories: {category: attraction count}.
+        solver_time_limit: `cspTimeLimitSec` of generate requests.
+    """
+
+    def __init__(self, weights: Dict[str, float], wilayas: Dict[str, Tuple[int, Tuple[float, float]]],
+                 categories: Dict[str, int], solver_time_limit: float):
+        if not wilayas or not categories:
+            raise ValueError('The server reported no geocodable wilayas or no categories')
+        self.endpoints = [e for e, w in weights.items() if w > 0]
+        w = np.asarray([weights[e] for e in self.endpoints], dtype=np.float64)
+        self.endpoint_p = w / w.sum()
+        self.wilaya_names = list(wilayas)
+        counts = np.asarray([wilayas[n][0] for n in self.wilaya_names], dtype=np.float64)
+        self.wilaya_p = counts / counts.sum()
+        self.positions = [wilayas[n][1] for n in self.wilaya_names]
+        self.categories = list(categories)
+        counts = np.asarray([categories[c] for c in self.categories], dtype=np.float64)
+        self.category_p = counts / counts.sum()
+        self.solver_time_limit = solver_time_limit
+
+    def share(self, endpoint: str) -> float:
+        return float(self.endpoint_p[self.endpoints.index(endpoint)]) if endpoint in self.endpoints else 0.0
+
+    def _wilaya(self, rng: np.random.Generator) -> Tuple[str, Tuple[float, float]]:
+        i = int(rng.choice(len(self.wilaya_names), p=self.wilaya_p))
+        lat, lon = self.positions[i]
+        jitter = rng.normal(0.0, POSITION_JITTER_DEG, size=2)
+        return self.wilaya_names[i], (round(lat + jitter[0], 5), round(lon + jitter[1], 5))
+
+    def _categories(self, rng: np.random.Generator, k: int) -> List[str]:
+        k = min(k, len(self.categories))
+        return [self.categories[i] for i in rng.choice(len(self.categories), size=k, replace=False, p=self.category_p)]
+
+    def sample(self, rng: np.random.Generator) -> Request:
+        endpoint = self.endpoints[int(rng.choice(len(self.endpoints), p=self.endpoint_p))]
+        wilaya, (lat, lon) = self._wilaya(rng)
+        if endpoint == 'generate':
+            budget = float(np.clip(rng.lognormal(math.log(BUDGET_MEDIAN_DZD), BUDGET_SIGMA), 10000, 500000))
+            min_stars = int(rng.integers(2, 5))
+            body = {
+                'wilaya': wilaya,
+                'location': f'{lat}, {lon}' if rng.random() < COORDINATE_LOCATION_SHARE else wilaya,
+                'activities': self._categories(rng, _choice(rng, ACTIVITY_COUNTS)),
+                'budget': round(budget / BUDGET_STEP_DZD) * BUDGET_STEP_DZD,
+                'minHotelStars': min_stars,
+                'maxHotelStars': int(rng.integers(min_stars, 6)),
+                'maxAttractions': _choice(rng, MAX_ATTRACTIONS),
+                'maxTravelHours': _choice(rng, TRAVEL_HOURS),
+                'hasCar': bool(rng.random() < CAR_SHARE),
+                'cspTimeLimitSec': self.solver_time_limit,
+            }
+            return Request(endpoint, 'POST', '/api/itinerary/generate', body)
+        if endpoint == 'geocode':
+            name = _misspell(rng, wilaya) if rng.random() < MISSPELLED_SHARE else wilaya
+            return Request(endpoint, 'POST', '/api/itinerary/geocode', {'location': name})
+        if endpoint == 'attractions':
+            args = {'limit': 20}
+            if rng.random() < 0.5:
+                args['wilaya'] = wilaya
+            if rng.random() < 0.5:
+                args['category'] = self._categories(rng, 1)[0]
+            return Request(endpoint, 'GET', '/api/attractions?' + urllib.parse.urlencode(args), None)
+        if endpoint == 'nearby':
+            args = {'lat': lat, 'lon': lon, 'radius_km': float(rng.choice(NEARBY_RADII_KM)), 'limit': 20}
+            if rng.random() < 0.3:
+                args['category'] = self._categories(rng, 1)[0]
+            return Request(endpoint, 'GET', '/api/attractions/nearby?' + urllib.parse.urlencode(args), None)
+        if endpoint == 'hotels':
+            args = {'wilaya': wilaya, 'min_stars': int(rng.integers(2, 5))}
+            return Request(endpoint, 'GET', '/api/hotels?' + urllib.parse.urlencode(args), None)
+        return Request(endpoint, 'GET', f'/api/{endpoint}', None)
+
+
+class InProcessTransport:
+    """Calls the Flask app directly, with one test client per thread."""
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def send(self, request: Request) -> Tuple[int, bytes]:
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(request.path, method=request.method, json=request.body)
+        return response.status_code, response.get_data()
+
+
+class HttpTransport:
+    """Calls a server over HTTP."""
+
+    def __init__(self, base_url: str, timeout: float = 60.0):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def send(self, request: Request) -> Tuple[int, bytes]:
+        data = json.dumps(request.body).encode('utf-8') if request.body is not None else None
+        req = urllib.request.Request(self.base_url + request.path, data=data, method=request.method,
+                                     headers={'Content-Type': 'application/json'} if data else {})
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+
+def _call(transport, request: Request, run_start: float, started: float, samples: List[Sample]) -> None:
+    try:
+        status, _ = transport.send(request)
+    except Exception:
+        status = 0
+    now = time.perf_counter()
+    # list.append is atomic, so workers share one list
+    samples.append(Sample(request.endpoint, (now - started) * 1000, status, now - run_start))
+
+
+def run_closed(transport, mix: RequestMix, concurrency: int, duration: float,
+               think_ms: float = 0.0, seed: int = 0) -> List[Sample]:
+    """`concurrency` clients in a loop for `duration` seconds."""
+    samples: List[Sample] = []
+    start = time.perf_counter()
+    end = start + duration
+
+    def client(i: int) -> None:
+        rng = np.random.default_rng([seed, i])
+        while time.perf_counter() < end:
+            _call(transport, mix.sample(rng), start, time.perf_counter(), samples)
+            if think_ms > 0:
+                time.sleep(rng.exponential(think_ms / 1000))
+
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return samples
+
+
+def run_open(transport, mix: RequestMix, rate: float, duration: float,
+             max_in_flight: int = 256, seed: int = 0) -> List[Sample]:
+    """
+    Poisson arrivals at `rate` per second for `duration` seconds. Requests
+    still queued at the end are waited for and recorded, late.
+    """
+    samples: List[Sample] = []
+    rng = np.random.default_rng(seed)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        scheduled = start
+        while True:
+            scheduled += rng.exponential(1.0 / rate)
+            if scheduled >= start + duration:
+                break
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(_call, transport, mix.sample(rng), start, scheduled, samples)
+    return samples
+
+
+def summarize(samples: Sequence[Sample], duration: float) -> Dict[str, Any]:
+    """
+    Latency percentiles, histogram and error rates of `samples`, and the
+    throughput: responses completed within the `duration` of the run per
+    second (`offered_rps` counts every request sent).
+    """
+    if not samples:
+        return {'count': 0, 'offered_rps': 0.0, 'throughput_rps': 0.0}
+    lat = np.asarray([s.latency_ms for s in samples], dtype=np.float64)
+    statuses = Counter(s.status for s in samples)
+    errors = sum(n for status, n in statuses.items() if status == 0 or status >= 500)
+    client_errors = sum(n for status, n in statuses.items() if 400 <= status < 500)
+    buckets = np.bincount(np.searchsorted(HISTOGRAM_EDGES_MS, lat, side='left'),
+                          minlength=len(HISTOGRAM_EDGES_MS) + 1)
+    return {
+        'count': len(samples),
+        'offered_rps': round(len(samples) / duration, 2),
+        'throughput_rps': round(sum(s.finished <= duration for s in samples) / duration, 2),
+        'p50_ms': round(float(np.percentile(lat, 50)), 2),
+        'p90_ms': round(float(np.percentile(lat, 90)), 2),
+        'p95_ms': round(float(np.percentile(lat, 95)), 2),
+        'p99_ms': round(float(np.percentile(lat, 99)), 2),
+        'max_ms': round(float(lat.max()), 2),
+        'error_rate': round(errors / len(samples), 4),
+        'client_error_rate': round(client_errors / len(samples), 4),
+        'statuses': {str(status): n for status, n in sorted(statuses.items())},
+        'histogram': buckets.tolist(),
+    }
+
+
+def by_endpoint(samples: Sequence[Sample], duration: float) -> Dict[str, Dict[str, Any]]:
+    """`summarize` per endpoint, plus 'all'."""
+    groups: Dict[str, List[Sample]] = {}
+    for s in samples:
+        groups.setdefault(s.endpoint, []).append(s)
+    report = {name: summarize(group, duration) for name, group in sorted(groups.items())}
+    report['all'] = summarize(samples, duration)
+    return report
+
+
+def saturation(steps: Sequence[float], reports: Sequence[Dict[str, Dict[str, Any]]], model: str,
+               slo_ms: float, max_error_rate: float) -> Dict[str, Dict[str, Any]]:
+    """
+    First step at which each endpoint saturates, and why; None when it
+    followed the load at every step.
+    """
+    found = {}
+    for name in reports[0]:
+        found[name] = None
+        for i, (load, report) in enumerate(zip(steps, reports)):
+            stats = report.get(name)
+            if not stats or not stats['count']:
+                continue
+            reason = None
+            if stats['error_rate'] > max_error_rate:
+                reason = f"error rate {stats['error_rate']:.1%}"
+            elif stats['p95_ms'] > slo_ms:
+                reason = f"p95 {stats['p95_ms']:.0f} ms over the {slo_ms:.0f} ms objective"
+            elif model == 'open' and stats['throughput_rps'] < THROUGHPUT_FOLLOW_RATIO * stats['offered_rps']:
+                reason = f"throughput {stats['throughput_rps']:.1f}/s for {stats['offered_rps']:.1f}/s offered"
+            elif model == 'closed' and i > 0 and reports[i - 1].get(name, {}).get('count'):
+                before = reports[i - 1][name]['throughput_rps']
+                expected = before * (1 + THROUGHPUT_FOLLOW_RATIO * (load / steps[i - 1] - 1))
+                if stats['throughput_rps'] < expected * THROUGHPUT_FOLLOW_RATIO:
+                    reason = f"throughput {before:.1f} -> {stats['throughput_rps']:.1f}/s"
+            if reason:
+                found[name] = {'step': load, 'reason': reason}
+                break
+    return found
+
+
+def _histogram_lines(histogram: Sequence[int], width: int = 40) -> List[str]:
+    labels = [f'<= {e} ms' for e in HISTOGRAM_EDGES_MS] + [f'>  {HISTOGRAM_EDGES_MS[-1]} ms']
+    peak = max(histogram) or 1
+    first = next((i for i, n in enumerate(histogram) if n), 0)
+    last = max((i for i, n in enumerate(histogram) if n), default=0)
+    return [f'    {labels[i]:>11} {histogram[i]:>7} {"#" * math.ceil(width * histogram[i] / peak)}'
+            for i in range(first, last + 1)]
+
+
+def print_report(report: Dict[str, Dict[str, Any]], histograms: bool) -> None:
+    print(f"  {'endpoint':<12} {'count':>7} {'sent/s':>8} {'done/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} "
+          f"{'5xx/err':>8} {'4xx':>7}")
+    for name, stats in report.items():
+        if not stats['count']:
+            continue
+        print(f"  {name:<12} {stats['count']:>7} {stats['offered_rps']:>8.1f} {stats['throughput_rps']:>8.1f} "
+              f"{stats['p50_ms']:>8.1f} "
+              f"{stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f} {stats['max_ms']:>8.1f} "
+              f"{stats['error_rate']:>8.1%} {stats['client_error_rate']:>7.1%}")
+    if histograms:
+        for name, stats in report.items():
+            if stats['count']:
+                print(f'  {name} latency')
+                print('\n'.join(_histogram_lines(stats['histogram'])))
+
+
+def build_mix(transport, weights: Dict[str, float], solver_time_limit: float) -> RequestMix:
+    """Read wilayas and categories from the server and geocode every wilaya once."""
+    def get(path: str, body=None) -> Tuple[int, Dict[str, Any]]:
+        status, payload = transport.send(Request('setup', 'POST' if body else 'GET', path, body))
+        return status, json.loads(payload or b'{}')
+
+    status, categories = get('/api/categories')
+    if status != 200:
+        raise RuntimeError(f'/api/categories returned {status}')
+    status, wilayas = get('/api/wilayas')
+    if status != 200:
+        raise RuntimeError(f'/api/wilayas returned {status}')
+    places = {}
+    for name, count in wilayas['counts'].items():
+        status, found = get('/api/itinerary/geocode', {'location': name})
+        if status == 200:
+            places[name] = (count, tuple(found['coordinates']))
+    return RequestMix(weights, places, categories['counts'], solver_time_limit)
+
+
+def _parse_mix(text: str) -> Dict[str, float]:
+    weights = {name: 0.0 for name in ENDPOINTS}
+    for part in filter(None, text.split(',')):
+        name, _, weight = part.partition('=')
+        if name not in weights:
+            raise ValueError(f"unknown endpoint '{name}' (known: {', '.join(ENDPOINTS)})")
+        weights[name] = float(weight or 1)
+    if not any(weights.values()):
+        raise ValueError('the mix has no endpoint with a positive weight')
+    return weights
+
+
+def _use_synthetic_data(app_module, size: int, seed: int) -> None:
+    tmp = tempfile.mkdtemp(prefix='load-data-')
+    atexit.register(shutil.rmtree, tmp, ignore_errors=True)
+    attractions_path, hotels_path = write_dataset(tmp, make_attractions(size, seed), make_hotels(size, seed))
+
+    from data_store import DataStore
+    app_module.DATA_STORE = DataStore([attractions_path], [hotels_path])
+
+
+def _start_server(app):
+    from werkzeug.serving import make_server
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    atexit.register(server.shutdown)
+    return f'http://127.0.0.1:{server.server_port}'
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.load', description=__doc__.split('\n\n')[0])
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--url', help='drive a running server at this base URL instead of the app in-process')
+    target.add_argument('--serve', action='store_true', help='start the app on a local port and drive it over HTTP')
+    parser.add_argument('--model', choices=('closed', 'open'), default='closed', help='load model (default: %(default)s)')
+    parser.add_argument('--concurrency', type=int, default=8, help='closed model: clients (default: %(default)s)')
+    parser.add_argument('--rate', type=float, default=20.0, help='open model: arrivals per second (default: %(default)s)')
+    parser.add_argument('--steps', help='comma-separated concurrencies or rates to run in turn, for the saturation point')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per step (default: %(default)s)')
+    parser.add_argument('--warmup', type=float, default=2.0, help='unmeasured seconds before the first step (default: %(default)s)')
+    parser.add_argument('--think-ms', type=float, default=0.0, help='closed model: mean pause between requests (default: %(default)s)')
+    parser.add_argument('--max-in-flight', type=int, default=256,
+                        help='open model: requests sent concurrently at most (default: %(default)s)')
+    parser.add_argument('--mix', default=','.join(f'{k}={v}' for k, v in DEFAULT_MIX.items()),
+                        help='endpoint weights (default: %(default)s)')
+    parser.add_argument('--solver-time-limit', type=float, default=5.0,
+                        help='cspTimeLimitSec of generate requests (default: %(default)s)')
+    parser.add_argument('--synthetic', type=int, metavar='N',
+                        help='serve a synthetic catalog of N attractions instead of Data/ (not with --url)')
+    parser.add_argument('--slo-ms', type=float, default=2000.0,
+                        help='p95 latency above which an endpoint counts as saturated (default: %(default)s)')
+    parser.add_argument('--max-error-rate', type=float, default=0.01,
+                        help='5xx/transport error rate above which an endpoint counts as saturated (default: %(default)s)')
+    parser.add_argument('--histograms', action='store_true', help='print latency histograms of every step')
+    parser.add_argument('--seed', type=int, default=0, help='request mix seed (default: %(default)s)')
+    parser.add_argument('--output', type=Path, help='also write the results as JSON here')
+    args = parser.parse_args(argv)
+
+    try:
+        weights = _parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.synthetic and args.url:
+        parser.error('--synthetic needs the app in this process')
+    default_step = args.concurrency if args.model == 'closed' else args.rate
+    steps = [float(s) for s in args.steps.split(',') if s] if args.steps else [default_step]
+    if args.model == 'closed':
+        steps = [int(s) for s in steps]
+    if not steps or min(steps) <= 0:
+        parser.error('steps must be positive')
+
+    if args.url:
+        transport = HttpTransport(args.url)
+    else:
+        logging.disable(logging.WARNING)
+        import app as app_module
+        if args.synthetic:
+            _use_synthetic_data(app_module, args.synthetic, args.seed)
+        if args.serve:
+            transport = HttpTransport(_start_server(app_module.app))
+        else:
+            transport = InProcessTransport(app_module.app)
+
+    try:
+        mix = build_mix(transport, weights, args.solver_time_limit)
+    except Exception as e:
+        print(f'Could not build the request mix: {e}')
+        return 1
+    print(f'{len(mix.wilaya_names)} wilayas, {len(mix.categories)} categories; '
+          f"mix: {', '.join(f'{e} {p:.0%}' for e, p in zip(mix.endpoints, mix.endpoint_p))}")
+
+    def run(load, duration, seed):
+        if args.model == 'closed':
+            return run_closed(transport, mix, int(load), duration, args.think_ms, seed)
+        return run_open(transport, mix, load, duration, args.max_in_flight, seed)
+
+    if args.warmup > 0:
+        run(steps[0], args.warmup, args.seed + 1000)
+
+    unit = 'clients' if args.model == 'closed' else 'req/s offered'
+    reports = []
+    for i, load in enumerate(steps):
+        started = time.perf_counter()
+        samples = run(load, args.duration, args.seed + i)
+        report = by_endpoint(samples, args.duration)
+        reports.append(report)
+        print(f'\n{args.model} loop, {load:g} {unit}, {time.perf_counter() - started:.1f} s')
+        print_report(report, args.histograms or len(steps) == 1)
+        sys.stdout.flush()
+
+    shares = {e: mix.share(e) for e in mix.endpoints}
+    points = saturation(steps, reports, args.model, args.slo_ms, args.max_error_rate)
+    if len(steps) > 1:
+        print('\nSaturation')
+        for name, point in points.items():
+            if point is None:
+                print(f'  {name:<12} not reached (up to {steps[-1]:g} {unit})')
+            else:
+                print(f"  {name:<12} at {point['step']:g} {unit}: {point['reason']}")
+
+    if args.output:
+        args.output.write_text(json.dumps({
+            'model': args.model, 'steps': steps, 'duration_s': args.duration,
+            'histogram_edges_ms': list(HISTOGRAM_EDGES_MS), 'mix': shares,
+            'reports': reports, 'saturation': points,
+        }, indent=2) + '\n')
+
+    # Errors at the lightest load mean the service is broken rather than saturated
+    return 1 if reports[0]['all']['error_rate'] > args.max_error_rate else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
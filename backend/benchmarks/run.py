@@ -0,0 +1,391 @@
+"""
+Benchmark sweep over catalog sizes, solvers and request parameters
+
+Every (target, catalog size, parameters) case runs in a fresh spawned
+process, so its peak RSS is its own. A case first runs once to warm up
+(distance matrix, indexes; reported as `cold_ms`), then `--repeat` timed
+runs give the p50/p95/p99 latency and the nodes the solver expanded.
+
+Targets:
+    astar   build_problem + a_star_search
+    csp     build_problem + csp_constructive_plan, with the domain template
+            cache cleared before every run (so the domain build is timed)
+    beam    build_problem + beam_search
+    anneal  build_problem + anneal_search with a fixed move budget
+            (`ANNEAL_ITERATIONS`), so the time is that of the greedy seed
+            plus a constant number of moves rather than the deadline
+    hotels  find_hotels_for_itinerary on a 7-day itinerary
+    api     POST /api/itinerary/generate through the Flask test client with
+            the plan already in the result cache: request parsing, problem
+            set-up and _format_response
+    load    a DataStore snapshot (catalog and indexes) from the JSON files
+    mmap    the same snapshot from a compiled catalog file
+
+The load and mmap targets do not depend on the request parameters and only
+run with the base ones.
+
+The solver and api targets need the dense float32 distance matrix (n*n*4
+bytes: 3.4 GB at 30k attractions, 37 GB at 100k), which the server refuses
+above MAX_DISTANCE_MATRIX_MB. For a size whose matrix exceeds
+`--max-matrix-mb` (default: that same ceiling, 23170 attractions at
+2048 MB) those targets are capped: they run on the largest catalog that
+fits, keyed by that size, and the run says so. So at 30k and 100k the
+solvers and the API are measured at the ceiling, and only hotels, load and
+mmap at the full size. Failed cases are never written to the baseline.
+
+Results are compared with a stored baseline (`baseline.json` next to this
+file); a p50 or p95 more than `--tolerance` slower than the baseline, and
+by at least `--min-delta-ms`, is reported as a regression and makes the
+command exit with status 1. So does a case that has a baseline entry but
+raised in this run (recorded as `failed`).
+"""
+
+import argparse
+import atexit
+import json
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from benchmarks.synthetic import CATEGORIES, make_attractions, make_hotels, write_dataset
+
+BASELINE_PATH = Path(__file__).resolve().parent / 'baseline.json'
+
+DEFAULT_SIZES = (300, 3000, 30000, 100000)
+TARGETS = ('astar', 'csp', 'beam', 'anneal', 'hotels', 'api', 'load', 'mmap')
+# Targets that need the catalog's dense n x n distance matrix, capped at the
+# largest catalog size that fits in --max-matrix-mb
+MATRIX_TARGETS = ('astar', 'csp', 'beam', 'anneal', 'api')
+# Targets the request parameters make no difference to
+UNPARAMETERIZED_TARGETS = ('load', 'mmap')
+
+BASE_PARAMS = {'max_attractions': 3, 'budget': 60000.0, 'categories': ('Historical', 'Nature')}
+# Each parameter is swept on its own, the others staying at BASE_PARAMS
+SWEEP = {
+    'max_attractions': (3, 4, 5),
+    'budget': (20000.0, 60000.0, 150000.0),
+    'categories': (('Historical', 'Nature'), ('Beach', 'Cultural', 'Historical', 'Nature'), tuple(CATEGORIES)),
+}
+START_LOCATION = (36.737232, 3.086472)  # Algiers
+# find_hotels_for_itinerary takes microseconds, so it is timed this many times per repeat
+HOTEL_CALLS_PER_REPEAT = 50
+
+
+def sweep_params() -> List[Dict[str, Any]]:
+    """BASE_PARAMS plus one-factor-at-a-time variations, without duplicates."""
+    cases = [dict(BASE_PARAMS)]
+    for name, values in SWEEP.items():
+        for value in values:
+            params = dict(BASE_PARAMS, **{name: value})
+            if params not in cases:
+                cases.append(params)
+    return cases
+
+
+def case_key(target: str, size: int, params: Dict[str, Any]) -> str:
+    return (f"{target}/n={size}/k={params['max_attractions']}/budget={int(params['budget'])}"
+            f"/categories={len(params['categories'])}")
+
+
+def _spec(params: Dict[str, Any], algorithm: str, time_limit: float) -> Dict[str, Any]:
+    categories = list(params['categories'])
+    return {
+        'start_location': START_LOCATION,
+        'user_prefs': {'categories': categories, 'hotel_stars': (3, 5)},
+        'constraints': {
+            'max_total_budget': params['budget'],
+            'max_daily_time': 8.0,
+            'max_attractions_per_day': params['max_attractions'],
+            'has_car': False,
+            'min_hotel_stars': 3,
+            'max_hotel_stars': 5,
+        },
+        'activities': categories,
+        'algorithm': algorithm,
+        'time_limit': time_limit,
+        'beam_width': 64,
+        'max_nodes': 20000,
+        'seed': 0,
+    }
+
+
+class _NodeCounter:
+    """SearchProgress callback summing the nodes of every solver phase."""
+
+    def __init__(self):
+        self.peaks: Dict[str, int] = {}
+
+    def __call__(self, info: Dict[str, Any]) -> None:
+        self.peaks[info['phase']] = max(self.peaks.get(info['phase'], 0), info['nodes'])
+
+    def total(self, progress) -> int:
+        if progress.name is not None:
+            self(dict(phase=progress.name, nodes=progress.nodes))
+        return sum(self.peaks.values())
+
+
+def _solver_run(catalog, params, target: str, time_limit: float) -> Tuple[int, bool]:
+    from itinerary_planner import (ANNEAL_ITERATIONS, DOMAIN_CACHE, SearchProgress, a_star_search,
+                                   anneal_search, beam_search, csp_constructive_plan)
+    from solver_pool import build_problem
+
+    counter = _NodeCounter()
+    progress = SearchProgress(counter, interval=0.0)
+    spec = _spec(params, target, time_limit)
+    problem = build_problem(catalog, spec)
+    deadline = time.monotonic() + time_limit
+    if target == 'astar':
+        node = a_star_search(problem, deadline=deadline, progress=progress)
+    elif target == 'beam':
+        node = beam_search(problem, beam_width=spec['beam_width'], max_nodes=spec['max_nodes'],
+                           deadline=deadline, progress=progress)
+    elif target == 'anneal':
+        node = anneal_search(problem, deadline=deadline, seed=spec['seed'],
+                             max_iterations=ANNEAL_ITERATIONS, progress=progress)
+    else:
+        DOMAIN_CACHE.clear()
+        node = csp_constructive_plan(problem, time_limit_sec=time_limit, seed=0, progress=progress)
+    return counter.total(progress), bool(node is not None and node.approximate)
+
+
+def run_case(target: str, size: int, params: Dict[str, Any], repeat: int,
+             time_limit: float, seed: int) -> Dict[str, Any]:
+    """Run one case in this process and return its measurements."""
+    import logging
+    logging.disable(logging.WARNING)
+
+    from catalog import AttractionCatalog, HotelIndex
+    from itinerary_planner import find_hotels_for_itinerary
+
+    records = make_attractions(size, seed)
+    hotels = make_hotels(size, seed)
+    catalog = AttractionCatalog(records)
+
+    if target in ('astar', 'csp', 'beam', 'anneal'):
+        def once():
+            return _solver_run(catalog, params, target, time_limit)
+    elif target == 'hotels':
+        index = HotelIndex(hotels)
+        rng = np.random.default_rng(seed)
+        itinerary = [tuple(rng.choice(size, params['max_attractions'], replace=False).tolist())
+                     for _ in range(7)]
+
+        def once():
+            for _ in range(HOTEL_CALLS_PER_REPEAT):
+                find_hotels_for_itinerary(itinerary, catalog, index, params['budget'] * 2,
+                                          params['budget'], 3, 5)
+            return 0, False
+    elif target in UNPARAMETERIZED_TARGETS:
+        once = _load_case(records, hotels, compiled=target == 'mmap')
+    else:
+        once = _api_case(records, hotels, params, time_limit)
+
+    started = time.perf_counter()
+    once()
+    cold_ms = (time.perf_counter() - started) * 1000
+
+    latencies, nodes, approximate = [], [], 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        expanded, approx = once()
+        elapsed = (time.perf_counter() - started) * 1000
+        latencies.append(elapsed / HOTEL_CALLS_PER_REPEAT if target == 'hotels' else elapsed)
+        nodes.append(expanded)
+        approximate += approx
+
+    return {
+        'latencies_ms': latencies,
+        'cold_ms': cold_ms,
+        'nodes': int(np.median(nodes)) if nodes else 0,
+        'approximate': approximate,
+        # ru_maxrss is in KiB on Linux
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def _api_case(records, hotels, params, time_limit: float):
+    """Point the app at the synthetic data and return a cached-plan request runner."""
+    tmp = tempfile.mkdtemp(prefix='bench-data-')
+    atexit.register(shutil.rmtree, tmp, ignore_errors=True)
+    attractions_path, hotels_path = write_dataset(tmp, records, hotels)
+
+    import app as app_module
+    from data_store import DataStore
+    app_module.DATA_STORE = DataStore([attractions_path], [hotels_path])
+    client = app_module.app.test_client()
+    body = {
+        'wilaya': 'Algiers',
+        'location': f'{START_LOCATION[0]},{START_LOCATION[1]}',
+        'activities': list(params['categories']),
+        'budget': params['budget'],
+        'maxAttractions': params['max_attractions'],
+        'algorithm': 'csp',
+        'cspTimeLimitSec': time_limit,
+    }
+
+    def once():
+        response = client.post('/api/itinerary/generate', json=body)
+        if response.status_code not in (200, 400):
+            raise RuntimeError(f'generate returned {response.status_code}')
+        return 0, False
+    return once
+
+
+def _load_case(records, hotels, compiled: bool):
+    """Write the synthetic data (and compile it) and return a snapshot loader."""
+    tmp = tempfile.mkdtemp(prefix='bench-data-')
+    atexit.register(shutil.rmtree, tmp, ignore_errors=True)
+    attractions_path, hotels_path = write_dataset(tmp, records, hotels)
+
+    import catalog
+    from compiled_catalog import compile_catalog, source_digest
+    from data_store import DataStore, read_datasets
+    catalog_paths = []
+    if compiled:
+        catalog_paths.append(str(Path(tmp) / 'catalog.bin'))
+        compile_catalog(*read_datasets(attractions_path, hotels_path), catalog_paths[0], sources={
+            'attractions': source_digest(attractions_path), 'hotels': source_digest(hotels_path)})
+
+    def once():
+        catalog._CATALOG_CACHE.clear()  # time the catalog build, not a cache hit
+        store = DataStore([attractions_path], [hotels_path], poll_sec=0, catalog_paths=catalog_paths)
+        if (store.snapshot.catalog.source is not None) != compiled:
+            raise RuntimeError('snapshot was not loaded from the expected source')
+        return 0, False
+    return once
+
+
+def _summary(result: Dict[str, Any]) -> Dict[str, Any]:
+    lat = np.asarray(result['latencies_ms'], dtype=np.float64)
+    return {
+        'p50_ms': round(float(np.percentile(lat, 50)), 3),
+        'p95_ms': round(float(np.percentile(lat, 95)), 3),
+        'p99_ms': round(float(np.percentile(lat, 99)), 3),
+        'cold_ms': round(result['cold_ms'], 3),
+        'nodes': result['nodes'],
+        'approximate': result['approximate'],
+        'peak_rss_mb': round(result['peak_rss_mb'], 1),
+    }
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+            tolerance: float, min_delta_ms: float) -> List[str]:
+    """
+    Human-readable regressions of `results` against `baseline`.
+
+    A case that has baseline timings but failed in this run counts as a
+    regression.
+    """
+    regressions = []
+    for key, current in results.items():
+        base = baseline.get(key)
+        if not base or 'p50_ms' not in base:
+            continue
+        if 'failed' in current:
+            regressions.append(f"{key}: failed ({current['failed']})")
+            continue
+        for metric in ('p50_ms', 'p95_ms'):
+            now, before = current[metric], base[metric]
+            if now > before * (1 + tolerance) and now - before >= min_delta_ms:
+                regressions.append(f'{key}: {metric} {before:.2f} -> {now:.2f} ms (+{(now / before - 1) * 100:.0f}%)')
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    import catalog
+
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help='comma-separated catalog sizes (default: %(default)s)')
+    parser.add_argument('--targets', default=','.join(TARGETS), help='comma-separated targets (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per case (default: %(default)s)')
+    parser.add_argument('--time-limit', type=float, default=5.0, help='solver deadline in seconds (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0, help='synthetic data seed (default: %(default)s)')
+    parser.add_argument('--base-only', action='store_true', help='run only the base parameters, no sweep')
+    parser.add_argument('--max-matrix-mb', type=float, default=catalog.MAX_DISTANCE_MATRIX_MB,
+                        help='cap solver and api cases at the largest catalog whose distance matrix '
+                             'fits in this (default: MAX_DISTANCE_MATRIX_MB, %(default)s)')
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH, help='baseline file (default: %(default)s)')
+    parser.add_argument('--save-baseline', action='store_true', help='write the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed relative slowdown before flagging a regression (default: %(default)s)')
+    parser.add_argument('--min-delta-ms', type=float, default=2.0,
+                        help='ignore slowdowns smaller than this (default: %(default)s)')
+    parser.add_argument('--output', type=Path, help='also write the results as JSON here')
+    parser.add_argument('--inline', action='store_true',
+                        help='run cases in this process (faster, but peak RSS is cumulative)')
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(',') if s]
+    targets = [t for t in args.targets.split(',') if t]
+    unknown = set(targets) - set(TARGETS)
+    if unknown:
+        parser.error(f"unknown targets: {', '.join(sorted(unknown))}")
+    cases = [dict(BASE_PARAMS)] if args.base_only else sweep_params()
+    # the spawned case processes read the ceiling from the environment
+    os.environ['MAX_DISTANCE_MATRIX_MB'] = str(args.max_matrix_mb)
+    catalog.MAX_DISTANCE_MATRIX_MB = args.max_matrix_mb
+    cap = catalog.max_catalog_size(args.max_matrix_mb)
+    capped = [size for size in sizes if size > cap]
+    if capped and set(targets) & set(MATRIX_TARGETS):
+        print(f"NOTE: {', '.join(t for t in targets if t in MATRIX_TARGETS)} capped at n={cap} for "
+              f"n={', '.join(map(str, capped))}: the distance matrix would need "
+              f"{', '.join(f'{catalog.distance_matrix_mb(size):.0f}' for size in capped)} MB, "
+              f"over --max-matrix-mb {args.max_matrix_mb:.0f}")
+
+    results: Dict[str, Dict[str, Any]] = {}
+    print(f"{'case':<58} {'p50':>9} {'p95':>9} {'p99':>9} {'cold':>9} {'nodes':>8} {'rss MB':>8}")
+    for size in sizes:
+        for target in targets:
+            run_size = min(size, cap) if target in MATRIX_TARGETS else size
+            for params in cases if target not in UNPARAMETERIZED_TARGETS else [dict(BASE_PARAMS)]:
+                key = case_key(target, run_size, params)
+                if key in results:  # another requested size capped to the same one
+                    continue
+                job = (target, run_size, params, args.repeat, args.time_limit, args.seed)
+                try:
+                    if args.inline:
+                        raw = run_case(*job)
+                    else:
+                        with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as pool:
+                            raw = pool.submit(run_case, *job).result()
+                except Exception as e:
+                    results[key] = {'failed': f'{type(e).__name__}: {e}'}
+                    print(f'{key:<58} failed: {results[key]["failed"]}')
+                    continue
+                summary = results[key] = _summary(raw)
+                if run_size != size:
+                    summary['capped_from'] = size
+                print(f"{key:<58} {summary['p50_ms']:>9.2f} {summary['p95_ms']:>9.2f} {summary['p99_ms']:>9.2f} "
+                      f"{summary['cold_ms']:>9.1f} {summary['nodes']:>8} {summary['peak_rss_mb']:>8.1f}"
+                      + (f"  ({summary['approximate']} approximate)" if summary['approximate'] else '')
+                      + (f'  (capped from n={size})' if run_size != size else ''))
+                sys.stdout.flush()
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2, sort_keys=True) + '\n')
+    if args.save_baseline:
+        baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+        baseline.update({key: result for key, result in results.items() if 'p50_ms' in result})
+        args.baseline.write_text(json.dumps(baseline, indent=2, sort_keys=True) + '\n')
+        print(f'Baseline written to {args.baseline}')
+        return 0
+
+    if not args.baseline.exists():
+        print(f'No baseline at {args.baseline}; run with --save-baseline to create one')
+        return 0
+    regressions = compare(results, json.loads(args.baseline.read_text()), args.tolerance, args.min_delta_ms)
+    for line in regressions:
+        print(f'REGRESSION {line}')
+    if not regressions:
+        print('No regressions against the baseline')
+    return 1 if regressions else 0
@@ -0,0 +1,96 @@
+"""
+Synthetic attraction and hotel datasets for benchmarking
+
+Attractions are spread around the wilaya seats of `gazetteer`, with more of
+them in the big northern cities (a Zipf-like weight by table order), and
+use the category, cost and duration vocabulary of the real dataset, so
+every parser and index sees realistic input. The same seed always yields
+the same dataset.
+"""
+
+import json
+import os
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from gazetteer import WILAYA_COORDINATES
+
+CATEGORIES = ['Nature', 'Historical', 'Beach', 'Cultural', 'Museum', 'Religious',
+              'Amusement Park', 'Garden', 'Lake', 'Shopping Mall', 'Resort', 'Port']
+# Relative frequencies of CATEGORIES in Data/attractions.json
+CATEGORY_WEIGHTS = [115, 59, 30, 27, 15, 15, 11, 7, 7, 6, 4, 2]
+COSTS = ['0 DZD', 'Free', 'Variable', '100 DZD', '200 DZD', '300 DZD', '500 DZD']
+COST_WEIGHTS = [200, 25, 15, 8, 7, 9, 3]
+DURATIONS = ['1 hour', '1-2 hours', '2 hours', '2-3 hours', '3-4 hours', '2-4 hours', '4-8 hours']
+DURATION_WEIGHTS = [35, 67, 22, 33, 14, 22, 19]
+
+# Spread of attractions around their wilaya seat (degrees, ~15 km)
+CLUSTER_SIGMA_DEG = 0.15
+
+
+def _cities() -> List[Tuple[str, Tuple[float, float]]]:
+    """One entry per seat (the table lists some seats under two spellings)."""
+    seen = {}
+    for name, coords in WILAYA_COORDINATES.items():
+        seen.setdefault(coords, name)
+    return [(name, coords) for coords, name in seen.items()]
+
+
+def _pick(rng: np.random.Generator, values: List, weights: List[float], n: int) -> np.ndarray:
+    p = np.asarray(weights, dtype=np.float64)
+    return rng.choice(len(values), size=n, p=p / p.sum())
+
+
+def make_attractions(n: int, seed: int = 0) -> List[Dict]:
+    """`n` attraction records clustered by wilaya."""
+    rng = np.random.default_rng(seed)
+    cities = _cities()
+    city_idx = _pick(rng, cities, [1.0 / (i + 1) for i in range(len(cities))], n)
+    centers = np.array([coords for _, coords in cities], dtype=np.float64)[city_idx]
+    gps = centers + rng.normal(0.0, CLUSTER_SIGMA_DEG, size=(n, 2))
+    category = _pick(rng, CATEGORIES, CATEGORY_WEIGHTS, n)
+    cost = _pick(rng, COSTS, COST_WEIGHTS, n)
+    duration = _pick(rng, DURATIONS, DURATION_WEIGHTS, n)
+    rating = np.round(rng.uniform(3.0, 5.0, size=n), 1)
+    return [{
+        'name': f'{cities[c][0]} {CATEGORIES[k]} #{i}',
+        'category': CATEGORIES[k],
+        'city': cities[c][0],
+        'gps': [round(float(lat), 6), round(float(lon), 6)],
+        'description': '',
+        'rating': float(r),
+        'cost': COSTS[co],
+        'visit_duration': DURATIONS[d],
+    } for i, (c, k, (lat, lon), r, co, d)
+        in enumerate(zip(city_idx.tolist(), category.tolist(), gps.tolist(), rating.tolist(),
+                         cost.tolist(), duration.tolist()))]
+
+
+def make_hotels(n_attractions: int, seed: int = 0) -> List[Dict]:
+    """About one hotel per ten attractions (at least five per wilaya)."""
+    rng = np.random.default_rng(seed + 1)
+    cities = _cities()
+    n = max(5 * len(cities), n_attractions // 10)
+    city_idx = np.concatenate([np.repeat(np.arange(len(cities)), 5),
+                               _pick(rng, cities, [1.0 / (i + 1) for i in range(len(cities))],
+                                     n - 5 * len(cities))])
+    price = np.round(rng.lognormal(np.log(8000), 0.6, size=n), -1)
+    stars = np.round(rng.uniform(2.0, 5.0, size=n) * 2) / 2
+    return [{
+        'hotel': f'Hotel {cities[c][0]} #{i}',
+        'city': cities[c][0],
+        'price': float(p),
+        'avg_review': float(s),
+    } for i, (c, p, s) in enumerate(zip(city_idx.tolist(), price.tolist(), stars.tolist()))]
+
+
+def write_dataset(directory: str, attractions: List[Dict], hotels: List[Dict]) -> Tuple[str, str]:
+    """Write both datasets as JSON files in `directory`; returns their paths."""
+    attractions_path = os.path.join(directory, 'attractions.json')
+    hotels_path = os.path.join(directory, 'hotels.json')
+    with open(attractions_path, 'w', encoding='utf-8') as f:
+        json.dump(attractions, f)
+    with open(hotels_path, 'w', encoding='utf-8') as f:
+        json.dump(hotels, f)
+    return attractions_path, hotels_path
@@ -0,0 +1,495 @@
+"""
+Columnar attraction catalog and hotel index shared by the planners and the API
+"""
+
+import bisect
+import hashlib
+import math
+import os
+import re
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+
+EARTH_RADIUS_KM = 6371.0
+# Ceiling on the dense n x n float32 distance matrix; 2048 MB is 23170 attractions
+MAX_DISTANCE_MATRIX_MB = float(os.environ.get('MAX_DISTANCE_MATRIX_MB', 2048))
+
+
+class CatalogTooLarge(MemoryError):
+    """The catalog's distance matrix would exceed MAX_DISTANCE_MATRIX_MB."""
+
+
+def distance_matrix_mb(n: int) -> float:
+    """Size in MB of the dense distance matrix of an n-entry catalog."""
+    return n * n * 4 / 2**20
+
+
+def max_catalog_size(limit_mb: float = None) -> int:
+    """Largest catalog whose distance matrix fits in `limit_mb` (default MAX_DISTANCE_MATRIX_MB)."""
+    limit_mb = MAX_DISTANCE_MATRIX_MB if limit_mb is None else limit_mb
+    return math.isqrt(int(limit_mb * 2**20) // 4)
+
+
+def check_distance_matrix(n: int) -> None:
+    """Raise CatalogTooLarge if an n-entry catalog's matrix would exceed the ceiling."""
+    if distance_matrix_mb(n) > MAX_DISTANCE_MATRIX_MB:
+        raise CatalogTooLarge(
+            f"{n} attractions need a {distance_matrix_mb(n):.0f} MB distance matrix, over "
+            f"MAX_DISTANCE_MATRIX_MB={MAX_DISTANCE_MATRIX_MB:.0f} (at most {max_catalog_size()} attractions)")
+
+
+def parse_cost(cost_str: str) -> float:
+    """
+    Convert cost field (e.g., "Free", "400 DZD", "Variable") to a numeric value.
+    - "free" -> 0
+    - "variable" or any non‑numeric -> 0
+    - Otherwise, return the first number found.
+    """
+    s = cost_str.strip().lower()
+    if "free" in s:
+        return 0.0
+    if "variable" in s:
+        # treat Variable as zero cost, but later printed as "Variable", for e.g.: Shopping Malls
+        return 0.0
+    m = re.search(r"(\d+(?:\.\d+)?)", s)
+    if m:
+        return float(m.group(1))
+    # fallback: everything else counts as zero
+    return 0.0
+
+
+def parse_duration(duration_str: str) -> float:
+    """
+    Convert a duration string (e.g., "1-2 hours", "0.5 hour", "3 hours") to a numeric estimate (hours).
+    """
+    duration_str = duration_str.lower().strip()
+    # Matches "2 hours", "0.5 hour", "1-2 hours", etc.
+    m = re.match(r"(\d+(?:\.\d+)?)(?:-(\d+(?:\.\d+)?))?\s*(?:h|hour|hrs?)", duration_str)
+    if m:
+        low = float(m.group(1))
+        if m.group(2):
+            high = float(m.group(2))
+            return (low + high) / 2.0
+        return low
+    # Fallback if nothing matches
+    return 2.0
+
+
+class DistanceMatrix:
+    """
+    Dense float32 haversine distances (km) between every pair of catalog entries.
+
+    Built once per catalog with NumPy broadcasting (in row blocks, so the
+    float64 temporaries stay bounded) and shared read-only by every request
+    and both solvers. `from_point` gives the distance row for an arbitrary
+    location, e.g. the user's start point.
+
+    Passing `matrix` wraps an already computed array (e.g. one living in
+    shared memory) instead of recomputing it. Building one larger than
+    MAX_DISTANCE_MATRIX_MB raises CatalogTooLarge.
+    """
+
+    def __init__(self, lat: np.ndarray, lon: np.ndarray, block: int = 1024,
+                 matrix: np.ndarray | None = None):
+        self._lat = np.radians(np.asarray(lat, dtype=np.float64))
+        self._lon = np.radians(np.asarray(lon, dtype=np.float64))
+        self._cos_lat = np.cos(self._lat)
+
+        n = len(self._lat)
+        if matrix is not None:
+            if matrix.shape != (n, n):
+                raise ValueError(f"distance matrix shape {matrix.shape} does not match {n} entries")
+            self.matrix = matrix
+            self.matrix.setflags(write=False)
+            return
+        check_distance_matrix(n)
+        self.matrix = np.empty((n, n), dtype=np.float32)
+        for start in range(0, n, block):
+            stop = min(n, start + block)
+            self.matrix[start:stop] = self._haversine_from(
+                self._lat[start:stop, None],
+                self._lon[start:stop, None],
+                self._cos_lat[start:stop, None],
+            )
+        self.matrix.setflags(write=False)
+
+    def _haversine_from(self, lat0, lon0, cos_lat0) -> np.ndarray:
+        a = (np.sin((self._lat - lat0) / 2) ** 2 +
+             cos_lat0 * self._cos_lat * np.sin((self._lon - lon0) / 2) ** 2)
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    def __getitem__(self, key):
+        return self.matrix[key]
+
+    def from_point(self, lat: float, lon: float) -> np.ndarray:
+        """Distances (km) from an arbitrary location to every catalog entry."""
+        lat0 = math.radians(float(lat))
+        row = self._haversine_from(lat0, math.radians(float(lon)), math.cos(lat0))
+        return row.astype(np.float32)
+
+
+class SpatialIndex:
+    """
+    Uniform latitude/longitude grid over a set of points, for radius and
+    k-nearest queries without computing a distance to every point.
+
+    Point IDs are sorted by grid cell, so each occupied cell is one slice of
+    `ids`. A query selects the occupied cells overlapping the bounding box
+    of its circle (vectorized over the occupied cells, never over the empty
+    ones) and runs the exact haversine only on the points in them.
+    """
+
+    def __init__(self, lat: np.ndarray, lon: np.ndarray, cell_deg: float = 0.25):
+        self.cell_deg = cell_deg
+        self._lat = np.radians(np.asarray(lat, dtype=np.float64))
+        self._lon = np.radians(np.asarray(lon, dtype=np.float64))
+        self._cos_lat = np.cos(self._lat)
+
+        rows = np.floor((np.asarray(lat, dtype=np.float64) + 90.0) / cell_deg).astype(np.int64)
+        cols = np.floor((np.asarray(lon, dtype=np.float64) + 180.0) / cell_deg).astype(np.int64)
+        self._n_cols = int(math.ceil(360.0 / cell_deg)) + 1
+        keys = rows * self._n_cols + cols
+        self.ids = np.argsort(keys, kind='stable')
+        cell_keys, starts = np.unique(keys[self.ids], return_index=True)
+        self._cell_rows = cell_keys // self._n_cols
+        self._cell_cols = cell_keys % self._n_cols
+        self._starts = starts
+        self._stops = np.append(starts[1:], len(self.ids))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _distances(self, lat: float, lon: float, ids: np.ndarray) -> np.ndarray:
+        lat0, lon0 = math.radians(float(lat)), math.radians(float(lon))
+        a = (np.sin((self._lat[ids] - lat0) / 2) ** 2 +
+             math.cos(lat0) * self._cos_lat[ids] * np.sin((self._lon[ids] - lon0) / 2) ** 2)
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    def _box_ids(self, lat: float, lon: float, radius_km: float) -> np.ndarray:
+        """IDs in the occupied cells overlapping the bounding box of the circle."""
+        dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+        row_lo = math.floor((lat - dlat + 90.0) / self.cell_deg)
+        row_hi = math.floor((lat + dlat + 90.0) / self.cell_deg)
+        in_box = (self._cell_rows >= row_lo) & (self._cell_rows <= row_hi)
+        # near the poles or across the antimeridian, keep every longitude
+        max_lat = min(90.0, abs(lat) + dlat)
+        if max_lat < 89.0:
+            dlon = math.degrees(radius_km / (EARTH_RADIUS_KM * math.cos(math.radians(max_lat))))
+            if lon - dlon > -180.0 and lon + dlon < 180.0:
+                col_lo = math.floor((lon - dlon + 180.0) / self.cell_deg)
+                col_hi = math.floor((lon + dlon + 180.0) / self.cell_deg)
+                in_box &= (self._cell_cols >= col_lo) & (self._cell_cols <= col_hi)
+        cells = np.flatnonzero(in_box)
+        if not len(cells):
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([self.ids[self._starts[c]:self._stops[c]] for c in cells.tolist()])
+
+    def within(self, lat: float, lon: float, radius_km: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Points at most `radius_km` from (lat, lon).
+
+        Returns:
+            (ids, distances_km), nearest first.
+        """
+        ids = self._box_ids(lat, lon, max(0.0, float(radius_km)))
+        dist = self._distances(lat, lon, ids)
+        keep = dist <= radius_km
+        ids, dist = ids[keep], dist[keep]
+        order = np.lexsort((ids, dist))
+        return ids[order], dist[order]
+
+    def nearest(self, lat: float, lon: float, k: int,
+                mask: np.ndarray | None = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The `k` points closest to (lat, lon), widening the search radius
+        until it holds k points (or all of them). With a boolean `mask`
+        over the IDs, only points where it is True are counted.
+
+        Returns:
+            (ids, distances_km), nearest first.
+        """
+        k = min(int(k), len(self.ids) if mask is None else int(mask.sum()))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        radius = self.cell_deg * 111.0
+        while True:
+            ids, dist = self.within(lat, lon, radius)
+            if mask is not None:
+                keep = mask[ids]
+                ids, dist = ids[keep], dist[keep]
+            if len(ids) >= k or radius >= math.pi * EARTH_RADIUS_KM:
+                return ids[:k], dist[:k]
+            radius *= 2.0
+
+
+class AttractionCatalog:
+    """
+    Array-backed view of the attractions dataset.
+
+    Every attraction gets an integer ID (its position in `records`). Numeric
+    attributes live in parallel NumPy columns, so the planners resolve an
+    attraction with an array index instead of scanning the list of dicts.
+    Cost and duration strings are parsed once here.
+
+    `source` is the compiled catalog file the columns are mapped from (see
+    `from_columns` and compiled_catalog.py), None when built from records.
+    """
+
+    def __init__(self, attractions: Sequence[Dict], version: int | None = None):
+        records: List[Dict] = list(attractions)
+        n = len(records)
+        gps = np.array([a['gps'][:2] for a in records], dtype=np.float64).reshape(n, 2)
+        categories = sorted({a.get('category', 'Unknown') for a in records})
+        category_index = {c: i for i, c in enumerate(categories)}
+        cities = sorted({a.get('city', 'Unknown') for a in records})
+        city_index = {c: i for i, c in enumerate(cities)}
+        self._init_columns(
+            records,
+            version if version is not None else _fingerprint(records),
+            names=[a['name'] for a in records],
+            lat=np.ascontiguousarray(gps[:, 0]),
+            lon=np.ascontiguousarray(gps[:, 1]),
+            visit_hours=np.array([parse_duration(a.get('visit_duration', '')) for a in records], dtype=np.float64),
+            ticket_dzd=np.array([parse_cost(a.get('cost', '0')) for a in records], dtype=np.float64),
+            rating=np.array([float(a.get('rating', 3.0)) for a in records], dtype=np.float64),
+            categories=categories,
+            category_id=np.array([category_index[a.get('category', 'Unknown')] for a in records], dtype=np.int32),
+            cities=cities,
+            city_id=np.array([city_index[a.get('city', 'Unknown')] for a in records], dtype=np.int32),
+        )
+
+    @classmethod
+    def from_columns(cls, records: Sequence[Dict], version: int, *, names: Sequence[str],
+                     lat: np.ndarray, lon: np.ndarray, visit_hours: np.ndarray, ticket_dzd: np.ndarray,
+                     rating: np.ndarray, categories: List[str], category_id: np.ndarray,
+                     cities: List[str], city_id: np.ndarray, source: str | None = None) -> 'AttractionCatalog':
+        """
+        Catalog over columns computed elsewhere, e.g. read-only views of a
+        compiled catalog file. Nothing is parsed; `records` may be a lazy
+        sequence and is only indexed. `categories`/`cities` must be sorted,
+        with `category_id`/`city_id` indexing into them.
+        """
+        catalog = cls.__new__(cls)
+        catalog._init_columns(records, version, names=names, lat=lat, lon=lon, visit_hours=visit_hours,
+                              ticket_dzd=ticket_dzd, rating=rating, categories=categories,
+                              category_id=category_id, cities=cities, city_id=city_id, source=source)
+        return catalog
+
+    def _init_columns(self, records, version, *, names, lat, lon, visit_hours, ticket_dzd, rating,
+                      categories, category_id, cities, city_id, source=None) -> None:
+        self.records: Sequence[Dict] = records
+        self.version = version
+        self.source = source
+
+        self.names: Sequence[str] = names
+        self._id_by_name: Dict[str, int] | None = None
+
+        self.lat = lat
+        self.lon = lon
+        self.visit_hours = visit_hours
+        self.ticket_dzd = ticket_dzd
+        self.rating = rating
+
+        self.categories: List[str] = categories
+        self.category_index: Dict[str, int] = {c: i for i, c in enumerate(self.categories)}
+        self.category_id = category_id
+
+        self.cities: List[str] = cities
+        self.city_index: Dict[str, int] = {c: i for i, c in enumerate(self.cities)}
+        self.city_id = city_id
+
+        self._distances: DistanceMatrix | None = None
+        self._spatial: SpatialIndex | None = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @property
+    def id_by_name(self) -> Dict[str, int]:
+        """Name -> ID (of the first attraction with that name), built on first use."""
+        if self._id_by_name is None:
+            with self._lock:
+                if self._id_by_name is None:
+                    id_by_name = {}
+                    for i, name in enumerate(self.names):
+                        id_by_name.setdefault(name, i)
+                    self._id_by_name = id_by_name
+        return self._id_by_name
+
+    @property
+    def distances(self) -> DistanceMatrix:
+        """Pairwise distance matrix, computed on first use and then shared."""
+        if self._distances is None:
+            with self._lock:
+                if self._distances is None:
+                    self._distances = DistanceMatrix(self.lat, self.lon)
+        return self._distances
+
+    @property
+    def spatial(self) -> SpatialIndex:
+        """Grid index over the attraction locations, built on first use and then shared."""
+        if self._spatial is None:
+            with self._lock:
+                if self._spatial is None:
+                    self._spatial = SpatialIndex(self.lat, self.lon)
+        return self._spatial
+
+    def use_distances(self, matrix: np.ndarray) -> None:
+        """Adopt a precomputed n×n distance array instead of building one."""
+        with self._lock:
+            self._distances = DistanceMatrix(self.lat, self.lon, matrix=matrix)
+
+    def gps(self, att_id: int) -> List[float]:
+        """Return [lat, lon] of an attraction as plain floats."""
+        return [float(self.lat[att_id]), float(self.lon[att_id])]
+
+    def city_of(self, att_id: int) -> str:
+        return self.cities[self.city_id[att_id]]
+
+    def category_of(self, att_id: int) -> str:
+        return self.categories[self.category_id[att_id]]
+
+    def ids_for_names(self, names: Iterable[str]) -> np.ndarray:
+        """Map attraction names to IDs, silently dropping unknown names."""
+        ids = [self.id_by_name[n] for n in names if n in self.id_by_name]
+        return np.array(ids, dtype=np.int64)
+
+    def ids_for_records(self, records: Iterable[Dict]) -> np.ndarray:
+        return self.ids_for_names(a['name'] for a in records)
+
+    def category_mask(self, categories: Iterable[str]) -> np.ndarray:
+        """Boolean mask over all IDs, True where the category is in `categories`."""
+        wanted = [self.category_index[c] for c in categories if c in self.category_index]
+        return np.isin(self.category_id, np.array(wanted, dtype=np.int32))
+
+
+def _fingerprint(records: Sequence[Dict]) -> int:
+    """Content hash over the fields the catalog columns are built from.
+
+    Stable across processes (unlike `hash()` on strings), so it can be used
+    as a dataset version.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    for a in records:
+        digest.update(repr((a.get('name'), tuple(a.get('gps', ())), a.get('cost'),
+                            a.get('visit_duration'), a.get('rating'), a.get('category'),
+                            a.get('city'))).encode('utf-8'))
+    return int.from_bytes(digest.digest(), 'big')
+
+
+_CATALOG_CACHE: "OrderedDict[int, AttractionCatalog]" = OrderedDict()
+_CATALOG_CACHE_SIZE = 4
+_CATALOG_CACHE_LOCK = threading.Lock()
+
+
+def catalog_for(records: Sequence[Dict]) -> AttractionCatalog:
+    """Return the catalog for a dataset, building it only the first time it is seen."""
+    key = _fingerprint(records)
+    with _CATALOG_CACHE_LOCK:
+        catalog = _CATALOG_CACHE.get(key)
+        if catalog is not None:
+            _CATALOG_CACHE.move_to_end(key)
+            return catalog
+    # built outside the lock; if two threads race, the first one stored wins
+    catalog = AttractionCatalog(records, version=key)
+    with _CATALOG_CACHE_LOCK:
+        catalog = _CATALOG_CACHE.setdefault(key, catalog)
+        _CATALOG_CACHE.move_to_end(key)
+        while len(_CATALOG_CACHE) > _CATALOG_CACHE_SIZE:
+            _CATALOG_CACHE.popitem(last=False)
+    return catalog
+
+
+def normalize_city(city: str) -> str:
+    """Key used to match city names between datasets (case and padding insensitive)."""
+    return city.strip().lower()
+
+
+class HotelIndex:
+    """
+    Hotels grouped by normalized city, each group sorted by nightly price.
+
+    Every group keeps parallel NumPy columns (record index, price, stars),
+    so a price cap is a bisect and a star range is a vectorized mask over
+    the affordable prefix. Hotels without a city or a numeric price cannot
+    be matched and are left out.
+    """
+
+    def __init__(self, hotels: Sequence[Dict]):
+        hotels = list(hotels)
+        matchable = [isinstance(h.get('city'), str) and isinstance(h.get('price'), (int, float)) for h in hotels]
+        self._build(
+            hotels,
+            [h['city'] if ok else None for h, ok in zip(hotels, matchable)],
+            np.array([h['price'] if ok else np.nan for h, ok in zip(hotels, matchable)], dtype=np.float64),
+            np.array([float(h.get('avg_review', np.nan)) for h in hotels], dtype=np.float64),
+        )
+
+    @classmethod
+    def from_columns(cls, hotels: Sequence[Dict], cities: Sequence[str | None], prices: np.ndarray,
+                     stars: np.ndarray) -> 'HotelIndex':
+        """
+        Index over per-hotel columns computed elsewhere (e.g. a compiled
+        catalog): city (None when unmatchable), price and rating (NaN when
+        missing). `hotels` is only indexed, so it may be a lazy sequence.
+        """
+        index = cls.__new__(cls)
+        index._build(hotels, cities, prices, stars)
+        return index
+
+    def _build(self, hotels: Sequence[Dict], cities: Sequence[str | None], prices: np.ndarray,
+               stars: np.ndarray) -> None:
+        self.hotels: Sequence[Dict] = hotels
+        groups = defaultdict(list)
+        for i, city in enumerate(cities):
+            if city is not None:
+                groups[normalize_city(city)].append(i)
+
+        self._by_city: Dict[str, Tuple[np.ndarray, List[float], np.ndarray, np.ndarray]] = {}
+        for city, ids in groups.items():
+            ids = np.array(ids, dtype=np.int64)
+            ids = ids[np.argsort(prices[ids], kind='stable')]  # stable: ties keep dataset order
+            group_prices = np.ascontiguousarray(prices[ids], dtype=np.float64)
+            self._by_city[city] = (ids, group_prices.tolist(), group_prices,
+                                   np.ascontiguousarray(stars[ids], dtype=np.float64))
+
+    def __len__(self) -> int:
+        return len(self.hotels)
+
+    def select(self, city: str, max_price: float, min_stars: float,
+               max_stars: float) -> Tuple[List[Dict], bool]:
+        """
+        Pick the cheapest, middle and most expensive hotel in `city` costing
+        at most `max_price`, preferring those rated within [min_stars, max_stars].
+
+        Returns:
+            (hotels, relaxed): up to three hotels in price order, and True if
+            none matched the star range so the star filter was dropped (ties
+            in price are then broken by closeness to the middle of the range).
+        """
+        group = self._by_city.get(normalize_city(city))
+        if group is None:
+            return [], False
+        ids, price_list, prices, stars = group
+        cut = bisect.bisect_right(price_list, max_price)
+        if cut == 0:
+            return [], False
+
+        affordable_stars = stars[:cut]
+        picked = np.flatnonzero((affordable_stars >= min_stars) & (affordable_stars <= max_stars))
+        relaxed = picked.size == 0
+        if relaxed:
+            # lexsort is stable: order by price, then distance to the preferred rating
+            picked = np.lexsort((np.abs(affordable_stars - (min_stars + max_stars) / 2), prices[:cut]))
+
+        if picked.size >= 3:
+            picked = picked[[0, picked.size // 2, -1]]
+        return [self.hotels[i] for i in ids[picked]], relaxed
@@ -0,0 +1,405 @@
+"""
+Compiled binary catalog: both datasets in one file, loaded with mmap
+
+`compile_catalog` turns the normalized attraction and hotel records into a
+single file holding fixed-width NumPy columns (positions, ratings, prices,
+and the visit hours and ticket prices already parsed by `parse_duration`/
+`parse_cost`), a deduplicated string table for names, categories and
+cities, and each record as JSON text. `CompiledCatalog` maps the file
+read-only and wraps the columns as zero-copy array views: opening it parses
+nothing, records are decoded only when a response needs one, and every
+process mapping the file (gunicorn workers, solver workers) shares the same
+physical pages through the page cache.
+
+Layout (little-endian, every section aligned to 8 bytes):
+
+    magic             8 bytes, MAGIC
+    format, toc size  2 x uint32
+    toc               JSON: dataset version, source file digests, record
+                      counts and {section: [offset, dtype, length]}, with
+                      offsets relative to the first section
+    sections          raw column data
+
+The file is written to a temporary name and renamed into place, so a
+process still mapping the previous catalog keeps reading a consistent file.
+
+Compile it whenever the JSON datasets change:
+
+    python compiled_catalog.py [--attractions PATH] [--hotels PATH] [--output PATH]
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import mmap
+import os
+import struct
+from collections.abc import Sequence as SequenceABC
+from pathlib import Path
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from catalog import AttractionCatalog, HotelIndex
+from gazetteer import Gazetteer
+from record_index import RecordIndex
+
+MAGIC = b'7WCATLG\x00'
+FORMAT_VERSION = 1
+_HEADER = struct.Struct('<II')
+_ALIGN = 8
+
+BASE_DIR = Path(__file__).resolve().parent
+DEFAULT_ATTRACTIONS = BASE_DIR / '..' / 'Data' / 'attractions.json'
+DEFAULT_HOTELS = BASE_DIR / '..' / 'Data' / 'cleaned_hotels.json'
+DEFAULT_OUTPUT = BASE_DIR / '..' / 'Data' / 'catalog.bin'
+
+
+def _aligned(n: int) -> int:
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def source_digest(path: str) -> Dict[str, Any]:
+    """Size and content hash of a dataset file, recorded to tell when a catalog is stale."""
+    digest = hashlib.blake2b(digest_size=16)
+    size = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+            size += len(chunk)
+    return {'size': size, 'digest': digest.hexdigest()}
+
+
+def is_compiled_catalog(path: str) -> bool:
+    """True if `path` starts with the compiled catalog magic."""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+# -------- Writing --------
+
+class _TextTable:
+    """Strings stored back to back, optionally deduplicated, for writing."""
+
+    def __init__(self, dedupe: bool):
+        self.dedupe = dedupe
+        self._ids: Dict[str, int] = {}
+        self._chunks: List[bytes] = []
+        self._offsets = [0]
+
+    def add(self, text: str) -> int:
+        if self.dedupe and text in self._ids:
+            return self._ids[text]
+        encoded = text.encode('utf-8')
+        self._chunks.append(encoded)
+        self._offsets.append(self._offsets[-1] + len(encoded))
+        sid = len(self._chunks) - 1
+        if self.dedupe:
+            self._ids[text] = sid
+        return sid
+
+    def sections(self, prefix: str) -> Dict[str, np.ndarray]:
+        return {
+            f'{prefix}.offsets': np.array(self._offsets, dtype='<u8'),
+            f'{prefix}.data': np.frombuffer(b''.join(self._chunks), dtype='u1'),
+        }
+
+
+def _string_column(strings: _TextTable, records: Sequence[Dict], field: str) -> np.ndarray:
+    """String IDs of `field` per record, -1 when it is missing."""
+    ids = []
+    for r in records:
+        value = r.get(field)
+        if value is None:
+            ids.append(-1)
+        elif isinstance(value, str):
+            ids.append(strings.add(value))
+        else:
+            raise ValueError(f"{field} of {r.get('name') or r.get('hotel')!r} must be a string, "
+                             f"got {type(value).__name__}")
+    return np.array(ids, dtype='<i4')
+
+
+def _number(value) -> float:
+    return float(value) if isinstance(value, (int, float)) else math.nan
+
+
+def compile_catalog(attractions: Sequence[Dict], hotels: Sequence[Dict], path: str,
+                    sources: Dict[str, Dict[str, Any]] | None = None) -> Dict[str, Any]:
+    """
+    Write normalized attraction and hotel records as a compiled catalog.
+
+    Args:
+        attractions, hotels: Records as `DataStore` normalizes them.
+        path: Output file, replaced atomically.
+        sources: `source_digest` of the dataset files per dataset name
+            ("attractions", "hotels"), used by `DataStore` to detect a
+            stale catalog.
+
+    Returns:
+        dict: The table of contents written to the file.
+    """
+    catalog = AttractionCatalog(attractions)
+    strings = _TextTable(dedupe=True)
+    texts = {'attractions': _TextTable(dedupe=False), 'hotels': _TextTable(dedupe=False)}
+    for name, records in (('attractions', catalog.records), ('hotels', hotels)):
+        for r in records:
+            texts[name].add(json.dumps(r, ensure_ascii=False, separators=(',', ':')))
+
+    columns = {
+        'attractions.name': _string_column(strings, catalog.records, 'name'),
+        'attractions.category': _string_column(strings, catalog.records, 'category'),
+        'attractions.city': _string_column(strings, catalog.records, 'city'),
+        'attractions.wilaya': _string_column(strings, catalog.records, 'wilaya'),
+        'attractions.lat': catalog.lat.astype('<f8'),
+        'attractions.lon': catalog.lon.astype('<f8'),
+        'attractions.visit_hours': catalog.visit_hours.astype('<f8'),
+        'attractions.ticket_dzd': catalog.ticket_dzd.astype('<f8'),
+        'attractions.rating': catalog.rating.astype('<f8'),
+        'hotels.city': _string_column(strings, hotels, 'city'),
+        'hotels.wilaya': _string_column(strings, hotels, 'wilaya'),
+        'hotels.price': np.array([_number(h.get('price')) for h in hotels], dtype='<f8'),
+        'hotels.avg_review': np.array([_number(h.get('avg_review')) for h in hotels], dtype='<f8'),
+    }
+    columns.update(strings.sections('strings'))
+    columns.update(texts['attractions'].sections('attractions.records'))
+    columns.update(texts['hotels'].sections('hotels.records'))
+
+    toc: Dict[str, Any] = {
+        'version': catalog.version,
+        'sources': dict(sources or {}),
+        'counts': {'attractions': len(catalog), 'hotels': len(hotels)},
+        'sections': {},
+    }
+    offset = 0
+    for name, array in columns.items():
+        toc['sections'][name] = [offset, array.dtype.str, int(array.size)]
+        offset = _aligned(offset + array.nbytes)
+    encoded_toc = json.dumps(toc, separators=(',', ':')).encode('utf-8')
+    base = _aligned(len(MAGIC) + _HEADER.size + len(encoded_toc))
+
+    tmp = f'{path}.tmp-{os.getpid()}'
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(MAGIC + _HEADER.pack(FORMAT_VERSION, len(encoded_toc)) + encoded_toc)
+            for name, array in columns.items():
+                f.seek(base + toc['sections'][name][0])
+                f.write(array.tobytes())
+            f.truncate(base + offset)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return toc
+
+
+# -------- Reading --------
+
+class StringTable(SequenceABC):
+    """Read-only view of UTF-8 strings stored back to back, decoded on access."""
+
+    def __init__(self, offsets: np.ndarray, data: np.ndarray):
+        self._offsets = offsets
+        self._data = memoryview(data)
+        self._len = len(offsets) - 1
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __getitem__(self, i: int) -> str:
+        i = int(i)
+        if i < 0:
+            i += self._len
+        if not 0 <= i < self._len:
+            raise IndexError('string index out of range')
+        return str(self._data[int(self._offsets[i]):int(self._offsets[i + 1])], 'utf-8')
+
+
+
+class StringColumn(SequenceABC):
+    """Per-record view of a string ID column, decoding a value when it is read (-1 gives None)."""
+
+    def __init__(self, strings: StringTable, ids: np.ndarray):
+        self._strings = strings
+        self._ids = ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __getitem__(self, i: int) -> str | None:
+        sid = int(self._ids[i])
+        return None if sid < 0 else self._strings[sid]
+
+
+class JsonRecords(SequenceABC):
+    """Records stored as JSON text; each access decodes a fresh dict."""
+
+    def __init__(self, texts: StringTable):
+        self._texts = texts
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return json.loads(self._texts[i])
+
+
+class CompiledCatalog:
+    """
+    A compiled catalog file mapped read-only.
+
+    `column` returns zero-copy NumPy views of the mapping; the other
+    methods build the planner catalog and the API indexes from those
+    columns without decoding a single record. `attraction_records` and
+    `hotel_records` decode records lazily.
+    """
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        with open(self.path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        head = len(MAGIC) + _HEADER.size
+        if len(self._map) < head or self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f'{self.path} is not a compiled catalog')
+        fmt, toc_size = _HEADER.unpack(self._map[len(MAGIC):head])
+        if fmt != FORMAT_VERSION:
+            raise ValueError(f'{self.path} has catalog format {fmt}, expected {FORMAT_VERSION}')
+        toc = json.loads(self._map[head:head + toc_size].decode('utf-8'))
+        self._base = _aligned(head + toc_size)
+        self._sections: Dict[str, List] = toc['sections']
+        self.version: int = toc['version']
+        self.sources: Dict[str, Dict[str, Any]] = toc['sources']
+        self.counts: Dict[str, int] = toc['counts']
+
+        self.strings = self._table('strings')
+        self.attraction_records = JsonRecords(self._table('attractions.records'))
+        self.hotel_records = JsonRecords(self._table('hotels.records'))
+
+    def column(self, name: str) -> np.ndarray:
+        """Read-only array view of a section."""
+        offset, dtype, length = self._sections[name]
+        return np.frombuffer(self._map, dtype=np.dtype(dtype), count=length, offset=self._base + offset)
+
+    def _table(self, prefix: str) -> StringTable:
+        return StringTable(self.column(f'{prefix}.offsets'), self.column(f'{prefix}.data'))
+
+    def is_current(self, name: str, path: str | None) -> bool:
+        """True unless the dataset file at `path` differs from the one this catalog was compiled from."""
+        if path is None:
+            return True
+        recorded = self.sources.get(name)
+        if recorded is None or os.stat(path).st_size != recorded['size']:
+            return False
+        return source_digest(path) == recorded
+
+    def factor(self, name: str, missing: str | None = None) -> Tuple[List[str], np.ndarray]:
+        """
+        Distinct values of a string column sorted by `str`, and each
+        record's code into them. Records without a value get the code of
+        `missing`, or -1 when it is None.
+        """
+        sids = self.column(name).astype(np.int64)
+        present = np.unique(sids) if missing is not None else np.unique(sids[sids >= 0])
+        texts = [missing if sid < 0 else self.strings[sid] for sid in present.tolist()]
+        values = sorted(set(texts), key=str)
+        code_of = {v: c for c, v in enumerate(values)}
+        codes = np.full(len(sids), -1, dtype=np.int64)
+        known = sids >= 0 if missing is None else slice(None)
+        codes[known] = np.array([code_of[t] for t in texts], dtype=np.int64)[np.searchsorted(present, sids[known])]
+        return values, codes
+
+    def attraction_catalog(self) -> AttractionCatalog:
+        """Planner catalog over the mapped columns, equal to `AttractionCatalog(records)`."""
+        categories, category_id = self.factor('attractions.category', missing='Unknown')
+        cities, city_id = self.factor('attractions.city', missing='Unknown')
+        return AttractionCatalog.from_columns(
+            self.attraction_records, self.version,
+            names=StringColumn(self.strings, self.column('attractions.name')),
+            lat=self.column('attractions.lat'),
+            lon=self.column('attractions.lon'),
+            visit_hours=self.column('attractions.visit_hours'),
+            ticket_dzd=self.column('attractions.ticket_dzd'),
+            rating=self.column('attractions.rating'),
+            categories=categories, category_id=category_id.astype(np.int32),
+            cities=cities, city_id=city_id.astype(np.int32),
+            source=self.path,
+        )
+
+    def hotel_index(self) -> HotelIndex:
+        cities, codes = self.factor('hotels.city')
+        prices = self.column('hotels.price')
+        matchable = (codes >= 0) & ~np.isnan(prices)
+        return HotelIndex.from_columns(
+            self.hotel_records,
+            [cities[c] if ok else None for c, ok in zip(codes.tolist(), matchable.tolist())],
+            prices, self.column('hotels.avg_review'))
+
+    def attraction_query(self) -> RecordIndex:
+        """Same index as `record_index.attraction_index` over the records."""
+        return RecordIndex.from_codes(self.attraction_records, {
+            'city': self.factor('attractions.city'),
+            'wilaya': self.factor('attractions.wilaya'),
+            'category': self.factor('attractions.category', missing='Unknown'),
+        })
+
+    def hotel_query(self) -> RecordIndex:
+        """Same index as `record_index.hotel_query_index` over the records."""
+        cities, city_codes = self.factor('hotels.city')
+        if '' in cities:  # an empty city counts as none
+            empty = cities.index('')
+            cities = cities[:empty] + cities[empty + 1:]
+            city_codes = np.where(city_codes == empty, -1, np.where(city_codes > empty, city_codes - 1, city_codes))
+        stars = self.column('hotels.avg_review')
+        rated = ~np.isnan(stars)
+        buckets = np.floor(stars[rated]).astype(np.int64)
+        values = sorted(set(buckets.tolist()), key=str)
+        code_of = {b: c for c, b in enumerate(values)}
+        star_codes = np.full(len(stars), -1, dtype=np.int64)
+        star_codes[rated] = np.array([code_of[b] for b in buckets.tolist()], dtype=np.int64)
+        return RecordIndex.from_codes(self.hotel_records, {
+            'city': (cities, city_codes),
+            'wilaya': self.factor('hotels.wilaya'),
+            'stars': (values, star_codes),
+        }, numeric={'avg_review': stars})
+
+    def gazetteer(self) -> Gazetteer:
+        cities, codes = self.factor('attractions.city')
+        hotel_cities, _ = self.factor('hotels.city')
+        return Gazetteer.from_columns(cities, codes, self.column('attractions.lat'),
+                                      self.column('attractions.lon'), hotel_cities)
+
+
+def open_catalog(path: str) -> CompiledCatalog:
+    """Map a compiled catalog file."""
+    return CompiledCatalog(path)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description='Compile the JSON datasets into a binary catalog.')
+    parser.add_argument('--attractions', default=str(DEFAULT_ATTRACTIONS), help='attractions JSON file')
+    parser.add_argument('--hotels', default=str(DEFAULT_HOTELS), help='hotels JSON file')
+    parser.add_argument('--output', default=str(DEFAULT_OUTPUT), help='catalog file to write')
+    args = parser.parse_args(argv)
+
+    # imported here: data_store loads compiled catalogs, so it imports this module
+    from data_store import read_datasets
+    attractions, hotels = read_datasets(args.attractions, args.hotels)
+    toc = compile_catalog(attractions, hotels, args.output, sources={
+        'attractions': source_digest(args.attractions),
+        'hotels': source_digest(args.hotels),
+    })
+    print(f"Wrote {args.output}: {toc['counts']['attractions']} attractions, "
+          f"{toc['counts']['hotels']} hotels, {os.path.getsize(args.output)} bytes")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
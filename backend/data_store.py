@@ -0,0 +1,262 @@
+"""
+Process-wide, load-once access to the attractions and hotels datasets
+
+`DataStore` parses the JSON files once, normalizes them and publishes an
+immutable `DataSnapshot`. A background thread polls the files' mtimes and,
+when one changes, builds a new snapshot and swaps it in with a single
+reference assignment, so request handlers never touch the disk and always
+see a consistent set of records and the indexes built from them.
+
+When a compiled catalog (see compiled_catalog.py) compiled from the current
+JSON files is found, the snapshot is built from its memory-mapped columns
+instead and records are decoded only when read.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Sequence, Tuple
+
+from catalog import AttractionCatalog, HotelIndex, catalog_for
+from compiled_catalog import CompiledCatalog, source_digest
+from gazetteer import Gazetteer
+from record_index import RecordIndex, attraction_index, hotel_query_index
+
+logger = logging.getLogger(__name__)
+
+# Seconds between mtime checks of the watcher thread
+DATA_RELOAD_POLL_SEC = float(os.environ.get('DATA_RELOAD_POLL_SEC', 2.0))
+
+
+def _normalize_attractions(raw) -> List[Dict]:
+    """Keep well-formed attraction records (a name and at least lat/lon GPS)."""
+    if not isinstance(raw, list):
+        return []
+    out = []
+    for a in raw:
+        if not isinstance(a, dict) or not a.get('name'):
+            continue
+        gps = a.get('gps')
+        if not isinstance(gps, (list, tuple)) or len(gps) < 2:
+            logger.warning("Skipping attraction without GPS: %s", a.get('name'))
+            continue
+        out.append(a)
+    return out
+
+
+def _normalize_hotels(raw) -> List[Dict]:
+    """Keep hotel records and make `avg_review`/`price` numeric where present."""
+    if not isinstance(raw, list):
+        return []
+    out = []
+    for h in raw:
+        if not isinstance(h, dict):
+            continue
+        h = dict(h)
+        for field in ('avg_review', 'price'):
+            if field in h and not isinstance(h[field], (int, float)):
+                try:
+                    h[field] = float(h[field])
+                except (TypeError, ValueError):
+                    h.pop(field)
+        out.append(h)
+    return out
+
+
+def dataset_fingerprint(digests: Dict[str, object]) -> int:
+    """Stable 63-bit ID of the dataset contents, the same in every process and after restarts."""
+    blob = json.dumps(digests, sort_keys=True, default=str).encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(blob, digest_size=8).digest(), 'big') >> 1
+
+
+def read_datasets(attractions_path: str | None, hotels_path: str | None) -> Tuple[List[Dict], List[Dict]]:
+    """Parse and normalize both JSON datasets; a missing path gives an empty dataset."""
+    datasets = []
+    for path, normalize in ((attractions_path, _normalize_attractions), (hotels_path, _normalize_hotels)):
+        if path is None:
+            datasets.append([])
+            continue
+        with open(path, encoding='utf-8') as f:
+            datasets.append(normalize(json.load(f)))
+    return datasets[0], datasets[1]
+
+
+class DataSnapshot:
+    """
+    One immutable, versioned view of both datasets.
+
+    `attractions`/`hotels` are sequences of records that must be treated as
+    read-only; `catalog` is the columnar catalog built from `attractions` and
+    `hotel_index` the per-city price index over `hotels`. `attraction_query`
+    and `hotel_query` are the inverted indexes behind the listing endpoints;
+    `gazetteer` resolves place names, with the datasets' cities as aliases.
+
+    The catalog and indexes are built from the records unless passed in
+    prebuilt (see `from_compiled`).
+
+    `version` counts the reloads of this process; `fingerprint` is derived
+    from the dataset contents (the `source_digest` of each file, or the
+    records when there are no files), so it identifies the data across
+    worker processes and restarts.
+    """
+    __slots__ = ('version', 'attractions', 'hotels', 'catalog', 'hotel_index',
+                 'attraction_query', 'hotel_query', 'gazetteer', 'sources', 'fingerprint', 'loaded_at')
+
+    def __init__(self, version: int, attractions: Sequence[Dict], hotels: Sequence[Dict],
+                 sources: Dict[str, Tuple[str, float]], *, catalog: AttractionCatalog | None = None,
+                 hotel_index: HotelIndex | None = None, attraction_query: RecordIndex | None = None,
+                 hotel_query: RecordIndex | None = None, gazetteer: Gazetteer | None = None,
+                 fingerprint: int | None = None):
+        _set = object.__setattr__
+        _set(self, 'version', version)
+        _set(self, 'attractions', attractions if catalog is not None else tuple(attractions))
+        _set(self, 'hotels', hotels if hotel_index is not None else tuple(hotels))
+        _set(self, 'catalog', catalog if catalog is not None else catalog_for(self.attractions))
+        _set(self, 'hotel_index', hotel_index if hotel_index is not None else HotelIndex(self.hotels))
+        _set(self, 'attraction_query', attraction_query if attraction_query is not None
+             else attraction_index(self.attractions))
+        _set(self, 'hotel_query', hotel_query if hotel_query is not None else hotel_query_index(self.hotels))
+        _set(self, 'gazetteer', gazetteer if gazetteer is not None else Gazetteer(self.attractions, self.hotels))
+        _set(self, 'sources', dict(sources))
+        if fingerprint is None:
+            files = {name: sources[name][0] for name in ('attractions', 'hotels') if sources.get(name)}
+            if files:
+                fingerprint = dataset_fingerprint({name: source_digest(path) for name, path in files.items()})
+            else:
+                fingerprint = dataset_fingerprint({'attractions': self.catalog.version, 'hotels': list(self.hotels)})
+        _set(self, 'fingerprint', fingerprint)
+        _set(self, 'loaded_at', time.time())
+
+    @classmethod
+    def from_compiled(cls, version: int, compiled: CompiledCatalog,
+                      sources: Dict[str, Tuple[str, float]]) -> 'DataSnapshot':
+        """Snapshot over a compiled catalog: indexes from its columns, records decoded lazily."""
+        return cls(version, compiled.attraction_records, compiled.hotel_records, sources,
+                   catalog=compiled.attraction_catalog(), hotel_index=compiled.hotel_index(),
+                   attraction_query=compiled.attraction_query(), hotel_query=compiled.hotel_query(),
+                   gazetteer=compiled.gazetteer(),
+                   fingerprint=dataset_fingerprint({name: compiled.sources[name] for name in ('attractions', 'hotels')
+                                                    if name in compiled.sources and sources.get(name)}))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("DataSnapshot is immutable")
+
+
+class DataStore:
+    """
+    Loads both datasets once and hot-reloads them when their files change.
+
+    Each dataset is read from the first existing path of its candidate list.
+    The first existing `catalog_paths` entry is used instead when it was
+    compiled from exactly those files (or they are missing); a stale one is
+    ignored with a warning. A failed reload (e.g. a half-written file) keeps
+    the current snapshot and is retried once the files change again.
+    """
+
+    def __init__(self, attraction_paths: Sequence[str], hotel_paths: Sequence[str],
+                 poll_sec: float = DATA_RELOAD_POLL_SEC, catalog_paths: Sequence[str] = ()):
+        self.attraction_paths = list(attraction_paths)
+        self.hotel_paths = list(hotel_paths)
+        self.catalog_paths = list(catalog_paths)
+        self.poll_sec = poll_sec
+        self._snapshot: DataSnapshot | None = None
+        self._failed_sources = None
+        self._lock = threading.Lock()
+        self._watcher: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    @property
+    def snapshot(self) -> DataSnapshot:
+        """Current snapshot; the first access loads the data if nothing has yet."""
+        snap = self._snapshot
+        if snap is None:
+            self.reload()
+            snap = self._snapshot
+        return snap
+
+    @staticmethod
+    def _locate(paths: Sequence[str]) -> Tuple[str, float] | None:
+        for path in paths:
+            try:
+                return path, os.stat(path).st_mtime
+            except OSError:
+                continue
+        return None
+
+    @staticmethod
+    def _compiled(sources: Dict[str, Tuple[str, float] | None]) -> CompiledCatalog | None:
+        """The located compiled catalog, if it matches the located JSON files."""
+        if sources['catalog'] is None:
+            return None
+        try:
+            compiled = CompiledCatalog(sources['catalog'][0])
+            stale = [name for name in ('attractions', 'hotels')
+                     if not compiled.is_current(name, sources[name] and sources[name][0])]
+        except (OSError, ValueError, KeyError):
+            logger.exception("Unreadable compiled catalog %s; loading the JSON files", sources['catalog'][0])
+            return None
+        if stale:
+            logger.warning("Compiled catalog %s is older than the %s file(s); loading the JSON files "
+                           "(recompile with `python compiled_catalog.py`)", compiled.path, ' and '.join(stale))
+            return None
+        return compiled
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        Swap in a new snapshot if a dataset file changed (or `force`).
+
+        Returns:
+            bool: True if a new snapshot was published.
+        """
+        with self._lock:
+            sources = {
+                'attractions': self._locate(self.attraction_paths),
+                'hotels': self._locate(self.hotel_paths),
+                'catalog': self._locate(self.catalog_paths),
+            }
+            current = self._snapshot
+            if not force and (current is not None and current.sources == sources
+                              or sources == self._failed_sources):
+                return False
+            version = current.version + 1 if current is not None else 1
+            try:
+                compiled = self._compiled(sources)
+                if compiled is not None:
+                    snapshot = DataSnapshot.from_compiled(version, compiled, sources)
+                else:
+                    attractions, hotels = read_datasets(*(source and source[0] for source in
+                                                          (sources['attractions'], sources['hotels'])))
+                    snapshot = DataSnapshot(version, attractions, hotels, sources)
+            except (OSError, ValueError):
+                logger.exception("Failed to load datasets; keeping the current snapshot")
+                self._failed_sources = sources
+                if current is None:
+                    self._snapshot = DataSnapshot(0, [], [], {})
+                return False
+
+            self._snapshot = snapshot
+            logger.info("Loaded data snapshot v%d from %s: %d attractions, %d hotels", version,
+                        'the compiled catalog' if compiled is not None else 'the JSON files',
+                        len(snapshot.attractions), len(snapshot.hotels))
+            return True
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.poll_sec):
+            try:
+                self.reload()
+            except Exception:
+                logger.exception("Data reload failed")
+
+    def start_watcher(self) -> None:
+        """Load now and start the background mtime poller (idempotent)."""
+        if self._snapshot is None:
+            self.reload()
+        if self._watcher is None and self.poll_sec > 0:
+            self._watcher = threading.Thread(target=self._watch, name='data-store-watcher', daemon=True)
+            self._watcher.start()
+
+    def stop_watcher(self) -> None:
+        self._stop.set()
@@ -0,0 +1,55 @@
+"""
+Pre-encoded, pre-compressed response bodies for the catalog endpoints
+
+Catalog responses only change when the datasets are reloaded, so each
+distinct response is serialized and compressed once per data version and
+then served as bytes. Brotli is used when the optional `brotli` package is
+installed; gzip is always available.
+"""
+
+import gzip
+import hashlib
+from typing import Tuple
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_BYTES = 512
+
+
+class EncodedBody:
+    """
+    One response body with its compressed variants and a strong ETag.
+
+    Each content-coding is a different representation, so each gets its own
+    strong ETag (`"<hash>"`, `"<hash>-gzip"`, `"<hash>-br"`); `matches`
+    accepts any of them so a client that switched encodings still gets 304.
+    """
+    __slots__ = ('identity', 'gzip', 'br', 'digest')
+
+    def __init__(self, body: bytes):
+        self.identity = body
+        self.digest = hashlib.blake2b(body, digest_size=12).hexdigest()
+        self.gzip = self.br = None
+        if len(body) >= MIN_COMPRESS_BYTES:
+            self.gzip = gzip.compress(body, compresslevel=9, mtime=0)
+            if brotli is not None:
+                self.br = brotli.compress(body, quality=11)
+
+    def etag(self, encoding: str | None = None) -> str:
+        return self.digest if encoding is None else f"{self.digest}-{encoding}"
+
+    def matches(self, tags) -> bool:
+        """True if any of our ETags is in an `If-None-Match` ETags collection."""
+        return tags.star_tag or any(tags.contains(self.etag(enc)) for enc in (None, 'gzip', 'br'))
+
+    def negotiate(self, accepts) -> Tuple[bytes, str | None]:
+        """Smallest variant the client accepts (werkzeug `accept_encodings`)."""
+        if self.br is not None and accepts['br']:
+            return self.br, 'br'
+        if self.gzip is not None and accepts['gzip']:
+            return self.gzip, 'gzip'
+        return self.identity, None
@@ -0,0 +1,301 @@
+"""
+Place-name gazetteer behind location parsing and /api/itinerary/geocode
+
+Names are accent- and case-folded once, indexed by exact key and by
+character trigrams (for misspellings), and the wilaya seats are placed in a
+spatial index for reverse geocoding. A `Gazetteer` is built per dataset
+snapshot: the `city` fields of both datasets become extra aliases.
+"""
+
+import logging
+import math
+import re
+import unicodedata
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Sequence, Tuple
+
+import numpy as np
+
+from catalog import SpatialIndex
+
+logger = logging.getLogger(__name__)
+
+# Seat coordinates of the wilayas (plus common alternative spellings)
+WILAYA_COORDINATES: Dict[str, Tuple[float, float]] = {
+    'Algiers': (36.737232, 3.086472),
+    'Alger': (36.737232, 3.086472),
+    'Oran': (35.696944, -0.633056),
+    'Constantine': (36.365, 6.614722),
+    'Annaba': (36.9, 7.766667),
+    'Tlemcen': (34.886667, -1.315278),
+    'Ghardaia': (32.483333, 3.666667),
+    'Setif': (36.19, 5.41),
+    'Blida': (36.47, 2.83),
+    'Batna': (35.55, 6.17),
+    'Bechar': (31.62, -2.22),
+    'Djelfa': (34.67, 3.25),
+    'Sidi Bel Abbes': (35.2, -0.63),
+    'Biskra': (34.85, 5.73),
+    'Tiaret': (35.37, 1.32),
+    'El Oued': (33.37, 6.87),
+    'Skikda': (36.87, 6.91),
+    'Jijel': (36.82, 5.77),
+    'Mostaganem': (35.94, 0.09),
+    "M'Sila": (35.7, 4.54),
+    'Boumerdes': (36.76, 3.47),
+    'Tipaza': (36.59, 2.45),
+    'Medea': (36.26, 2.75),
+    'Bouira': (36.37, 3.9),
+    'Tizi Ouzou': (36.72, 4.05),
+    'Bejaia': (36.75, 5.08),
+    'Laghouat': (33.8, 2.87),
+    'Ouargla': (31.95, 5.33),
+    'Tamanrasset': (22.79, 5.53),
+    'Adrar': (27.87, -0.29),
+    'El Bayadh': (33.68, 1.02),
+    'Illizi': (26.5, 8.47),
+    'Bordj Bou Arreridj': (36.07, 4.76),
+    'El Tarf': (36.77, 8.31),
+    'Tindouf': (27.67, -8.15),
+    'Tissemsilt': (35.61, 1.81),
+    'Khenchela': (35.43, 7.14),
+    'Souk Ahras': (36.28, 7.95),
+    'Mila': (36.45, 6.26),
+    'Ain Defla': (36.26, 1.97),
+    'Naama': (33.27, -0.32),
+    'Ain Temouchent': (35.31, -1.14),
+    'Guelma': (36.46, 7.43),
+    'Relizane': (35.74, 0.56),
+    "El M'Ghair": (33.95, 5.92),
+    'El Meniaa': (30.5, 2.88),
+    'Ouled Djellal': (34.42, 5.07),
+    'Bordj Badji Mokhtar': (21.32, 0.95),
+    'Beni Abbes': (30.13, -2.17),
+    'Timimoun': (29.26, 0.23),
+    'Touggourt': (33.1, 6.06),
+    'Djanet': (24.55, 9.48),
+    'In Guezzam': (19.57, 5.77),
+    'In Salah': (27.21, 2.46),
+    'Chlef': (36.165, 1.334),
+    'Mascara': (35.397, 0.140),
+    'Saida': (34.83, 0.15),
+    'Tebessa': (35.40, 8.12),
+    'Oum El Bouaghi': (35.88, 7.11),
+}
+
+# Trailing qualifiers ignored when matching ("Oran, Algeria", "Blida wilaya")
+_SUFFIXES = (', algeria', ', algerie', ', dz', ' wilaya', ' province')
+
+# Least trigram similarity for a fuzzy match to be used
+FUZZY_MIN_SCORE = 0.45
+# Score given to a known name found as whole words inside the query ("downtown oran")
+CONTAINED_SCORE = 0.9
+# Least similarity for a hotel city to be taken as a spelling of a known place
+HOTEL_ALIAS_MIN_SCORE = 0.8
+GAZETTEER_CACHE_SIZE = 1024
+
+
+def fold(name: str) -> str:
+    """
+    Matching key of a place name: accents removed, lower case, apostrophes
+    dropped, any other punctuation except commas turned into single spaces.
+    """
+    s = unicodedata.normalize('NFKD', str(name))
+    s = ''.join(c for c in s if not unicodedata.combining(c)).lower()
+    s = re.sub(r"['’`]", '', s)
+    s = re.sub(r'[^0-9a-z,]+', ' ', s)
+    return ' '.join(s.split())
+
+
+def _trigrams(key: str) -> set:
+    padded = f'  {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class Candidate(NamedTuple):
+    name: str
+    coordinates: Tuple[float, float]
+    score: float
+
+
+class GeocodeResult(NamedTuple):
+    """
+    Outcome of a lookup. `kind` is "coordinates", "exact", "alias", "fuzzy"
+    or "unknown" (then `coordinates` is None). `candidates` are the best
+    places in score order; for coordinates, the nearest wilayas.
+    """
+    query: str
+    coordinates: Tuple[float, float] | None
+    match: str | None
+    confidence: float
+    kind: str
+    candidates: Tuple[Candidate, ...]
+
+
+class Gazetteer:
+    """
+    Exact, fuzzy and reverse lookups over the wilaya table and dataset cities.
+
+    Attraction cities missing from the table get the mean position of their
+    attractions; hotel cities (which have no positions) become aliases of
+    the known place they closely resemble. Lookups are memoized in an LRU.
+    """
+
+    def __init__(self, attractions: Sequence[Dict] = (), hotels: Sequence[Dict] = (),
+                 cache_size: int = GAZETTEER_CACHE_SIZE):
+        located = [a for a in attractions
+                   if isinstance(a.get('city'), str) and isinstance(a.get('gps'), (list, tuple)) and len(a['gps']) >= 2]
+        cities = list(dict.fromkeys(a['city'] for a in located))
+        code_of = {city: i for i, city in enumerate(cities)}
+        gps = np.array([a['gps'][:2] for a in located], dtype=np.float64).reshape(-1, 2)
+        self._build(cities, np.array([code_of[a['city']] for a in located], dtype=np.int64),
+                    gps[:, 0], gps[:, 1], {h['city'] for h in hotels if isinstance(h.get('city'), str)},
+                    cache_size)
+
+    @classmethod
+    def from_columns(cls, cities: Sequence[str], city_codes: np.ndarray, lat: np.ndarray, lon: np.ndarray,
+                     hotel_cities: Iterable[str], cache_size: int = GAZETTEER_CACHE_SIZE) -> 'Gazetteer':
+        """
+        Gazetteer over attraction columns computed elsewhere (e.g. a compiled
+        catalog): each attraction's index into `cities` (-1 when it has
+        none) and its position, plus the distinct hotel city names.
+        """
+        gazetteer = cls.__new__(cls)
+        gazetteer._build(list(cities), np.asarray(city_codes, dtype=np.int64), lat, lon, hotel_cities, cache_size)
+        return gazetteer
+
+    def _build(self, cities: List[str], city_codes: np.ndarray, lat: np.ndarray, lon: np.ndarray,
+               hotel_cities: Iterable[str], cache_size: int) -> None:
+        self.names: List[str] = []
+        self.coordinates: List[Tuple[float, float]] = []
+        self.is_alias: List[bool] = []
+        self._by_key: Dict[str, int] = {}
+
+        for name, coords in WILAYA_COORDINATES.items():
+            self._add(name, coords, alias=False)
+        n_wilayas = len(self.names)
+
+        # attraction cities in order of first appearance, at the mean position of their attractions
+        keep = city_codes >= 0
+        codes = city_codes[keep]
+        counts = np.maximum(np.bincount(codes, minlength=len(cities)), 1)
+        mean_lat = np.bincount(codes, weights=np.asarray(lat, dtype=np.float64)[keep], minlength=len(cities)) / counts
+        mean_lon = np.bincount(codes, weights=np.asarray(lon, dtype=np.float64)[keep], minlength=len(cities)) / counts
+        present, first = np.unique(codes, return_index=True)
+        for code in present[np.argsort(first)].tolist():
+            city = cities[code]
+            known = self._by_key.get(fold(city))
+            if known is not None:
+                self.names[known] = city  # the datasets' spelling keeps its accents
+            else:
+                self._add(city, (round(float(mean_lat[code]), 6), round(float(mean_lon[code]), 6)), alias=True)
+        self._index()
+        hotel_cities = {city for city in hotel_cities if city.strip()}
+        for city in sorted(hotel_cities):
+            if fold(city) in self._by_key:
+                continue
+            ranked = self._fuzzy(fold(city), 1)
+            if ranked and ranked[0][0] >= HOTEL_ALIAS_MIN_SCORE:
+                self._add(city, self.coordinates[ranked[0][1]], alias=True)
+            else:
+                logger.debug("Hotel city '%s' has no known location", city)
+        self._index()
+
+        # reverse geocoding resolves to wilaya seats only, one per location
+        seats = {}
+        for i in range(n_wilayas):
+            seats.setdefault(self.coordinates[i], i)
+        self._seat_ids = np.array(list(seats.values()), dtype=np.int64)
+        seat_coords = np.array(list(seats.keys()), dtype=np.float64).reshape(-1, 2)
+        self._seats = SpatialIndex(seat_coords[:, 0], seat_coords[:, 1])
+
+        self.lookup = lru_cache(maxsize=cache_size)(self._lookup)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _add(self, name: str, coords: Tuple[float, float], alias: bool) -> None:
+        key = fold(name)
+        if key in self._by_key:
+            return
+        self._by_key[key] = len(self.names)
+        self.names.append(name)
+        self.coordinates.append((float(coords[0]), float(coords[1])))
+        self.is_alias.append(alias)
+
+    def _index(self) -> None:
+        """(Re)build the trigram index over every key."""
+        self._keys: List[str] = [None] * len(self.names)
+        for key, i in self._by_key.items():
+            self._keys[i] = key
+        self._grams: Dict[str, List[int]] = defaultdict(list)
+        self._gram_counts: List[int] = []
+        for i, key in enumerate(self._keys):
+            grams = _trigrams(key)
+            self._gram_counts.append(len(grams))
+            for g in grams:
+                self._grams[g].append(i)
+
+    def reverse(self, lat: float, lon: float, k: int = 1) -> List[Candidate]:
+        """The `k` wilaya seats nearest to (lat, lon); score is the distance in km."""
+        ids, dist = self._seats.nearest(lat, lon, k)
+        return [Candidate(self.names[i], self.coordinates[i], round(d, 3))
+                for i, d in zip(self._seat_ids[ids].tolist(), dist.tolist())]
+
+    def _candidate(self, i: int, score: float) -> Candidate:
+        return Candidate(self.names[i], self.coordinates[i], round(score, 3))
+
+    def _fuzzy(self, key: str, limit: int) -> List[Tuple[float, int]]:
+        grams = _trigrams(key)
+        shared = defaultdict(int)
+        for g in grams:
+            for i in self._grams.get(g, ()):
+                shared[i] += 1
+        scored = {i: 2.0 * n / (len(grams) + self._gram_counts[i]) for i, n in shared.items()}
+
+        # known names appearing as whole words, e.g. "hotel near oran"
+        words = f' {key} '
+        for i, name_key in enumerate(self._keys):
+            if len(name_key) >= 3 and f' {name_key} ' in words:
+                scored[i] = max(scored.get(i, 0.0), CONTAINED_SCORE)
+
+        # one entry per location (e.g. Alger / Algiers), keeping its best name
+        best = {}
+        for i, score in scored.items():
+            coords = self.coordinates[i]
+            if coords not in best or score > best[coords][0]:
+                best[coords] = (score, i)
+        return sorted(best.values(), key=lambda t: (-t[0], self.names[t[1]]))[:limit]
+
+    def _lookup(self, query: str, limit: int = 5) -> GeocodeResult:
+        text = query.strip()
+        if ',' in text and not any(c.isalpha() for c in text):
+            try:
+                lat_s, lon_s = text.split(',', 1)
+                lat, lon = float(lat_s), float(lon_s)
+            except ValueError:
+                pass
+            else:
+                if -90 <= lat <= 90 and -180 <= lon <= 180 and math.isfinite(lat + lon):
+                    nearest = self.reverse(lat, lon, k=min(limit, 3))
+                    return GeocodeResult(query, (lat, lon), nearest[0].name if nearest else None,
+                                         1.0, 'coordinates', tuple(nearest))
+
+        key = fold(text)
+        for suffix in _SUFFIXES:
+            if key.endswith(suffix):
+                key = key[:-len(suffix)].strip()
+        key = ' '.join(key.replace(',', ' ').split())
+
+        i = self._by_key.get(key)
+        if i is not None:
+            kind = 'alias' if self.is_alias[i] else 'exact'
+            return GeocodeResult(query, self.coordinates[i], self.names[i], 1.0, kind, (self._candidate(i, 1.0),))
+
+        ranked = self._fuzzy(key, limit) if key else []
+        candidates = tuple(self._candidate(i, score) for score, i in ranked)
+        if ranked and ranked[0][0] >= FUZZY_MIN_SCORE:
+            score, i = ranked[0]
+            return GeocodeResult(query, self.coordinates[i], self.names[i], round(score, 3), 'fuzzy', candidates)
+        return GeocodeResult(query, None, None, 0.0, 'unknown', candidates)
@@ -1,45 +1,300 @@
+import copy
 import math
 import json
+import logging
 import random
-import re
-from copy import deepcopy
 from typing import List, Dict, Tuple  # Helper library for type hinting
 
+import numpy as np
+
+from catalog import AttractionCatalog, HotelIndex, catalog_for, parse_cost, parse_duration
+from compiled_catalog import is_compiled_catalog, open_catalog
+
+logger = logging.getLogger(__name__)
+
+class PlanState:
+    """
+    Immutable search state.
+
+    Days are tuples of attraction IDs and `used` is an int bitset over
+    catalog IDs, so duplicate checks are a single bit test. Running totals
+    are stored alongside. A child built with `add`/`next_day`/`with_day`
+    shares every untouched day tuple with its parent, so expanding a node
+    allocates only what changed.
+
+    `score` (raw satisfaction sum) and `unvisited_km` (distance mass from
+    `current_att` to every unvisited attraction) are maintained by the
+    problem as attractions are added, so `value()` and `heuristic()` are
+    O(1) updates from the parent. Either is None when unknown (e.g. after
+    `with_day`), in which case the problem recomputes it.
+
+    Item access (`state['itinerary']`, `state.get(...)`) is kept so code
+    written against the old dict states keeps working read-only.
+    """
+    __slots__ = ('current_location', 'current_att', 'itinerary', 'curr_day',
+                 'total_cost', 'total_time', 'daily_time', 'daily_distance', 'used',
+                 'score', 'unvisited_km')
+
+    def __init__(self, current_location, itinerary, curr_day=0, total_cost=0.0,
+                 total_time=0.0, daily_time=None, daily_distance=None,
+                 current_att=None, used=None, score=None, unvisited_km=None):
+        itinerary = tuple(tuple(day) for day in itinerary)
+        n_days = len(itinerary)
+        if score is None and not any(itinerary):
+            score = 0.0
+        if used is None:
+            used = 0
+            for day in itinerary:
+                for att_id in day:
+                    used |= 1 << att_id
+        _set = object.__setattr__
+        _set(self, 'current_location', tuple(current_location))
+        _set(self, 'current_att', current_att)
+        _set(self, 'itinerary', itinerary)
+        _set(self, 'curr_day', curr_day)
+        _set(self, 'total_cost', float(total_cost))
+        _set(self, 'total_time', float(total_time))
+        _set(self, 'daily_time', tuple(daily_time) if daily_time is not None else (0.0,) * n_days)
+        _set(self, 'daily_distance',
+             tuple(daily_distance) if daily_distance is not None else (0.0,) * n_days)
+        _set(self, 'used', used)
+        _set(self, 'score', score)
+        _set(self, 'unvisited_km', unvisited_km)
+
+    @classmethod
+    def from_dict(cls, state: Dict) -> 'PlanState':
+        return cls(
+            current_location=state['current_location'],
+            itinerary=state['itinerary'],
+            curr_day=state.get('curr_day', 0),
+            total_cost=state.get('total_cost', 0.0),
+            total_time=state.get('total_time', 0.0),
+            daily_time=state.get('daily_time'),
+            daily_distance=state.get('daily_distance'),
+            current_att=state.get('current_att'),
+        )
+
+    def to_dict(self) -> Dict:
+        return {
+            'current_location': list(self.current_location),
+            'current_att': self.current_att,
+            'itinerary': [list(day) for day in self.itinerary],
+            'curr_day': self.curr_day,
+            'total_cost': self.total_cost,
+            'total_time': self.total_time,
+            'daily_time': list(self.daily_time),
+            'daily_distance': list(self.daily_distance),
+        }
+
+    def _derive(self, **changes) -> 'PlanState':
+        """Shallow copy with some slots replaced; all other slots are shared."""
+        child = object.__new__(PlanState)
+        for slot, member in _PLAN_STATE_MEMBERS:
+            member.__set__(child, changes[slot] if slot in changes else member.__get__(self))
+        return child
+
+    def add(self, att_id: int, location, distance_km: float,
+            cost: float, hours: float, score: float = None,
+            unvisited_km: float = None) -> 'PlanState':
+        """Child state with `att_id` appended to the current day.
+
+        `score` is the attraction's satisfaction weight (added to the
+        parent's running score); `unvisited_km` is the new distance mass.
+        """
+        d = self.curr_day
+        return self._derive(
+            score=self.score + score if score is not None and self.score is not None else None,
+            unvisited_km=unvisited_km,
+            current_location=location,
+            current_att=att_id,
+            itinerary=_tuple_set(self.itinerary, d, self.itinerary[d] + (att_id,)),
+            total_cost=self.total_cost + cost,
+            total_time=self.total_time + hours,
+            daily_time=_tuple_set(self.daily_time, d, self.daily_time[d] + hours),
+            daily_distance=_tuple_set(self.daily_distance, d, self.daily_distance[d] + distance_km),
+            used=self.used | (1 << att_id),
+        )
+
+    def next_day(self) -> 'PlanState':
+        return self._derive(curr_day=self.curr_day + 1)
+
+    def with_day(self, day_idx: int, day: Tuple[int, ...], *, cost_delta: float = 0.0,
+                 time_delta: float = 0.0, score_delta: float = None) -> 'PlanState':
+        """Child state with one day's attractions replaced (used by local search).
+
+        The running score is kept only when `score_delta` is given.
+        """
+        used = self.used
+        for att_id in self.itinerary[day_idx]:
+            used &= ~(1 << att_id)
+        for att_id in day:
+            used |= 1 << att_id
+        return self._derive(
+            itinerary=_tuple_set(self.itinerary, day_idx, tuple(day)),
+            total_cost=self.total_cost + cost_delta,
+            total_time=self.total_time + time_delta,
+            daily_time=_tuple_set(self.daily_time, day_idx, self.daily_time[day_idx] + time_delta),
+            used=used,
+            score=(self.score + score_delta
+                   if score_delta is not None and self.score is not None else None),
+            unvisited_km=None,
+        )
+
+    def contains(self, att_id: int) -> bool:
+        return (self.used >> att_id) & 1 == 1
+
+    def key(self) -> Tuple:
+        return (self.curr_day, self.itinerary)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("PlanState is immutable")
+
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, PlanState):
+            return NotImplemented
+        return all(getattr(self, s) == getattr(other, s) for s in PlanState.__slots__)
+
+    def __hash__(self) -> int:
+        return hash(self.key())
+
+    def __repr__(self) -> str:
+        return (f"PlanState(day={self.curr_day}, itinerary={self.itinerary}, "
+                f"cost={self.total_cost:.2f})")
+
+
+# slot descriptors, used to fill derived states without going through __setattr__
+_PLAN_STATE_MEMBERS = [(slot, PlanState.__dict__[slot]) for slot in PlanState.__slots__]
+
+
+# Candidate counts above which the solvers ask the spatial index for the
+# attractions in driving range before scanning distance rows
+SPATIAL_PRUNE_MIN = 512
+
+
+def _tuple_set(t: Tuple, i: int, value) -> Tuple:
+    return t[:i] + (value,) + t[i + 1:]
+
+
 class TourPlanningProblem:
     def __init__(self, initial_state: Dict, attractions: List[Dict],
-                 user_prefs: Dict, constraints: Dict):
+                 user_prefs: Dict, constraints: Dict,
+                 catalog: AttractionCatalog = None, attraction_ids: np.ndarray = None):
         """
         Args:
             initial_state: Initial state dictionary.
-            attractions: List of attraction dictionaries.
+            attractions: List of attraction dictionaries the planner may use.
+                May be None when `attraction_ids` is given.
             user_prefs: User preferences dictionary.
             constraints: Problem constraints dictionary.
+            catalog: Columnar catalog the attractions belong to. Built (and
+                cached per dataset) from `attractions` when omitted.
+            attraction_ids: Catalog IDs of the attractions, so they need not
+                be looked up by name (or decoded, for a compiled catalog).
         """
+        if not isinstance(initial_state, PlanState):
+            initial_state = PlanState.from_dict(initial_state)
         self.initial_state = initial_state
-        self.attractions = attractions
+        self._attractions = attractions
         self.user_prefs = user_prefs
         self.constraints = constraints
 
-        # constant‑time lookup for any attraction name
-        self._att_by_name = {a['name']: a for a in self.attractions}
+        # integer IDs into the catalog replace name lookups everywhere
+        self.catalog = catalog if catalog is not None else catalog_for(attractions)
+        if attraction_ids is None:
+            attraction_ids = self.catalog.ids_for_records(attractions)
+        self.attraction_ids = np.asarray(attraction_ids, dtype=np.int64)
+        self._id_list = self.attraction_ids.tolist()
+
+        # plain-list mirrors of the catalog columns for scalar access in the search loop
+        self._gps = list(zip(self.catalog.lat.tolist(), self.catalog.lon.tolist()))
+        self._visit_h = self.catalog.visit_hours.tolist()
+        self._ticket = self.catalog.ticket_dzd.tolist()
+
+        preferred = self.catalog.category_mask(user_prefs.get('categories', []))
+        self._is_preferred = preferred.tolist()
+        self._sat_weight = (np.where(preferred, 10.0, 5.0) * self.catalog.rating).tolist()
+        self.candidate_ids = [i for i in self._id_list if self._is_preferred[i]]
+        self._candidate_arr = np.array(self.candidate_ids, dtype=np.int64)
+        self._cand_pos_arr = np.full(len(self.catalog), -1, dtype=np.int64)
+        self._cand_pos_arr[self._candidate_arr] = np.arange(len(self._candidate_arr))
 
         # cheaper if the user has a car
         self.dzd_per_km = 6.0 if constraints.get("has_car", False) else 10.0
 
-        self.distance_cache = self._build_distance_cache()
-
-    def _build_distance_cache(self) -> Dict[Tuple[str, str], float]:
-        """Precompute distances between all pairs of attractions.
-            store only upper‑triangle to halve the size"""
-        cache = {}
-        names = [a['name'] for a in self.attractions]
-        for i, a1 in enumerate(self.attractions):
-            for j in range(i + 1, len(self.attractions)):
-                a2 = self.attractions[j]
-                d = self._calculate_distance(a1['gps'], a2['gps'])
-                cache[(a1['name'], a2['name'])] = d
-                cache[(a2['name'], a1['name'])] = d          # mirror
-        return cache
+        # shared per-catalog distance matrix plus the row for the start location
+        self.distances = self.catalog.distances
+        self._start = tuple(initial_state['current_location'])
+        self._start_row = self.distances.from_point(*self._start)
+
+        # distance row sums over the problem's attractions: the heuristic's
+        # unvisited mass is row_sum[last] minus the (few) visited entries
+        row_sums = np.zeros(len(self.catalog), dtype=np.float64)
+        if len(self.attraction_ids):
+            sub = self.distances.matrix[np.ix_(self.attraction_ids, self.attraction_ids)]
+            row_sums[self.attraction_ids] = sub.sum(axis=1, dtype=np.float64)
+        self._row_sums = row_sums.tolist()
+        self._cand_visit_h = self.catalog.visit_hours[self._candidate_arr]
+        self._cand_ticket = self.catalog.ticket_dzd[self._candidate_arr]
+
+    @property
+    def attractions(self) -> List[Dict]:
+        """Attraction records of the problem, read from the catalog on first use if not given."""
+        if self._attractions is None:
+            self._attractions = [self.catalog.records[i] for i in self._id_list]
+        return self._attractions
+
+    def rebased(self, initial_state: Dict, constraints: Dict) -> 'TourPlanningProblem':
+        """
+        Copy of this problem for another start location and budget.
+
+        Everything derived from the attractions and preferences (catalog
+        mirrors, candidate set, distance row sums) is shared with the copy;
+        only the start location's distance row is recomputed. `constraints`
+        may differ from ours in `max_total_budget` only.
+        """
+        if not isinstance(initial_state, PlanState):
+            initial_state = PlanState.from_dict(initial_state)
+        clone = copy.copy(self)
+        clone.initial_state = initial_state
+        clone.constraints = constraints
+        clone._start = tuple(initial_state['current_location'])
+        clone._start_row = self.distances.from_point(*clone._start)
+        return clone
+
+    def _unvisited_mass(self, state: PlanState, last: int) -> float:
+        """Sum of distances from `last` to the problem's unvisited attractions."""
+        visited = [att for day in state.itinerary for att in day]
+        return self._row_sums[last] - float(
+            self.distances.matrix[last, visited].sum(dtype=np.float64))
+
+    def unvisited_distance(self, state: PlanState) -> float:
+        """Distance mass from the last attraction of the current day to all
+        unvisited attractions (cached on the state when built by `result`)."""
+        if not isinstance(state, PlanState):
+            state = PlanState.from_dict(state)
+        last = state.itinerary[state.curr_day][-1]
+        km = state.unvisited_km
+        if km is None or state.current_att != last:
+            km = self._unvisited_mass(state, last)
+        return km
+
+    def _distance_row(self, state: Dict) -> np.ndarray:
+        """Distances (km) from the state's current location to every attraction."""
+        here = state.get('current_att')
+        if here is not None:
+            return self.distances.matrix[here]
+        if tuple(state['current_location']) == self._start:
+            return self._start_row
+        return self.distances.from_point(*state['current_location'])
 
     @staticmethod
     def _calculate_distance(coord1: List[float], coord2: List[float]) -> float:
@@ -57,7 +312,7 @@ class TourPlanningProblem:
         """
         Return a list of possible actions from the current state.
         Two types of actions:
-          - ('add', <attraction_dict>): add an attraction to the current day.
+          - ('add', <attraction_id>): add an attraction to the current day.
           - ('next_day',): move to the next day.
         """
         valid_actions = []
@@ -71,14 +326,30 @@ class TourPlanningProblem:
         if len(state['itinerary'][curr_day]) >= self.constraints['max_attractions_per_day']:
             return [('next_day',)]
 
-        preferred = set(self.user_prefs.get('categories', []))
-
-        # Check each attraction for validity
-        for att in self.attractions:
-            if att['category'] not in preferred:                 # <= preference filter
-                continue
-            if self._is_valid_addition(state, att):
-                valid_actions.append(('add', att))
+        # Check every candidate at once (candidates are already restricted to
+        # the preferred categories); same rules as _is_valid_addition
+        if curr_day < 7 and len(self._candidate_arr):
+            if not isinstance(state, PlanState):
+                state = PlanState.from_dict(state)
+            cand, ticket, visit_h = self._candidate_arr, self._cand_ticket, self._cand_visit_h
+            if len(cand) > SPATIAL_PRUNE_MIN:
+                # only attractions within driving range of what is left of the day can fit
+                reach_km = (self.constraints['max_daily_time'] - state.daily_time[curr_day]) * 50
+                near = self.catalog.spatial.within(*state.current_location, reach_km + 1e-3)[0]
+                pos = self._cand_pos_arr[near]
+                pos = np.sort(pos[pos >= 0])
+                cand, ticket, visit_h = cand[pos], ticket[pos], visit_h[pos]
+            distance_km = self._distance_row(state)[cand].astype(np.float64)
+            visited = [att_id for day in state.itinerary for att_id in day]
+            ok = ~np.isin(cand, visited) if visited else np.ones(len(cand), dtype=bool)
+            budget_cap = self.constraints.get("max_total_budget")
+            if budget_cap is not None:
+                ok &= (state.total_cost + ticket + distance_km * self.dzd_per_km) <= budget_cap
+            ok &= (state.daily_time[curr_day] + distance_km / 50 + visit_h) <= self.constraints['max_daily_time']
+            max_dist = self.constraints.get("max_daily_distance")
+            if max_dist is not None:
+                ok &= (state.daily_distance[curr_day] + distance_km) <= max_dist
+            valid_actions.extend(('add', att_id) for att_id in cand[ok].tolist())
 
         # Allow 'next_day' if there's at least one attraction in the current day
         if len(state['itinerary'][curr_day]) > 0:
@@ -86,44 +357,47 @@ class TourPlanningProblem:
 
         return valid_actions
 
-    def _is_valid_addition(self, state: Dict, attraction: Dict) -> bool:
-        curr_day = state['curr_day']
+    def _is_valid_addition(self, state: PlanState, att_id: int,
+                           dist_row: np.ndarray = None) -> bool:
+        curr_day = state.curr_day
         if curr_day >= 7:
             return False
 
-        # 1) duplicates & per-day limit
-        if any(attraction['name'] in day for day in state['itinerary']):
+        # 1) duplicates (bitset) & per-day limit
+        if (state.used >> att_id) & 1:
             return False
-        if len(state['itinerary'][curr_day]) >= self.constraints['max_attractions_per_day']:
+        if len(state.itinerary[curr_day]) >= self.constraints['max_attractions_per_day']:
             return False
 
         # 2) compute travel / visit metrics once
-        distance_km  = self._calculate_distance(state['current_location'], attraction['gps'])
+        if dist_row is None:
+            dist_row = self._distance_row(state)
+        distance_km  = float(dist_row[att_id])
         travel_time  = distance_km / 50          # ← avg 50 km/h
-        visit_time   = self._parse_duration(attraction['visit_duration'])
-        ticket_cost  = self._parse_cost(attraction['cost'])
-        travel_cost  = self.travel_cost_km(state['current_location'], attraction['gps'])
+        visit_time   = self._visit_h[att_id]
+        ticket_cost  = self._ticket[att_id]
+        travel_cost  = distance_km * self.dzd_per_km
 
         # 3) global budget cap  (✓ Bug 2.1 fixed)
         budget_cap = self.constraints.get("max_total_budget")
         if budget_cap is not None:
-            prospective = state['total_cost'] + ticket_cost + travel_cost
+            prospective = state.total_cost + ticket_cost + travel_cost
             if prospective > budget_cap:
                 return False
 
         # 4) daily time cap
-        if state['daily_time'][curr_day] + travel_time + visit_time > self.constraints['max_daily_time']:
+        if state.daily_time[curr_day] + travel_time + visit_time > self.constraints['max_daily_time']:
             return False
 
         # 5) optional daily-distance cap  (✓ Bug 2.2 fixed)
         max_dist = self.constraints.get("max_daily_distance")
         if max_dist is not None:
-            if state['daily_distance'][curr_day] + distance_km > max_dist:
+            if state.daily_distance[curr_day] + distance_km > max_dist:
                 return False
 
         return True
 
-    def _estimate_travel_time(self, state: Dict, new_attraction: Dict) -> float:
+    def _estimate_travel_time(self, state: Dict, att_id: int) -> float:
         """
         Estimate travel time from the last visited attraction (or current location)
         to the new attraction.
@@ -133,48 +407,40 @@ class TourPlanningProblem:
         day_attractions = state['itinerary'][curr_day]
 
         if not day_attractions:
-            last_coords = state['current_location']
+            distance = float(self._distance_row(state)[att_id])
         else:
-            last_att_name = day_attractions[-1]
-            last_att = next(a for a in self.attractions if a['name'] == last_att_name)
-            last_coords = last_att['gps']
-
-        distance = self._calculate_distance(last_coords, new_attraction['gps'])
+            distance = float(self.distances.matrix[day_attractions[-1], att_id])
         return distance / 50  # hours
 
-    def result(self, state: Dict, action: Tuple) -> Dict:
-        new_state = deepcopy(state)
+    def result(self, state: PlanState, action: Tuple) -> PlanState:
+        """Child state for `action`; the parent is never copied or mutated."""
+        if not isinstance(state, PlanState):
+            state = PlanState.from_dict(state)
         action_type = action[0]
-        curr_day = new_state['curr_day']
 
         if action_type == 'add':
-            _, attraction = action
-
-            # compute distance between previous location and new attraction
-            distance_km = self._calculate_distance(
-                new_state['current_location'], attraction['gps']
-            )
-            # track daily distance
-            new_state['daily_distance'][curr_day] += distance_km
+            _, att_id = action
 
-            ticket_cost  = self._parse_cost(attraction['cost'])
-            travel_cost  = self.travel_cost_km(new_state['current_location'], attraction['gps'])
-            new_state['total_cost'] += ticket_cost + travel_cost
+            # distance between previous location and new attraction
+            distance_km = float(self._distance_row(state)[att_id])
 
-            # compute travel & visit durations
-            travel_time = self._estimate_travel_time(state, attraction)
-            visit_time  = self._parse_duration(attraction['visit_duration'])
+            ticket_cost  = self._ticket[att_id]
+            travel_cost  = distance_km * self.dzd_per_km
 
-            new_state['daily_time'][curr_day] += travel_time + visit_time
-            new_state['total_time']           += travel_time + visit_time
+            # compute travel & visit durations (avg 50 km/h, see _estimate_travel_time)
+            travel_time = distance_km / 50
+            visit_time  = self._visit_h[att_id]
 
-            new_state['itinerary'][curr_day].append(attraction['name'])
-            new_state['current_location'] = attraction['gps']
+            # D[att, att] == 0, so the parent's visited set gives the child's mass
+            return state.add(att_id, self._gps[att_id], distance_km,
+                             ticket_cost + travel_cost, travel_time + visit_time,
+                             score=self._sat_weight[att_id],
+                             unvisited_km=self._unvisited_mass(state, att_id))
 
         elif action_type == 'next_day':
-            new_state['curr_day'] += 1
+            return state.next_day()
 
-        return new_state
+        return state
 
     def path_cost(self, current_cost: float, state1: Dict,
                   action: Tuple, state2: Dict) -> float:
@@ -268,14 +534,12 @@ class TourPlanningProblem:
         float
             How well the itinerary matches the user’s category/rating preferences.
         """
-        score = 0.0
-        preferred = set(self.user_prefs['categories'])
-
-        for day in state['itinerary']:
-            for name in day:
-                a = self._att_by_name[name]
-                weight = 10 if a['category'] in preferred else 5
-                score += weight * a['rating']
+        score = state.get('score')
+        if score is None:
+            score = 0.0
+            for day in state['itinerary']:
+                for att_id in day:
+                    score += self._sat_weight[att_id]
 
         max_per_day = self.constraints['max_attractions_per_day']
         ideal_max = 10 * 5 * 7 * max_per_day
@@ -301,40 +565,13 @@ class TourPlanningProblem:
 
     @staticmethod
     def _parse_cost(cost_str: str) -> float:
-        """
-        Convert cost field (e.g., "Free", "400 DZD", "Variable") to a numeric value.
-        - "free" -> 0
-        - "variable" or any non‑numeric -> 0
-        - Otherwise, return the first number found.
-        """
-        s = cost_str.strip().lower()
-        if "free" in s:
-            return 0.0
-        if "variable" in s:
-            # treat Variable as zero cost, but later printed as "Variable", for e.g.: Shopping Malls
-            return 0.0
-        m = re.search(r"(\d+(?:\.\d+)?)", s)
-        if m:
-            return float(m.group(1))
-        # fallback: everything else counts as zero
-        return 0.0
+        """Convert a cost field to DZD (see `catalog.parse_cost`)."""
+        return parse_cost(cost_str)
 
     @staticmethod
     def _parse_duration(duration_str: str) -> float:
-        """
-        Convert a duration string (e.g., "1-2 hours", "0.5 hour", "3 hours") to a numeric estimate (hours).
-        """
-        duration_str = duration_str.lower().strip()
-        # Matches "2 hours", "0.5 hour", "1-2 hours", etc.
-        m = re.match(r"(\d+(?:\.\d+)?)(?:-(\d+(?:\.\d+)?))?\s*(?:h|hour|hrs?)", duration_str)
-        if m:
-            low = float(m.group(1))
-            if m.group(2):
-                high = float(m.group(2))
-                return (low + high) / 2.0
-            return low
-        # Fallback if nothing matches
-        return 2.0
+        """Convert a duration string to hours (see `catalog.parse_duration`)."""
+        return parse_duration(duration_str)
 
 
 
@@ -342,21 +579,24 @@ class TourPlanningProblem:
 
 
 class Node:
-    def __init__(self, state: Dict, parent: 'Node' = None, 
+    __slots__ = ('state', 'parent', 'action', 'path_cost', 'depth', 'value', 'approximate')
+
+    def __init__(self, state: PlanState, parent: 'Node' = None,
                  action: Tuple = None, path_cost: float = 0):
         """
         Args:
-            state: The current state dictionary
+            state: The current (immutable) state; dict states are converted
             parent: Parent node
             action: Action that led to this node
             path_cost: Cumulative cost to reach this node
         """
-        self.state = deepcopy(state)
+        self.state = state if isinstance(state, PlanState) else PlanState.from_dict(state)
         self.parent = parent
         self.action = action
         self.path_cost = path_cost
         self.depth = parent.depth + 1 if parent else 0
         self.value = None  # Will store heuristic/objective value
+        self.approximate = False  # True for a best-so-far result returned at a deadline
         
     def __lt__(self, other: 'Node') -> bool:
         """
@@ -403,9 +643,7 @@ class Node:
         Hash based on the itinerary's arrangement for use in sets/dicts.
         """
         # We'll hash a tuple of (current_day, tuple of each day’s attractions).
-        # This avoids collisions from dict ordering
-        day_tuples = tuple(tuple(day) for day in self.state['itinerary'])
-        return hash((self.state['curr_day'], day_tuples))
+        return hash(self.state.key())
     def generate_neighbors(self, problem: 'TourPlanningProblem') -> List['Node']:
         """
         Generate all possible neighbors by swapping, removing, or adding attractions
@@ -419,28 +657,22 @@ class Node:
         """
         neighbors = []
         current_state = self.state
-        attractions = problem.attractions
         constraints = problem.constraints
 
         for day_idx in range(7):  # Iterate over the 7 days
-            day = current_state['itinerary'][day_idx]
+            day = current_state.itinerary[day_idx]
 
             # ---- SWAP Attractions within a Day ----
             if len(day) > 1:  # If more than one attraction for the day, we can swap
                 for i in range(len(day)):
                     for j in range(i + 1, len(day)):
-                        new_state = deepcopy(current_state)
-                        new_day = new_state['itinerary'][day_idx]
+                        new_day = list(day)
                         new_day[i], new_day[j] = new_day[j], new_day[i]
-
-                        # Find the actual attraction dictionaries based on the names
-                        attraction_i = next((att for att in attractions if att['name'] == new_day[i]), None)
-                        attraction_j = next((att for att in attractions if att['name'] == new_day[j]), None)
+                        new_state = current_state.with_day(day_idx, tuple(new_day))
 
                         # Check if the new state is valid before creating a child node
-                        if attraction_i and attraction_j and \
-                        problem._is_valid_addition(new_state, attraction_i) and \
-                        problem._is_valid_addition(new_state, attraction_j):
+                        if problem._is_valid_addition(new_state, new_day[i]) and \
+                        problem._is_valid_addition(new_state, new_day[j]):
                             child_node = Node(
                                 state=new_state,
                                 parent=self,
@@ -451,51 +683,50 @@ class Node:
 
             # ---- REMOVE Attraction ----
             for i in range(len(day)):
-                new_state = deepcopy(current_state)
-                removed_name = new_state['itinerary'][day_idx].pop(i)
-
-                removed_attr = next(a for a in attractions if a['name'] == removed_name)
-                new_state['total_cost'] -= problem._parse_cost(removed_attr['cost'])
-                new_state['daily_time'][day_idx] -= problem._parse_duration(removed_attr['visit_duration'])
-                new_state['total_time'] -= problem._parse_duration(removed_attr['visit_duration'])  # Update total time
+                removed_id = day[i]
+                new_state = current_state.with_day(
+                    day_idx, day[:i] + day[i + 1:],
+                    cost_delta=-problem._ticket[removed_id],
+                    time_delta=-problem._visit_h[removed_id],
+                )
 
                 # Check if the new state is valid after removal
-                if new_state['total_cost'] <= constraints['max_total_budget']:
+                if new_state.total_cost <= constraints['max_total_budget']:
                     child_node = Node(
                         state=new_state,
                         parent=self,
-                        action=("remove", day_idx, removed_name),
+                        action=("remove", day_idx, removed_id),
                         path_cost=self.path_cost  # Update if needed
                     )
                     neighbors.append(child_node)
 
             # ---- ADD a New Attraction ----
-            for att in attractions:
-                if att['name'] in current_state['itinerary'][day_idx]:
+            for att_id in problem._id_list:
+                if att_id in day:
                     continue  # Avoid duplicates
 
-                new_state = deepcopy(current_state)
-                if problem._is_valid_addition(new_state, att):  # Check if addition is valid
-                    new_state['itinerary'][day_idx].append(att['name'])
-                    new_state['total_cost'] += problem._parse_cost(att['cost'])
-                    travel_time = problem._estimate_travel_time(current_state, att)
-                    visit_time = problem._parse_duration(att['visit_duration'])
-                    new_state['daily_time'][day_idx] += travel_time + visit_time
-                    new_state['total_time'] += travel_time + visit_time  # Update total time
+                if problem._is_valid_addition(current_state, att_id):  # Check if addition is valid
+                    travel_time = problem._estimate_travel_time(current_state, att_id)
+                    visit_time = problem._visit_h[att_id]
+                    new_state = current_state.with_day(
+                        day_idx, day + (att_id,),
+                        cost_delta=problem._ticket[att_id],
+                        time_delta=travel_time + visit_time,
+                    )
 
                     # Check if the new state is valid after addition
-                    if (new_state['daily_time'][day_idx] <= constraints['max_daily_time'] and
-                        new_state['total_cost'] <= constraints['max_total_budget']):
+                    if (new_state.daily_time[day_idx] <= constraints['max_daily_time'] and
+                        new_state.total_cost <= constraints['max_total_budget']):
                         child_node = Node(
                             state=new_state,
                             parent=self,
-                            action=("add", day_idx, att['name']),
+                            action=("add", day_idx, att_id),
                             path_cost=self.path_cost  # Update if needed
                         )
                         neighbors.append(child_node)
 
         return neighbors
-    def generate_random_solution(self, problem: 'TourPlanningProblem') -> dict:
+    def generate_random_solution(self, problem: 'TourPlanningProblem') -> PlanState:
         """
         Generate a random initial solution for the tour planning problem.
 
@@ -512,6 +743,7 @@ class Node:
             'total_time': 0.0,
             'daily_time': [0.0 for _ in range(7)],
             'current_location': problem.initial_state['current_location'],
+            'current_att': None,
         }
 
         used_attractions = set()
@@ -527,34 +759,34 @@ class Node:
             while day_time < max_daily_time and attractions_today < max_attractions_per_day:
                 # Create a list of candidates that haven't been used yet
                 candidates = [
-                    att['name'] for att in problem.attractions
-                    if att['name'] not in used_attractions 
+                    att_id for att_id in problem._id_list
+                    if att_id not in used_attractions
                 ]
                 if not candidates:
                     break  # No more candidates available
 
                 # Randomly select an attraction from the candidates
-                selected_name = random.choice(candidates)
-                selected_attraction = next(att for att in problem.attractions if att['name'] == selected_name)
-                visit_time = problem._parse_duration(selected_attraction['visit_duration'])
-                attraction_cost = problem._parse_cost(selected_attraction['cost'])
+                selected_id = random.choice(candidates)
+                visit_time = problem._visit_h[selected_id]
+                attraction_cost = problem._ticket[selected_id]
 
                 # Check if adding this attraction exceeds the daily time limit or total budget
                 if day_time + visit_time > max_daily_time or day_cost + attraction_cost > max_total_budget:
                     break
 
                 # Update the random state with the selected attraction
-                random_state['itinerary'][day].append(selected_name)
-                used_attractions.add(selected_name)
+                random_state['itinerary'][day].append(selected_id)
+                used_attractions.add(selected_id)
                 day_cost += attraction_cost
                 day_time += visit_time
                 random_state['daily_time'][day] += visit_time
                 random_state['total_time'] += visit_time
                 random_state['total_cost'] += attraction_cost
-                random_state['current_location'] = selected_attraction['gps']  # Update current location
+                random_state['current_location'] = list(problem._gps[selected_id])  # Update current location
+                random_state['current_att'] = selected_id
                 attractions_today += 1  # Increment the count of attractions for today
 
-        return random_state
+        return PlanState.from_dict(random_state)
     def get_best(self,neighbors_list: List['Node'], problem: 'TourPlanningProblem') -> Tuple['Node', float]:
         """
         Get the neighbor with the best evaluation value.
@@ -579,11 +811,11 @@ class Node:
                 best_node = node
 
         return best_node, best_value
-    def suggest_hotels(self, problem, hotels_data, attractions_data):
+    def suggest_hotels(self, problem, hotels_data):
         """Suggest hotels for the current itinerary"""
         return find_hotels_for_itinerary(
             self.state['itinerary'],
-            attractions_data,
+            problem.catalog,
             hotels_data,
             problem.constraints['max_total_budget'],
             self.state['total_cost']
@@ -599,21 +831,24 @@ import math
 from typing import List, Tuple, Dict
 import json
 def load_attractions(json_file: str) -> List[Dict]:
-    """Load attractions from JSON file"""
+    """Load attractions from a JSON file, or map them from a compiled catalog (decoded on access)"""
+    if is_compiled_catalog(json_file):
+        return open_catalog(json_file).attraction_records
     with open(json_file, encoding="utf-8") as f:
         return json.load(f) 
 
-def create_initial_state(start_location: Tuple[float, float], user_prefs: Dict) -> Dict:
-    """Create initial state dictionary"""
-    return {
-        'current_location': start_location,
-        'itinerary': [[] for _ in range(7)],
-        'curr_day': 0,
-        'total_cost': 0.0,
-        'total_time': 0.0,
-        'daily_time': [0.0]*7,
-        'daily_distance': [0.0]*7         
-    }
+def create_initial_state(start_location: Tuple[float, float], user_prefs: Dict) -> PlanState:
+    """Create initial (empty 7-day) state"""
+    return PlanState(
+        current_location=start_location,
+        current_att=None,                 # catalog ID of current_location, None at the start
+        itinerary=[() for _ in range(7)],
+        curr_day=0,
+        total_cost=0.0,
+        total_time=0.0,
+        daily_time=[0.0]*7,
+        daily_distance=[0.0]*7,
+    )
 
 def estimate_travel_time(distance_km: float,
                         transport_mode: str = 'car') -> float:
@@ -621,27 +856,24 @@ def estimate_travel_time(distance_km: float,
     speeds = {'car': 50, 'bus': 40, 'walking': 5}
     return distance_km / speeds.get(transport_mode, 50)
 
-def calculate_day_time(itinerary_day: List[str],
-                     attractions: List[Dict],
-                     distance_matrix: Dict) -> float:
-    """Calculate total time for a single day's itinerary"""
+def calculate_day_time(itinerary_day: List[int],
+                     catalog: AttractionCatalog,
+                     distance_matrix) -> float:
+    """Calculate total time for a single day's itinerary (attraction IDs)"""
     total_time = 0
-    for i in range(len(itinerary_day)):
+    for i, att_id in enumerate(itinerary_day):
         if i > 0:
-            prev_att = next(a for a in attractions if a['name'] == itinerary_day[i-1])
-            curr_att = next(a for a in attractions if a['name'] == itinerary_day[i])
-            distance = distance_matrix[(prev_att['name'], curr_att['name'])]
+            distance = distance_matrix[itinerary_day[i-1], att_id]
             total_time += estimate_travel_time(distance)
-        total_time += TourPlanningProblem._parse_duration(curr_att['visit_duration'])
+        total_time += float(catalog.visit_hours[att_id])
     return total_time
 
-def calculate_total_cost(itinerary: List[List[str]],
-                       attractions: List[Dict]) -> float:
-    """Calculate total cost of itinerary"""
-    return sum(TourPlanningProblem._parse_cost(a['cost'])
+def calculate_total_cost(itinerary: List[List[int]],
+                       catalog: AttractionCatalog) -> float:
+    """Calculate total cost of itinerary (attraction IDs)"""
+    return float(sum(catalog.ticket_dzd[att_id]
               for day in itinerary
-              for att_name in day
-              for a in attractions if a['name'] == att_name)
+              for att_id in day))
 
 def estimate_hotel_costs(hotel_standard: Tuple[int, int],
                         num_nights: int = 7) -> float:
@@ -653,12 +885,27 @@ def estimate_hotel_costs(hotel_standard: Tuple[int, int],
 
 
 
-def find_hotels_for_itinerary(itinerary, attractions_data, hotels_data, total_budget, spent_cost, min_stars=3, max_stars=5):
+def find_hotels_for_itinerary(itinerary, catalog, hotels_data, total_budget, spent_cost, min_stars=3, max_stars=5,
+                              stats: 'SolverStats' = None):
     """
-    Find suitable hotels for cities in the itinerary within remaining budget.
+    Find suitable hotels for cities in the itinerary (lists of attraction IDs
+    into `catalog`) within remaining budget.
+    `hotels_data` is a prebuilt HotelIndex (or a list of hotel records, indexed on the fly).
     Returns a dictionary mapping days to list of suitable hotels (cheapest, middle, most expensive).
     Also returns the average total hotel cost.
+    `stats` (a SolverStats) receives the "hotels" time and the days priced.
     """
+    started = time.perf_counter()
+    try:
+        return _find_hotels(itinerary, catalog, hotels_data, total_budget, spent_cost, min_stars, max_stars, stats)
+    finally:
+        if stats is not None:
+            stats.add_time("hotels", time.perf_counter() - started)
+
+
+def _find_hotels(itinerary, catalog, hotels_data, total_budget, spent_cost, min_stars, max_stars, stats):
+    hotel_index = hotels_data if isinstance(hotels_data, HotelIndex) else HotelIndex(hotels_data)
+
     # Calculate remaining budget and max price per night
     remaining_budget = total_budget - spent_cost
     max_price_per_night = remaining_budget / 7 if remaining_budget > 0 else 0
@@ -668,17 +915,16 @@ def find_hotels_for_itinerary(itinerary, attractions_data, hotels_data, total_bu
     
     # Early warning if budget is exhausted
     if remaining_budget <= 0:
-        print("⚠️ Budget Warning: All funds have been spent on attractions - no budget left for hotels")
+        logger.debug("Budget exhausted by attractions - no budget left for hotels")
+        if stats is not None:
+            stats.event("hotels.budget_exhausted")
         return {}, 0
     
     for day_idx in range(7):
         # Get city of last attraction that day
         day_city = None
         if day_idx < len(itinerary) and itinerary[day_idx]:
-            last_att_name = itinerary[day_idx][-1]
-            last_att = next((a for a in attractions_data if a['name'] == last_att_name), None)
-            if last_att:
-                day_city = last_att['city']
+            day_city = catalog.city_of(itinerary[day_idx][-1])
         
         if not day_city:
             # If no attractions that day, use previous day's city
@@ -688,62 +934,30 @@ def find_hotels_for_itinerary(itinerary, attractions_data, hotels_data, total_bu
                     break
         
         if day_city:
-            # Find suitable hotels in this city with strict star rating first
-            suitable_hotels = [
-                hotel for hotel in hotels_data 
-                if hotel['city'].lower() == day_city.lower()
-                and min_stars <= hotel['avg_review'] <= max_stars
-                and hotel['price'] <= max_price_per_night
-            ]
-            
-            # If none found, relax the star rating constraint
-            if not suitable_hotels:
-                suitable_hotels = [
-                    hotel for hotel in hotels_data 
-                    if hotel['city'].lower() == day_city.lower()
-                    and hotel['price'] <= max_price_per_night
-                ]
-                # Sort by closest to desired star rating
-                suitable_hotels.sort(key=lambda x: abs(x['avg_review'] - (min_stars + max_stars)/2))
-                
-                if not suitable_hotels:
-                    print(f"⚠️ No hotels found in {day_city} within {max_price_per_night:.0f} DZD/night (even without star rating filter)")
-                    continue
-                else:
-                    print(f"ℹ️ Found hotels in {day_city} but none match your {min_stars}-{max_stars} star preference")
-                    print("   Showing best available options regardless of rating")
-            
-            # Sort by price
-            suitable_hotels.sort(key=lambda x: x['price'])
+            # Strict star rating first, relaxed if nothing in range
+            selected_hotels, relaxed = hotel_index.select(day_city, max_price_per_night, min_stars, max_stars)
+            if not selected_hotels:
+                logger.debug("No hotels found in %s within %.0f DZD/night", day_city, max_price_per_night)
+                if stats is not None:
+                    stats.event("hotels.day_unpriced")
+                continue
+            if relaxed:
+                logger.debug("Hotels in %s found outside the %s-%s star preference", day_city, min_stars, max_stars)
+                if stats is not None:
+                    stats.event("hotels.stars_relaxed")
             
-            # Select 3 hotels: cheapest, middle, most expensive
-            selected_hotels = []
-            if len(suitable_hotels) >= 3:
-                selected_hotels = [
-                    suitable_hotels[0],  # cheapest
-                    suitable_hotels[len(suitable_hotels)//2],  # middle
-                    suitable_hotels[-1]  # most expensive
-                ]
-            elif suitable_hotels:
-                selected_hotels = suitable_hotels
+            # Calculate average price for these hotels
+            avg_price = sum(h['price'] for h in selected_hotels) / len(selected_hotels)
+            total_hotel_cost += avg_price
             
-            if selected_hotels:
-                # Calculate average price for these hotels
-                avg_price = sum(h['price'] for h in selected_hotels) / len(selected_hotels)
-                total_hotel_cost += avg_price
-                
-                hotels_by_day[day_idx+1] = selected_hotels
+            hotels_by_day[day_idx+1] = selected_hotels
+    
+    if stats is not None:
+        stats.add("hotels.days_priced", len(hotels_by_day))
     
-    # Final summary of hotel findings
     if not hotels_by_day:
-        print("\n❌ No suitable hotels found for your entire itinerary")
-        print(f"   Visited cities: {', '.join(set(a['city'] for day in itinerary for a in attractions_data if a['name'] in day))}")
-        print(f"   Max price per night: {max_price_per_night:.0f} DZD")
-        print(f"   Star preference: {min_stars}-{max_stars} stars")
-    else:
-        missing_days = [d for d in range(1,8) if d not in hotels_by_day]
-        if missing_days:
-            print(f"\n⚠️ Note: No hotels found for day(s) {', '.join(map(str, missing_days))}")
+        logger.debug("No suitable hotels found for the itinerary (max %.0f DZD/night, %s-%s stars)",
+                     max_price_per_night, min_stars, max_stars)
     
     return hotels_by_day, total_hotel_cost
 
@@ -751,9 +965,116 @@ def find_hotels_for_itinerary(itinerary, attractions_data, hotels_data, total_bu
 # ============================================================================================
 
 import heapq
+import time
 from typing import Dict, Tuple
 
-def a_star_search(problem: TourPlanningProblem) -> Node:
+
+class SearchInterrupted(Exception):
+    """Raised inside a solver when its deadline passes or it is cancelled."""
+
+
+class SearchProgress:
+    """
+    Throttled progress reporting for the solvers.
+
+    A solver calls `phase(name)` when it starts and `tick()` once per
+    expanded node (through `check_budget`). `callback` receives
+    {"phase", "nodes", "elapsed"} on every phase change and otherwise at
+    most once per `interval` seconds.
+    """
+
+    def __init__(self, callback, interval: float = 0.25):
+        self.callback = callback
+        self.interval = interval
+        self.started = time.monotonic()
+        self.name = None
+        self.nodes = 0
+        self._next_report = 0.0
+
+    def phase(self, name: str) -> None:
+        self.name = name
+        self.nodes = 0
+        self._report(time.monotonic())
+
+    def tick(self) -> None:
+        self.nodes += 1
+        if self.nodes & 63 == 0:  # read the clock only every 64 nodes
+            now = time.monotonic()
+            if now >= self._next_report:
+                self._report(now)
+
+    def _report(self, now: float) -> None:
+        self._next_report = now + self.interval
+        self.callback({"phase": self.name, "nodes": self.nodes, "elapsed": round(now - self.started, 3)})
+
+
+class SolverStats:
+    """
+    Timings and counters of one solve, filled in by the solvers and
+    `find_hotels_for_itinerary` when passed as `stats=`.
+
+    `timings` maps a phase ("astar", "csp.domains", "hotels", ...) to
+    seconds; `counts` holds per-solve magnitudes (nodes expanded, peak
+    frontier, backtracks); `events` counts things that happened (domain
+    cache hits, the CSP→A* fallback). Solvers accumulate in locals and
+    record once per phase, so the hot loops only pay for integer adds.
+    """
+    __slots__ = ('timings', 'counts', 'events')
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self.events: Dict[str, int] = {}
+
+    def add_time(self, phase: str, seconds: float) -> None:
+        self.timings[phase] = self.timings.get(phase, 0.0) + seconds
+
+    def add(self, name: str, n: int = 1) -> None:
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    def peak(self, name: str, value: int) -> None:
+        if value > self.counts.get(name, 0):
+            self.counts[name] = value
+
+    def event(self, name: str) -> None:
+        self.events[name] = self.events.get(name, 0) + 1
+
+    def to_dict(self) -> Dict:
+        """Plain-data form (timings in ms), as sent back by solver workers."""
+        return {
+            "timings_ms": {k: round(v * 1000, 3) for k, v in self.timings.items()},
+            "counts": dict(self.counts),
+            "events": dict(self.events),
+        }
+
+    def merge(self, data: Dict) -> None:
+        """Add the `to_dict()` form of another solve's stats to these."""
+        for phase, ms in data.get("timings_ms", {}).items():
+            self.add_time(phase, ms / 1000)
+        for name, n in data.get("counts", {}).items():
+            self.add(name, n)
+        for name, n in data.get("events", {}).items():
+            self.events[name] = self.events.get(name, 0) + n
+
+
+def check_budget(deadline: float = None, cancel=None, progress: SearchProgress = None) -> None:
+    """Cooperative cancellation point for the solvers.
+
+    Args:
+        deadline: Absolute `time.monotonic()` value, or None for no limit.
+        cancel: Optional `threading.Event`-like object; set() stops the search.
+        progress: Optional SearchProgress, ticked once per call.
+    """
+    if progress is not None:
+        progress.tick()
+    if deadline is not None and time.monotonic() >= deadline:
+        raise SearchInterrupted("deadline exceeded")
+    if cancel is not None and cancel.is_set():
+        raise SearchInterrupted("cancelled")
+
+
+def a_star_search(problem: TourPlanningProblem, deadline: float = None, cancel=None,
+                  progress: SearchProgress = None, stats: SolverStats = None) -> Node:
     """
     A* search algorithm to find an optimal itinerary.
 
@@ -762,10 +1083,19 @@ def a_star_search(problem: TourPlanningProblem) -> Node:
 
     Args:
         problem (TourPlanningProblem): The problem instance containing the initial state, attractions, user preferences, and constraints.
+        deadline: Optional absolute `time.monotonic()` limit. When it passes,
+            the deepest node expanded so far is returned, marked approximate.
+        cancel: Optional event; setting it stops the search like a deadline.
+        progress: Optional SearchProgress receiving expanded-node counts.
+        stats: Optional SolverStats receiving the "astar" time, nodes
+            expanded and generated, and the peak frontier size.
 
     Returns:
         Node: The goal node representing the optimal itinerary, or None if no valid itinerary is found.
     """
+    if progress is not None:
+        progress.phase("astar")
+    started = time.perf_counter()
     # Initialize the root node with the initial state and zero path cost
     root = Node(problem.initial_state, path_cost=0.0)
     # Calculate the heuristic value for the root node
@@ -779,39 +1109,415 @@ def a_star_search(problem: TourPlanningProblem) -> Node:
     
     # Dictionary to track the best (cost, heuristic) values for each state
     best_values = {state_to_key(root.state): (root.path_cost, h_root)}
+    deepest = root
+    expanded = generated = peak_frontier = 0
 
-    while frontier:
-        # Pop the node with the lowest value from the frontier
-        _, _, node = heapq.heappop(frontier)
-        node_key = state_to_key(node.state)
-        current_cost, current_h = best_values[node_key]
+    try:
+        while frontier:
+            try:
+                check_budget(deadline, cancel, progress)
+            except SearchInterrupted:
+                if stats is not None:
+                    stats.event("astar.interrupted")
+                return _best_so_far(problem, deepest)
+
+            # Pop the node with the lowest value from the frontier
+            if len(frontier) > peak_frontier:
+                peak_frontier = len(frontier)
+            _, _, node = heapq.heappop(frontier)
+            node_key = state_to_key(node.state)
+            current_cost, current_h = best_values[node_key]
+
+            # Skip if a better path to this state has already been found
+            if node.path_cost > current_cost:
+                continue
 
-        # Skip if a better path to this state has already been found
-        if node.path_cost > current_cost:
-            continue
+            # Check if the current node represents a complete itinerary
+            if problem.is_goal(node.state):
+                return node
+            if node.depth > deepest.depth:
+                deepest = node
+
+            # Expand the current node to generate neighboring states
+            expanded += 1
+            for child in node.expand(problem):
+                generated += 1
+                child_key = state_to_key(child.state)
+                # Calculate the heuristic value for the child node
+                new_h = heuristic(problem, child.state)
+                new_cost = child.path_cost
+                # Calculate the total cost (f(n)) for the child node
+                f = new_cost + new_h
+
+                # Update the best values if the child node has a lower cost or heuristic
+                if child_key not in best_values or new_cost < best_values[child_key][0]:
+                    best_values[child_key] = (new_cost, new_h)
+                    child.value = f
+                    # Push the child node onto the frontier
+                    heapq.heappush(frontier, (f, id(child), child))
+
+        # Return None if no valid itinerary is found
+        return None
+    finally:
+        if stats is not None:
+            stats.add_time("astar", time.perf_counter() - started)
+            stats.add("astar.expanded", expanded)
+            stats.add("astar.generated", generated)
+            stats.peak("astar.peak_frontier", peak_frontier)
+
+def beam_search(problem: TourPlanningProblem, beam_width: int = 64, max_nodes: int = 20000,
+                deadline: float = None, cancel=None, progress: SearchProgress = None,
+                stats: SolverStats = None) -> Node:
+    """
+    Bounded-memory alternative to `a_star_search`.
 
-        # Check if the current node represents a complete itinerary
-        if problem.is_goal(node.state):
-            return node
+    The search proceeds layer by layer (one action per layer) and keeps only
+    the `beam_width` children with the lowest f(n) = g(n) + h(n), using the
+    same `Node.expand` and `heuristic` as A*. Memory is therefore bounded by
+    beam_width × branching factor, and work by `max_nodes` expansions.
+
+    Args:
+        problem: The tour planning problem instance.
+        beam_width: Number of nodes kept per layer.
+        max_nodes: Expansion budget; when it is spent the best partial node
+            is returned, marked approximate.
+        deadline: Optional absolute `time.monotonic()` limit.
+        cancel: Optional event; setting it stops the search.
+        progress: Optional SearchProgress receiving expanded-node counts.
+        stats: Optional SolverStats receiving the "beam" time, nodes
+            expanded and the widest layer before truncation.
 
-        # Expand the current node to generate neighboring states
-        for child in node.expand(problem):
-            child_key = state_to_key(child.state)
-            # Calculate the heuristic value for the child node
-            new_h = heuristic(problem, child.state)
-            new_cost = child.path_cost
-            # Calculate the total cost (f(n)) for the child node
-            f = new_cost + new_h
-
-            # Update the best values if the child node has a lower cost or heuristic
-            if child_key not in best_values or new_cost < best_values[child_key][0]:
-                best_values[child_key] = (new_cost, new_h)
-                child.value = f
-                # Push the child node onto the frontier
-                heapq.heappush(frontier, (f, id(child), child))
-
-    # Return None if no valid itinerary is found
-    return None
+    Returns:
+        Node: The best goal node found, an approximate partial node if the
+        budget ran out first, or None if every branch dead-ends.
+    """
+    if progress is not None:
+        progress.phase("beam")
+    started = time.perf_counter()
+    root = Node(problem.initial_state, path_cost=0.0)
+    root.value = root.path_cost + heuristic(problem, root.state)
+    beam = [root]
+    expanded = peak_layer = 0
+
+    try:
+        while beam:
+            goals = [node for node in beam if problem.is_goal(node.state)]
+            if goals:
+                return min(goals, key=lambda n: n.value)
+
+            layer = {}  # state key -> best child, so duplicates do not crowd the beam
+            for node in beam:
+                if expanded >= max_nodes:
+                    if stats is not None:
+                        stats.event("beam.node_budget_spent")
+                    return _best_so_far(problem, beam[0])
+                try:
+                    check_budget(deadline, cancel, progress)
+                except SearchInterrupted:
+                    if stats is not None:
+                        stats.event("beam.interrupted")
+                    return _best_so_far(problem, beam[0])
+                expanded += 1
+
+                for child in node.expand(problem):
+                    child.value = child.path_cost + heuristic(problem, child.state)
+                    key = state_to_key(child.state)
+                    other = layer.get(key)
+                    if other is None or child.value < other.value:
+                        layer[key] = child
+
+            peak_layer = max(peak_layer, len(layer))
+            beam = heapq.nsmallest(beam_width, layer.values(), key=lambda n: n.value)
+
+        return None
+    finally:
+        if stats is not None:
+            stats.add_time("beam", time.perf_counter() - started)
+            stats.add("beam.expanded", expanded)
+            stats.peak("beam.peak_layer", peak_layer)
+
+# Simulated annealing with a tabu list (see anneal_search)
+ANNEAL_TABU_TENURE = 25    # accepted moves an attraction stays tabu after entering or leaving the plan
+ANNEAL_NEIGHBOURS = 24     # nearest candidates an insertion or replacement draws from
+ANNEAL_COST_WEIGHT = 0.1   # value points the whole budget is worth; breaks ties towards cheaper plans
+ANNEAL_ITERATIONS = 20000  # move budget when neither a deadline nor max_iterations is given
+
+
+def _greedy_seed(problem: TourPlanningProblem, deadline: float = None, cancel=None,
+                 progress: SearchProgress = None) -> PlanState:
+    """
+    Fast constructive plan for `anneal_search`.
+
+    Fills the days in order, each time adding the valid attraction with the
+    best satisfaction weight per hour of travel, and moves to the next day
+    when nothing fits. One vectorized `actions()` call per attraction added,
+    so it takes milliseconds even on large catalogs. A day nothing fits
+    into is left empty.
+
+    Raises:
+        SearchInterrupted: With the partial plan as its argument.
+    """
+    weights = np.asarray(problem._sat_weight)
+    state = problem.initial_state
+    while state.curr_day < 7:
+        try:
+            check_budget(deadline, cancel, progress)
+        except SearchInterrupted:
+            raise SearchInterrupted(state)
+        adds = np.array([action[1] for action in problem.actions(state) if action[0] == 'add'],
+                        dtype=np.int64)
+        if len(adds):
+            score = weights[adds] / (1.0 + problem._distance_row(state)[adds] / 50)
+            state = problem.result(state, ('add', int(adds[np.argmax(score)])))
+        else:
+            state = state.next_day()
+    return state
+
+
+def anneal_search(problem: TourPlanningProblem, deadline: float = None, seed: int = None,
+                  max_iterations: int = None, tabu_tenure: int = ANNEAL_TABU_TENURE,
+                  cancel=None, progress: SearchProgress = None, stats: SolverStats = None) -> Node:
+    """
+    Local search with a fixed time budget: simulated annealing plus a tabu list.
+
+    Starts from `_greedy_seed` and keeps proposing random moves on the
+    complete plan until the deadline (or `max_iterations` moves): insert,
+    remove, replace (an attraction for one of its nearest unused
+    candidates), relocate (to another day) and swap. A move is kept only if
+    the plan still meets every hard constraint (per-day count, time and
+    distance, total budget); improving moves are always accepted, worse
+    ones with probability exp(Δ/T), where T cools geometrically over the
+    budget. An attraction that entered or left the plan may not leave or
+    re-enter it for `tabu_tenure` accepted moves, unless that yields a new
+    best plan.
+
+    The objective is `problem.value`. Feasible plans carry no penalties, so
+    it reduces to the satisfaction term, which is kept up to date move by
+    move; a small cost term (`ANNEAL_COST_WEIGHT`) breaks ties.
+
+    All random choices come from `random.Random(seed)`, so a run that stops
+    on `max_iterations` is reproducible; one that stops on the deadline
+    depends on how many moves fit in it.
+
+    Args:
+        problem: The tour planning problem instance.
+        deadline: Absolute `time.monotonic()` limit; the search runs until it.
+        seed: Seed for the move generator.
+        max_iterations: Optional move budget (`ANNEAL_ITERATIONS` when
+            there is no deadline either).
+        tabu_tenure: Accepted moves an attraction stays tabu.
+        cancel: Optional event; setting it stops the search early.
+        progress: Optional SearchProgress receiving move counts.
+        stats: Optional SolverStats receiving the "anneal" time and the
+            moves tried, accepted and improving the best plan.
+
+    Returns:
+        Node: The best plan found (approximate if a day is left empty), or
+        None if not a single attraction fits.
+    """
+    if progress is not None:
+        progress.phase("anneal")
+    started = time.perf_counter()
+    if deadline is None and max_iterations is None:
+        max_iterations = ANNEAL_ITERATIONS
+    iterations = accepted = improved = tabu_hits = 0
+
+    try:
+        try:
+            seed_state = _greedy_seed(problem, deadline, cancel, progress)
+        except SearchInterrupted as e:
+            if stats is not None:
+                stats.event("anneal.interrupted")
+            partial = e.args[0] if e.args and isinstance(e.args[0], PlanState) else problem.initial_state
+            return _best_so_far(problem, Node(partial, path_cost=partial.total_cost))
+
+        constraints = problem.constraints
+        max_per_day = constraints['max_attractions_per_day']
+        if max_per_day <= 0:
+            return None  # no attraction fits on any day: infeasible
+        max_time = constraints['max_daily_time']
+        max_km = constraints.get('max_daily_distance')
+        budget = constraints.get('max_total_budget')
+        matrix, start_row = problem.distances.matrix, problem._start_row
+        visit_h, ticket, weight = problem._visit_h, problem._ticket, problem._sat_weight
+        dzd_per_km = problem.dzd_per_km
+        pool = problem.candidate_ids
+        pool_arr = problem._candidate_arr
+
+        def measure(days):
+            """(daily_time, daily_distance, total_cost), or None if a limit is broken."""
+            prev = -1
+            times, kms, cost = [], [], 0.0
+            for day in days:
+                hours = km = 0.0
+                for att_id in day:
+                    leg = float(start_row[att_id] if prev < 0 else matrix[prev, att_id])
+                    km += leg
+                    hours += leg / 50 + visit_h[att_id]
+                    cost += ticket[att_id] + leg * dzd_per_km
+                    prev = att_id
+                if hours > max_time or (max_km is not None and km > max_km):
+                    return None
+                times.append(hours)
+                kms.append(km)
+            if budget is not None and cost > budget:
+                return None
+            return times, kms, cost
+
+        rng = random.Random(seed)
+        nearest = {}
+
+        def draw(anchor: int) -> int:
+            """A random candidate, half the time one of the nearest to `anchor` (-1: the start)."""
+            if len(pool) <= ANNEAL_NEIGHBOURS or rng.random() < 0.5:
+                return pool[int(rng.random() * len(pool))]
+            near = nearest.get(anchor)
+            if near is None:
+                dist = (start_row if anchor < 0 else matrix[anchor])[pool_arr]
+                near = nearest[anchor] = pool_arr[
+                    np.argpartition(dist, ANNEAL_NEIGHBOURS - 1)[:ANNEAL_NEIGHBOURS]].tolist()
+            return near[int(rng.random() * len(near))]
+
+        def anchor_before(days, d: int, p: int) -> int:
+            if p > 0:
+                return days[d][p - 1]
+            for earlier in range(d - 1, -1, -1):
+                if days[earlier]:
+                    return days[earlier][-1]
+            return -1
+
+        days = [list(day) for day in seed_state.itinerary]
+        in_plan = {att_id for day in days for att_id in day}
+        metrics = measure(days) or (list(seed_state.daily_time), list(seed_state.daily_distance),
+                                    seed_state.total_cost)
+        score = sum(weight[att_id] for att_id in in_plan)
+        scale = 100.0 / (10 * 5 * 7 * max_per_day)  # `_calculate_satisfaction`'s normalization
+        cost_scale = ANNEAL_COST_WEIGHT / budget if budget else 0.0
+        energy = score * scale - metrics[2] * cost_scale
+        best = (energy, [tuple(day) for day in days], metrics, score)
+
+        # one average attraction's worth of value at the start, a thousandth of it at the end
+        t_start = scale * (sum(weight[att_id] for att_id in pool) / len(pool)) if pool else 0.0
+        tabu = {}
+        begin = time.monotonic()
+        span = deadline - begin if deadline is not None else None
+
+        while pool and (max_iterations is None or iterations < max_iterations):
+            try:
+                check_budget(deadline, cancel, progress)
+            except SearchInterrupted:
+                break
+            iterations += 1
+            frac = iterations / max_iterations if max_iterations else 0.0
+            if span is not None:
+                frac = max(frac, (time.monotonic() - begin) / span if span > 0 else 1.0)
+            temperature = t_start * 0.001 ** min(frac, 1.0)
+
+            # propose: the changed days plus who enters and who leaves the plan
+            new_days = days[:]
+            entering = leaving = -1
+            move = rng.random()
+            d = int(rng.random() * 7)
+            day = days[d]
+            if move < 0.3:  # insert
+                if len(day) >= max_per_day:
+                    continue
+                p = int(rng.random() * (len(day) + 1))
+                entering = draw(anchor_before(days, d, p))
+                new_days[d] = day[:p] + [entering] + day[p:]
+            elif move < 0.45:  # remove (days are never emptied)
+                if len(day) < 2:
+                    continue
+                p = int(rng.random() * len(day))
+                leaving = day[p]
+                new_days[d] = day[:p] + day[p + 1:]
+            elif move < 0.7:  # replace
+                if not day:
+                    continue
+                p = int(rng.random() * len(day))
+                leaving = day[p]
+                entering = draw(leaving)
+                new_days[d] = day[:p] + [entering] + day[p + 1:]
+            elif move < 0.85:  # relocate to another day
+                d2 = int(rng.random() * 7)
+                if d2 == d or len(day) < 2 or len(days[d2]) >= max_per_day:
+                    continue
+                p, p2 = int(rng.random() * len(day)), int(rng.random() * (len(days[d2]) + 1))
+                new_days[d] = day[:p] + day[p + 1:]
+                new_days[d2] = days[d2][:p2] + [day[p]] + days[d2][p2:]
+            else:  # swap two attractions, within a day or between days
+                d2 = int(rng.random() * 7)
+                if not day or not days[d2]:
+                    continue
+                p, p2 = int(rng.random() * len(day)), int(rng.random() * len(days[d2]))
+                if d == d2:
+                    if p == p2:
+                        continue
+                    new_day = day[:]
+                    new_day[p], new_day[p2] = new_day[p2], new_day[p]
+                    new_days[d] = new_day
+                else:
+                    new_days[d] = day[:p] + [days[d2][p2]] + day[p + 1:]
+                    new_days[d2] = days[d2][:p2] + [day[p]] + days[d2][p2 + 1:]
+            if entering >= 0 and entering in in_plan:
+                continue
+
+            new_metrics = measure(new_days)
+            if new_metrics is None:
+                continue
+            new_score = score
+            if entering >= 0:
+                new_score += weight[entering]
+            if leaving >= 0:
+                new_score -= weight[leaving]
+            new_energy = new_score * scale - new_metrics[2] * cost_scale
+            if (tabu.get(entering, -1) > accepted or tabu.get(leaving, -1) > accepted) \
+                    and new_energy <= best[0]:
+                tabu_hits += 1
+                continue
+            delta = new_energy - energy
+            if delta < 0 and (temperature <= 0 or rng.random() >= math.exp(delta / temperature)):
+                continue
+
+            accepted += 1
+            days, metrics, score, energy = new_days, new_metrics, new_score, new_energy
+            for att_id in (entering, leaving):
+                if att_id >= 0:
+                    tabu[att_id] = accepted + tabu_tenure
+            if entering >= 0:
+                in_plan.add(entering)
+            if leaving >= 0:
+                in_plan.discard(leaving)
+            if energy > best[0]:
+                improved += 1
+                best = (energy, [tuple(day) for day in days], metrics, score)
+
+        _, itinerary, (daily_time, daily_distance, total_cost), score = best
+        if not any(itinerary):
+            return None
+        last = next(day[-1] for day in reversed(itinerary) if day)
+        state = PlanState(problem._gps[last], itinerary, curr_day=7, total_cost=total_cost,
+                          total_time=sum(daily_time), daily_time=daily_time,
+                          daily_distance=daily_distance, current_att=last, score=score)
+        node = Node(state, path_cost=total_cost)
+        node.value = problem.value(state)
+        node.approximate = not all(itinerary)
+        return node
+    finally:
+        if stats is not None:
+            stats.add_time("anneal", time.perf_counter() - started)
+            stats.add("anneal.iterations", iterations)
+            stats.add("anneal.accepted", accepted)
+            stats.add("anneal.improved", improved)
+            stats.add("anneal.tabu_rejected", tabu_hits)
+
+def _best_so_far(problem: TourPlanningProblem, node: Node) -> Node:
+    """Mark a partial node as the approximate answer of an interrupted search."""
+    if node is None or not any(node.state['itinerary']):
+        return None
+    node.approximate = True
+    node.value = problem.value(node.state)
+    return node
 
 def heuristic(problem: TourPlanningProblem, state: Dict) -> float:
     """
@@ -834,47 +1540,40 @@ def heuristic(problem: TourPlanningProblem, state: Dict) -> float:
     """
     total_h = 0.0
     max_per_day = problem.constraints['max_attractions_per_day']
-    remaining_days = 7 - state['curr_day']
+    curr_day = state['curr_day']
+    itinerary = state['itinerary']
+    remaining_days = 7 - curr_day
     
     # Penalize for unused days to encourage filling all days
     total_h += remaining_days * 100  # Arbitrary penalty weight
     
+    today = itinerary[curr_day] if curr_day < len(itinerary) else None
+
     # If the current day isn't full, encourage adding more attractions
-    if state['curr_day'] < len(state['itinerary']):
-        curr_day_attractions = len(state['itinerary'][state['curr_day']])
+    if today is not None:
+        curr_day_attractions = len(today)
         if curr_day_attractions < max_per_day:
             total_h -= (max_per_day - curr_day_attractions) * 200  # Increased bonus for adding more
     
     # Estimate proximity cost for remaining attractions
-    if state['curr_day'] < len(state['itinerary']) and state['itinerary'][state['curr_day']]:
-        last_attraction = state['itinerary'][state['curr_day']][-1]
-        last_att = next(a for a in problem.attractions if a['name'] == last_attraction)
-        last_coords = last_att['gps']
-        
-        avg_distance = sum(
-            problem._calculate_distance(last_coords, a['gps'])
-            for a in problem.attractions
-            if a['name'] not in [att for day in state['itinerary'] for att in day]
-        ) / len(problem.attractions)
+    if today:
+        # unvisited distance mass is maintained incrementally by problem.result()
+        avg_distance = problem.unvisited_distance(state) / len(problem._id_list)
         
         total_h += avg_distance * 5  # Decreased weight for proximity
     
     # Consider the cost to ensure proximity
     total_h += state['total_cost'] / 200  # Decreased weight for cost
     
-    # Encourage attractions from preferred categories
-    preferred_categories = set(problem.user_prefs.get('categories', []))
-    if state['curr_day'] < len(state['itinerary']):
-        current_day_attractions = state['itinerary'][state['curr_day']]
-        for att_name in current_day_attractions:
-            att = next(a for a in problem.attractions if a['name'] == att_name)
-            if att['category'] in preferred_categories:
+    # Encourage attractions from preferred categories (at most max_per_day entries)
+    if today is not None:
+        for att_id in today:
+            if problem._is_preferred[att_id]:
                 total_h -= 100  # Increased bonus for preferred categories
     
     # Reward states with more attractions on the current day
-    if state['curr_day'] < len(state['itinerary']):
-        curr_day_attractions = len(state['itinerary'][state['curr_day']])
-        total_h -= curr_day_attractions * 150  # Reward for more attractions per day
+    if today is not None:
+        total_h -= len(today) * 150  # Reward for more attractions per day
     
     return total_h
 
@@ -884,23 +1583,111 @@ def state_to_key(state: Dict) -> Tuple:
     the current day and the itinerary, which is unique to each planning state.
     
     Args:
-        state: The state dictionary
+        state: The search state
         
     Returns:
         A tuple that uniquely identifies the state
     """
+    if isinstance(state, PlanState):
+        return state.key()    # days are already tuples
     return (state['curr_day'], tuple(tuple(day) for day in state['itinerary']))
 
 # ============================================================================================
 # CSP-style constructive planner (time-limited greedy with constraints)
 
-import time
-import itertools
+import os
+import threading
 import collections
 
+
+class DomainTemplateCache:
+    """
+    Thread-safe LRU of built CSP domain templates, bounded by total tuple count.
+
+    A template (the sorted domain tuples plus their forward-checking index)
+    depends on the POI pool and the per-day limits but not on the start
+    location or budget, so requests that only differ in those share one.
+    Keys carry the dataset version, so templates of a reloaded dataset are
+    never reused and simply age out.
+    """
+
+    def __init__(self, max_tuples: int):
+        self.max_tuples = max_tuples
+        self._entries: "collections.OrderedDict[Tuple, Tuple[int, Dict]]" = collections.OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Tuple) -> Dict | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Tuple, template: Dict, n_tuples: int) -> None:
+        # one entry larger than the whole budget would evict everything else
+        if n_tuples > self.max_tuples:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= old[0]
+            self._entries[key] = (n_tuples, template)
+            self._size += n_tuples
+            while self._size > self.max_tuples:
+                _, (size, _) = self._entries.popitem(last=False)
+                self._size -= size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'tuples': self._size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+# Shared by every TourCSP of this process; a tuple costs roughly 0.5 KB
+DOMAIN_CACHE = DomainTemplateCache(int(os.environ.get('CSP_DOMAIN_CACHE_TUPLES', 200_000)))
+
+# Subsets of one size enumerated per city before `_subset_paths` switches to sampling
+DOMAIN_SUBSETS_PER_LEVEL = int(os.environ.get('CSP_DOMAIN_SUBSETS_PER_LEVEL', 1000))
+
+# TourCSP attributes making up a domain template (see `_index_domain`)
+_TEMPLATE_FIELDS = ('domain_template', 'tup_first', 'tup_last', 'tup_time', 'tup_cost', 'tuples_with')
+
+
 class TourCSP:
-    def __init__(self, *, start_location, attractions, constraints, user_prefs):
+    # (deadline, cancel, progress) checked while a domain is being built
+    _budget = (None, None, None)
+
+    def __init__(self, *, start_location, attractions, constraints, user_prefs, catalog=None, seed=None,
+                 stats: SolverStats = None, attraction_ids=None, deadline: float = None, cancel=None,
+                 progress: SearchProgress = None):
+        """
+        Build (or fetch from DOMAIN_CACHE) the domain for these attractions and limits.
+
+        `deadline`, `cancel` and `progress` bound the domain build like the
+        search (see `check_budget`); when it is interrupted,
+        SearchInterrupted propagates and nothing is cached.
+        """
         self.start_loc = start_location
+        # Sampling of long domain tuples is reproducible when a seed is given
+        self.rng = random.Random(seed) if seed is not None else random
         self.atts_full = attractions
         self.Kmax = constraints["max_attractions_per_day"]
         self.T_day_max = constraints["max_daily_time"]
@@ -908,59 +1695,74 @@ class TourCSP:
         self.rate_km = 6.0 if constraints.get("has_car", False) else 10.0
         self.user_prefs = user_prefs
 
-        # Quick look-ups
-        self.coords = {a["name"]: a["gps"] for a in self.atts_full}
-        self.visH = {a["name"]: self._parse_duration(a["visit_duration"]) for a in self.atts_full}
-        self.ticket = {a["name"]: self._parse_cost(a["cost"]) for a in self.atts_full}
-        self.rating = {a["name"]: a.get("rating", 3.0) for a in self.atts_full}
-        self.category = {a["name"]: a.get("category", "Unknown") for a in self.atts_full}
+        # Quick look-ups: catalog columns indexed by attraction ID
+        self.catalog = catalog if catalog is not None else catalog_for(attractions)
+        self.visH = self.catalog.visit_hours.tolist()
+        self.ticket = self.catalog.ticket_dzd.tolist()
+        self.rating = self.catalog.rating.tolist()
+        self.is_preferred = self.catalog.category_mask(user_prefs.get("categories", [])).tolist()
 
         # Restrict POIs to preferred categories
-        pref_cats = set(user_prefs.get("categories", []))
-        self.pool = [a["name"] for a in self.atts_full if not pref_cats or a["category"] in pref_cats]
-        
+        if attraction_ids is None:
+            attraction_ids = self.catalog.ids_for_records(self.atts_full)
+        ids = np.asarray(attraction_ids, dtype=np.int64).tolist()
+        pref_cats = user_prefs.get("categories", [])
+        self.pool = [i for i in ids if not pref_cats or self.is_preferred[i]]
+
         # If too few attractions, add some others
         if len(self.pool) < 14:
-            other_attractions = [a["name"] for a in self.atts_full if a["name"] not in self.pool]
-            other_atts_sorted = sorted(other_attractions, key=lambda n: self.rating[n], reverse=True)
+            in_pool = set(self.pool)
+            other_attractions = [i for i in ids if i not in in_pool]
+            other_atts_sorted = sorted(other_attractions, key=lambda i: self.rating[i], reverse=True)
             self.pool.extend(other_atts_sorted[:14 - len(self.pool)])
 
-        # Distance cache
-        self.dist = {}
-        names = list(self.pool)
-        for i, n1 in enumerate(names):
-            for n2 in names[i+1:]:
-                d = self._haversine(self.coords[n1], self.coords[n2])
-                self.dist[(n1, n2)] = d
-                self.dist[(n2, n1)] = d
-            self.dist[(None, n1)] = self.dist[(n1, None)] = self._haversine(self.start_loc, self.coords[n1])
-
-        # Pre-compute domain tuples
-        self.domain_template = self._build_domain_tuples()
-        self.domain_template.sort(key=self._tuple_value, reverse=True)
-
-    def _haversine(self, c1, c2):
-        lat1, lon1 = map(math.radians, c1)
-        lat2, lon2 = map(math.radians, c2)
-        dlat, dlon = lat2 - lat1, lon2 - lon1
-        a = math.sin(dlat / 2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon / 2)**2
-        return 6371 * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-
-    def _parse_duration(self, txt: str) -> float:
-        txt = txt.lower()
-        m = re.match(r"(\d+(?:\.\d+)?)(?:-(\d+(?:\.\d+)?))?\s*(?:h|hour|hrs?)", txt)
-        if not m:
-            return 2.0
-        lo = float(m.group(1))
-        hi = float(m.group(2)) if m.group(2) else lo
-        return (lo + hi) / 2.0
-
-    def _parse_cost(self, txt: str) -> float:
-        txt = txt.lower()
-        if "free" in txt or "variable" in txt:
-            return 0.0
-        m = re.search(r"(\d+(?:\.\d+)?)", txt)
-        return float(m.group(1)) if m else 0.0
+        # Shared per-catalog distance matrix, plus the row for the start location
+        self.D = self.catalog.distances.matrix
+        self.start_row = self.catalog.distances.from_point(*self.start_loc)
+        self._reach = {}
+
+        # Pre-compute domain tuples, or reuse the template of an earlier request
+        # with the same pool, limits and sampling seed
+        key = (self.catalog.version, seed, tuple(sorted(pref_cats)), tuple(self.pool),
+               self.Kmax, self.T_day_max, self.rate_km)
+        started = time.perf_counter()
+        template = DOMAIN_CACHE.get(key)
+        if template is None:
+            self._budget = (deadline, cancel, progress)
+            try:
+                self.domain_template = self._build_domain_tuples()
+            except SearchInterrupted:
+                if stats is not None:
+                    stats.add_time("csp.domains", time.perf_counter() - started)
+                raise
+            finally:
+                del self._budget
+            self.domain_template.sort(key=self._tuple_value, reverse=True)
+            self._index_domain()
+            DOMAIN_CACHE.put(key, {f: getattr(self, f) for f in _TEMPLATE_FIELDS}, len(self.domain_template))
+        else:
+            # read-only from here on: solve() only reads the template
+            for field, value in template.items():
+                setattr(self, field, value)
+        if stats is not None:
+            stats.add_time("csp.domains", time.perf_counter() - started)
+            stats.event("csp.domain_cache_miss" if template is None else "csp.domain_cache_hit")
+            stats.add("csp.pool", len(self.pool))
+            stats.add("csp.domain_tuples", len(self.domain_template))
+
+    def rebased(self, start_location, constraints) -> 'TourCSP':
+        """
+        Copy of this CSP for another start location and budget, sharing the
+        pool and the (indexed) domain template. `constraints` may differ from
+        ours in `max_total_budget` only.
+        """
+        clone = copy.copy(self)
+        clone.start_loc = start_location
+        clone.B_week_max = constraints["max_total_budget"]
+        clone.start_row = self.catalog.distances.from_point(*start_location)
+        # reach masks of attractions carry over; the start location's does not
+        clone._reach = {k: v for k, v in self._reach.items() if k is not None}
+        return clone
 
     def _tuple_metrics(self, seq):
         """Return (internal_time, internal_cost, internal_distance) of an ordered POI sequence."""
@@ -970,7 +1772,7 @@ class TourCSP:
         c = sum(self.ticket[a] for a in seq)
         dist = 0.0
         for i in range(1, len(seq)):
-            d = self.dist.get((seq[i-1], seq[i]), 0.0)
+            d = float(self.D[seq[i-1], seq[i]])
             t += d / 50.0
             c += d * self.rate_km
             dist += d
@@ -978,170 +1780,355 @@ class TourCSP:
 
     def _tuple_value(self, tup):
         length_value = len(tup["seq"]) * 1000
-        rating_value = sum(self.rating[name] for name in tup["seq"]) * 100
-        pref_cats = set(self.user_prefs.get("categories", []))
-        category_value = sum(50 if self.category[name] in pref_cats else 0 for name in tup["seq"])
+        rating_value = sum(self.rating[att_id] for att_id in tup["seq"]) * 100
+        category_value = sum(50 if self.is_preferred[att_id] else 0 for att_id in tup["seq"])
         efficiency = len(tup["seq"]) / (tup["time"] + 1e-6) * 200
         return length_value + rating_value + category_value + efficiency
 
     def _build_domain_tuples(self):
+        """
+        One domain tuple per ordering that is Pareto-optimal for its attraction set.
+
+        For a fixed set, time, cost and distance all grow with the internal
+        path length alone, so the non-dominated orderings are exactly the
+        shortest open path through the set and its reverse (same metrics,
+        other end points). Every other permutation is dominated and never
+        generated. Single-city sets come from `_subset_paths`; multi-city
+        sets are sampled from the whole pool.
+        """
         tuples = []
+        seen = set()
+
+        def add(seq):
+            for ordering in ((seq, seq[::-1]) if len(seq) > 1 else (seq,)):
+                time_h, cost, dist = self._tuple_metrics(ordering)
+                if time_h <= self.T_day_max:
+                    tuples.append({
+                        "seq": ordering,
+                        "set": set(ordering),
+                        "time": time_h,
+                        "cost": cost,
+                        "distance": dist
+                    })
+
         attractions_by_city = collections.defaultdict(list)
-        for name in self.pool:
-            city = next((a["city"] for a in self.atts_full if a["name"] == name), "Unknown")
-            attractions_by_city[city].append(name)
-        
+        city_id = self.catalog.city_id
+        for att_id in self.pool:
+            attractions_by_city[int(city_id[att_id])].append(att_id)
+
         for city, city_attractions in attractions_by_city.items():
-            for k in range(1, min(self.Kmax + 1, len(city_attractions) + 1)):
-                if k <= 3 or len(city_attractions) <= 5:
-                    for seq in itertools.permutations(city_attractions, k):
-                        time_h, cost, dist = self._tuple_metrics(seq)
-                        if time_h <= self.T_day_max:
-                            tuples.append({
-                                "seq": seq,
-                                "set": set(seq),
-                                "time": time_h,
-                                "cost": cost,
-                                "distance": dist
-                            })
-                else:
-                    for _ in range(min(100, math.factorial(len(city_attractions)) // math.factorial(len(city_attractions) - k))):
-                        seq = tuple(random.sample(city_attractions, k))
-                        time_h, cost, dist = self._tuple_metrics(seq)
-                        if time_h <= self.T_day_max:
-                            tuples.append({
-                                "seq": seq,
-                                "set": set(seq),
-                                "time": time_h,
-                                "cost": cost,
-                                "distance": dist
-                            })
-        
+            check_budget(*self._budget)
+            for seq in self._subset_paths(city_attractions, self.Kmax).values():
+                seen.add(frozenset(seq))
+                add(seq)
+
         if len(attractions_by_city) > 1:
             for k in range(2, self.Kmax + 1):
+                if k > len(self.pool):
+                    break
                 for _ in range(min(200, len(self.pool)**2)):
-                    seq = tuple(random.sample(self.pool, k))
-                    time_h, cost, dist = self._tuple_metrics(seq)
-                    if time_h <= self.T_day_max:
-                        tuples.append({
-                            "seq": seq,
-                            "set": set(seq),
-                            "time": time_h,
-                            "cost": cost,
-                            "distance": dist
-                        })
-        
-        return tuples
-
-    def solve(self):
-        assignment = [None] * 7
-        domains = [self.domain_template[:] for _ in range(7)]
-        used = set()
-        spent = 0.0
-        current_location = self.start_loc
-
-        def backtrack(depth, spent, used, current_location):
-            if depth == 7:
-                return assignment, spent
-
-            unassigned = [d for d in range(7) if assignment[d] is None]
-            day = min(unassigned, key=lambda d: len(domains[d]))
-
-            sorted_dom = sorted(domains[day], key=lambda t: self._haversine(current_location, self.coords[t["seq"][0]]) if t["seq"] else float('inf'))
+                    check_budget(*self._budget)
+                    subset = self.rng.sample(self.pool, k)
+                    key = frozenset(subset)
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    full = (1 << k) - 1
+                    seq = self._subset_paths(subset, k, exhaustive=True).get(full)
+                    if seq is not None:
+                        add(seq)
 
-            for tup in sorted_dom:
-                if tup["set"] & used:
-                    continue
+        return tuples
 
-                first_attr = tup["seq"][0] if tup["seq"] else None
-                if first_attr:
-                    travel_dist = self._haversine(current_location, self.coords[first_attr])
-                    travel_time = travel_dist / 50.0
-                    travel_cost = travel_dist * self.rate_km
-                    total_time_d = travel_time + tup["time"]
-                    total_cost_d = travel_cost + tup["cost"]
-                else:
-                    total_time_d = 0.0
-                    total_cost_d = 0.0
+    def _subset_paths(self, ids, max_k, exhaustive=False):
+        """
+        Shortest open path through subsets of `ids` with up to `max_k` attractions.
+
+        Held–Karp over subset bitmasks, level by level: best[mask][j] is the
+        shortest path visiting `mask` and ending at j, built from
+        best[mask - j][i] + D[i, j]. A subset whose shortest path already
+        exceeds the daily time is not extended (by the triangle inequality a
+        superset's path is never shorter).
+
+        Unless `exhaustive`, any level with more than
+        `DOMAIN_SUBSETS_PER_LEVEL` candidate subsets is sampled, the pair
+        level included. That is a deliberate trade-off: a city with more than
+        about 45 candidates no longer has every two-attraction day in the
+        domain, and which ones it gets depends on the seed. Enumerating pairs
+        in full makes the domain quadratic in the city size, and at a few
+        thousand attractions it made the CSP several times slower while the
+        extra pair tuples crowded out the search.
 
-                if total_time_d > self.T_day_max:
-                    continue
-                if spent + total_cost_d > self.B_week_max:
-                    continue
+        Returns:
+            {mask: shortest path as a tuple of attraction IDs} of every
+            time-feasible subset visited.
+        """
+        n = len(ids)
+        D = self.D[np.ix_(ids, ids)].astype(np.float64).tolist()
+        visit = [self.visH[a] for a in ids]
+        limit = self.T_day_max
+
+        # mask -> {last: (distance, path of local indices)}
+        level = {1 << i: {i: (0.0, (i,))} for i in range(n) if visit[i] <= limit}
+        paths = {}
+        for k in range(1, max_k + 1):
+            for mask, ends in level.items():
+                paths[mask] = tuple(ids[i] for i in min(ends.values())[1])
+            if k == max_k:
+                break
+
+            # each (k+1)-subset is generated once, from itself minus its highest member
+            candidates = [mask | (1 << j) for mask in level for j in range(mask.bit_length(), n)]
+            if not exhaustive and len(candidates) > DOMAIN_SUBSETS_PER_LEVEL:
+                candidates = self.rng.sample(candidates, DOMAIN_SUBSETS_PER_LEVEL)
+
+            next_level = {}
+            deadline, cancel, progress = self._budget
+            for mask in candidates:
+                check_budget(deadline, cancel, progress)
+                members = []
+                rest = mask
+                while rest:
+                    low = rest & -rest
+                    members.append(low.bit_length() - 1)
+                    rest ^= low
+                ends = {}
+                for j in members:
+                    prev = level.get(mask ^ (1 << j))
+                    if prev is None:
+                        continue  # infeasible (or not sampled): no path through it
+                    dist, path = min((d + D[i][j], p) for i, (d, p) in prev.items())
+                    ends[j] = (dist, path + (j,))
+                if ends and sum(visit[j] for j in members) + min(ends.values())[0] / 50.0 <= limit:
+                    next_level[mask] = ends
+            level = next_level
+        return paths
+
+    def _index_domain(self):
+        """
+        Encode the domain template for forward checking: NumPy columns for
+        each tuple's first attraction, time and cost, plus (per attraction)
+        the indices of the tuples that contain it.
+        """
+        tpl = self.domain_template
+        self.tup_first = np.array([t["seq"][0] for t in tpl], dtype=np.int64)
+        self.tup_last = [t["seq"][-1] for t in tpl]
+        self.tup_time = np.array([t["time"] for t in tpl], dtype=np.float64)
+        self.tup_cost = np.array([t["cost"] for t in tpl], dtype=np.float64)
+        members = collections.defaultdict(list)
+        for i, t in enumerate(tpl):
+            for att_id in t["set"]:
+                members[att_id].append(i)
+        self.tuples_with = {att_id: np.array(idx, dtype=np.int64) for att_id, idx in members.items()}
+
+    def _row_from(self, att_id):
+        """Distance row from an attraction, or from the start location when None."""
+        return self.start_row if att_id is None else self.D[att_id]
+
+    def _in_reach(self, att_id):
+        """
+        Boolean mask over the catalog of attractions within a full day's
+        drive of `att_id` (or the start location when None), from the
+        catalog's spatial index; memoized for up to 256 attractions.
+        """
+        mask = self._reach.get(att_id)
+        if mask is None:
+            if len(self._reach) >= 256:
+                self._reach.clear()
+            lat, lon = self.start_loc if att_id is None else self.catalog.gps(att_id)
+            mask = np.zeros(len(self.catalog), dtype=bool)
+            mask[self.catalog.spatial.within(lat, lon, self.T_day_max * 50.0 + 1e-3)[0]] = True
+            self._reach[att_id] = mask
+        return mask
+
+    def solve(self, deadline: float = None, cancel=None, progress: SearchProgress = None,
+              stats: SolverStats = None):
+        """
+        Backtracking search over the domain tuples.
 
-                assignment[day] = tup
-                new_spent = spent + total_cost_d
-                new_used = used | tup["set"]
-                new_current_location = self.coords[tup["seq"][-1]] if tup["seq"] else current_location
+        Args:
+            deadline: Optional absolute `time.monotonic()` limit, checked at
+                every search node.
+            cancel: Optional event; setting it stops the search.
+            progress: Optional SearchProgress receiving search-node counts.
+            stats: Optional SolverStats receiving the "csp.search" time,
+                search nodes, backtracks, forward-checking prunes and the
+                deepest day assigned.
 
-                new_domains = [list(filter(lambda t: not (t["set"] & tup["set"]), domains[d])) for d in range(7)]
-                if all(new_domains[d] or assignment[d] is not None for d in range(7)):
-                    result = backtrack(depth + 1, new_spent, new_used, new_current_location)
+        Returns:
+            The complete state dict, or, if interrupted, the deepest partial
+            assignment found so far with "approximate": True; None if no
+            assignment was found.
+        """
+        self.interrupted = False
+        if progress is not None:
+            progress.phase("csp")
+        started = time.perf_counter()
+        tally = {"nodes": 0, "backtracks": 0, "pruned": 0}
+        best = {"depth": 0, "assign": [], "spent": 0.0}
+        assignment = [None] * 7
+        # Every day draws from the same template and the only inter-day
+        # constraint is disjointness, so all unassigned days share one
+        # boolean domain mask. That also makes MRV pick days in order.
+        alive = np.ones(len(self.domain_template), dtype=bool)
+
+        def forward_check(t_idx):
+            """Prune every tuple sharing an attraction with tuple `t_idx`;
+            return the pruned indices (the trail entry used to undo)."""
+            hit = np.concatenate([self.tuples_with[a] for a in self.domain_template[t_idx]["seq"]])
+            killed = np.unique(hit[alive[hit]])
+            alive[killed] = False
+            tally["pruned"] += len(killed)
+            return killed
+
+        def backtrack(depth, spent, current_att):
+            if depth == 7:
+                return assignment, spent
+            if depth > best["depth"]:
+                best.update(depth=depth, assign=assignment[:depth], spent=spent)
+            check_budget(deadline, cancel, progress)
+            tally["nodes"] += 1
+
+            day = depth
+            idx = np.flatnonzero(alive)
+            if len(idx) > SPATIAL_PRUNE_MIN:
+                idx = idx[self._in_reach(current_att)[self.tup_first[idx]]]
+            if not len(idx):
+                return None
+
+            # value ordering: nearest first attraction, template order on ties
+            travel_dist = self._row_from(current_att)[self.tup_first[idx]].astype(np.float64)
+            order = np.argsort(travel_dist, kind="stable")
+            idx, travel_dist = idx[order], travel_dist[order]
+
+            total_time_d = travel_dist / 50.0 + self.tup_time[idx]
+            total_cost_d = travel_dist * self.rate_km + self.tup_cost[idx]
+            feasible = (total_time_d <= self.T_day_max) & (spent + total_cost_d <= self.B_week_max)
+
+            for t_idx, cost_d in zip(idx[feasible].tolist(), total_cost_d[feasible].tolist()):
+                assignment[day] = t_idx
+                killed = forward_check(t_idx)
+                # every later day still needs at least one candidate
+                if depth == 6 or alive.any():
+                    result = backtrack(depth + 1, spent + cost_d, self.tup_last[t_idx])
                     if result:
                         return result
-
+                alive[killed] = True
                 assignment[day] = None
+                tally["backtracks"] += 1
 
             return None
 
-        result = backtrack(0, 0.0, set(), current_location)
+        result = None
+        try:
+            result = backtrack(0, 0.0, None)
+        except SearchInterrupted:
+            self.interrupted = True
+            if stats is not None:
+                stats.event("csp.interrupted")
+            if not best["assign"]:
+                return None
+            # best-so-far: the deepest partial assignment, remaining days empty
+            state = self._assignment_state(best["assign"], best["spent"])
+            state["approximate"] = True
+            return state
+        finally:
+            if stats is not None:
+                stats.add_time("csp.search", time.perf_counter() - started)
+                stats.add("csp.nodes", tally["nodes"])
+                stats.add("csp.backtracks", tally["backtracks"])
+                stats.add("csp.pruned", tally["pruned"])
+                stats.peak("csp.max_depth", 7 if result else best["depth"])
         if result:
-            assign, spent_total = result
-            itinerary = [tup["seq"] for tup in assign]
-            daily_time = [self._calculate_daily_time(tup, assign[i-1] if i > 0 else None) for i, tup in enumerate(assign)]
-            daily_distance = [self._calculate_daily_distance(tup, assign[i-1] if i > 0 else None) for i, tup in enumerate(assign)]
-            return {
-                "current_location": self.start_loc,
-                "itinerary": itinerary,
-                "curr_day": 7,
-                "total_cost": spent_total,
-                "total_time": sum(daily_time),
-                "daily_time": daily_time,
-                "daily_distance": daily_distance
-            }
+            assign_idx, spent_total = result
+            return self._assignment_state(assign_idx, spent_total)
         return None
 
+    def _assignment_state(self, assign_idx, spent_total):
+        """State dict for a (possibly partial) list of assigned tuple indices."""
+        assign = [self.domain_template[i] for i in assign_idx]
+        itinerary = [tup["seq"] for tup in assign]
+        daily_time = [self._calculate_daily_time(tup, assign[i-1] if i > 0 else None) for i, tup in enumerate(assign)]
+        daily_distance = [self._calculate_daily_distance(tup, assign[i-1] if i > 0 else None) for i, tup in enumerate(assign)]
+        missing = 7 - len(assign)
+        return {
+            "current_location": self.start_loc,
+            "itinerary": itinerary + [()] * missing,
+            "curr_day": 7,
+            "total_cost": spent_total,
+            "total_time": sum(daily_time),
+            "daily_time": daily_time + [0.0] * missing,
+            "daily_distance": daily_distance + [0.0] * missing
+        }
+
     def _calculate_daily_time(self, tup, prev_tup):
         if not tup["seq"]:
             return 0.0
-        start_loc = self.start_loc if prev_tup is None else self.coords[prev_tup["seq"][-1]]
-        travel_time = self._haversine(start_loc, self.coords[tup["seq"][0]]) / 50.0
+        row = self._row_from(None if prev_tup is None else prev_tup["seq"][-1])
+        travel_time = float(row[tup["seq"][0]]) / 50.0
         return travel_time + tup["time"]
 
     def _calculate_daily_distance(self, tup, prev_tup):
         if not tup["seq"]:
             return 0.0
-        start_loc = self.start_loc if prev_tup is None else self.coords[prev_tup["seq"][-1]]
-        travel_dist = self._haversine(start_loc, self.coords[tup["seq"][0]])
+        row = self._row_from(None if prev_tup is None else prev_tup["seq"][-1])
+        travel_dist = float(row[tup["seq"][0]])
         return travel_dist + tup["distance"]
 
-def csp_constructive_plan(problem: TourPlanningProblem, time_limit_sec: float = 10.0) -> Node:
+def csp_constructive_plan(problem: TourPlanningProblem, time_limit_sec: float = 10.0,
+                          cancel=None, seed: int = None, progress: SearchProgress = None,
+                          csp: TourCSP = None, stats: SolverStats = None) -> Node:
     """
     Build a feasible 7-day itinerary using the full CSP algorithm with time limiting.
-    Falls back to A* if CSP takes too long or fails to find a solution.
+    The deadline is enforced while the domain is built and inside the
+    backtracking loop; when it passes during the search, the best partial
+    assignment found so far is returned, marked approximate. Returns None
+    (so callers fall back to A*) when no assignment is found, including when
+    the deadline passes before the domain is complete.
     
     Args:
         problem: The tour planning problem instance
-        time_limit_sec: Maximum time to spend on CSP before falling back to A*
+        time_limit_sec: Wall-clock budget for building the domains and solving
+        cancel: Optional event; setting it stops the search cooperatively
+        seed: Optional seed for the domain sampling, for reproducible plans
+        progress: Optional SearchProgress for domain building and search
+        csp: Optional prebuilt TourCSP over the same attractions and
+            preferences; its domain is reused instead of rebuilt
+        stats: Optional SolverStats for domain building and search; a
+            failed CSP is recorded as a "csp.failed" or "csp.error" event
         
     Returns:
-        Node with complete itinerary or None if no solution found
+        Node with the itinerary (`node.approximate` set on timeout) or None
     """
-    start_time = time.time()
+    start_time = time.monotonic()
+    deadline = start_time + time_limit_sec
     
     try:
-        # Create CSP instance
-        csp = TourCSP(
-            start_location=problem.initial_state['current_location'],
-            attractions=problem.attractions,
-            constraints=problem.constraints,
-            user_prefs=problem.user_prefs
-        )
+        if csp is not None:
+            csp = csp.rebased(problem.initial_state['current_location'], problem.constraints)
+            if stats is not None:
+                stats.event("csp.domain_reused")
+        else:
+            if progress is not None:
+                progress.phase("csp-domains")
+            # Create CSP instance
+            csp = TourCSP(
+                start_location=problem.initial_state['current_location'],
+                attractions=None,
+                constraints=problem.constraints,
+                user_prefs=problem.user_prefs,
+                catalog=problem.catalog,
+                seed=seed,
+                stats=stats,
+                attraction_ids=problem.attraction_ids,
+                deadline=deadline,
+                cancel=cancel,
+                progress=progress
+            )
         
-        # Try CSP solve with time limit
-        csp_result = csp.solve()
+        csp_result = csp.solve(deadline=deadline, cancel=cancel, progress=progress, stats=stats)
         
-        if csp_result and (time.time() - start_time) < time_limit_sec:
+        if csp_result:
             # Convert CSP result to Node format
             node = Node(
                 state=csp_result,
@@ -1150,12 +2137,23 @@ def csp_constructive_plan(problem: TourPlanningProblem, time_limit_sec: float =
                 path_cost=csp_result['total_cost']
             )
             node.value = problem.value(csp_result)
+            node.approximate = csp_result.get('approximate', False)
             return node
         else:
-            # CSP took too long or failed, fall back to A*
-            print(f"CSP took too long or failed, falling back to A* after {time.time() - start_time:.2f}s")
+            # CSP failed (or ran out of time with nothing assigned), fall back to A*
+            if stats is not None:
+                stats.event("csp.failed")
+            logger.info("CSP took too long or failed after %.2fs", time.monotonic() - start_time)
             return None
-            
-    except Exception as e:
-        print(f"CSP failed with error: {e}, falling back to A*")
-        return None
\ No newline at end of file
+
+    except SearchInterrupted:
+        # the deadline passed (or the solve was cancelled) while the domain was being built
+        if stats is not None:
+            stats.event("csp.interrupted")
+        logger.info("CSP domain build interrupted after %.2fs", time.monotonic() - start_time)
+        return None
+    except Exception:
+        if stats is not None:
+            stats.event("csp.error")
+        logger.exception("CSP failed with an error")
+        return None
@@ -0,0 +1,159 @@
+"""
+Inverted indexes and pagination for the catalog listing endpoints
+"""
+
+import math
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Sequence, Tuple
+
+import numpy as np
+
+_EMPTY = np.empty(0, dtype=np.int64)
+
+
+def hotel_stars(hotel: Dict) -> float | None:
+    stars = hotel.get('avg_review')
+    if not isinstance(stars, (int, float)) or math.isnan(stars):
+        return None
+    return float(stars)
+
+
+def star_bucket(hotel: Dict) -> int | None:
+    """Whole-star bucket of a hotel's rating (4.5 -> 4), None when unrated."""
+    stars = hotel_stars(hotel)
+    return None if stars is None else int(math.floor(stars))
+
+
+class RecordIndex:
+    """
+    Inverted indexes over a list of records.
+
+    For every indexed field each distinct value maps to the sorted array of
+    record IDs (positions in `records`) that carry it, so filters are
+    answered by intersecting sorted ID arrays instead of scanning the
+    records. Each field also keeps a per-record value code, so facet counts
+    over any result set are a single `np.bincount`. `numeric` columns are
+    kept as float arrays (NaN when missing) for exact range checks.
+    """
+
+    def __init__(self, records: Sequence[Dict], fields: Mapping[str, Callable[[Dict], Any]],
+                 numeric: Mapping[str, Callable[[Dict], float | None]] | None = None):
+        self._init(records, {
+            column: np.array([np.nan if (v := key(r)) is None else float(v) for r in records], dtype=np.float64)
+            for column, key in (numeric or {}).items()
+        })
+        for field, key in fields.items():
+            keys = [key(r) for r in records]
+            values = sorted({k for k in keys if k is not None}, key=str)
+            code_of = {v: c for c, v in enumerate(values)}
+            self._add_field(field, values, np.array([code_of[k] if k is not None else -1 for k in keys],
+                                                    dtype=np.int64))
+
+    @classmethod
+    def from_codes(cls, records: Sequence[Dict], fields: Mapping[str, Tuple[List[Any], np.ndarray]],
+                   numeric: Mapping[str, np.ndarray] | None = None) -> 'RecordIndex':
+        """
+        Index over value codes computed elsewhere (e.g. a compiled catalog),
+        so `records` is never read and may be a lazy sequence. Each field
+        maps to its distinct values sorted by `str` and the per-record code
+        into them (-1 when missing); `numeric` columns are float arrays.
+        """
+        index = cls.__new__(cls)
+        index._init(records, dict(numeric or {}))
+        for field, (values, codes) in fields.items():
+            index._add_field(field, list(values), np.asarray(codes, dtype=np.int64))
+        return index
+
+    def _init(self, records: Sequence[Dict], numeric: Dict[str, np.ndarray]) -> None:
+        self.records = records
+        self.all_ids = np.arange(len(records), dtype=np.int64)
+        self.numeric: Dict[str, np.ndarray] = numeric
+        self._postings: Dict[str, Dict[Any, np.ndarray]] = {}
+        self._values: Dict[str, List[Any]] = {}
+        self._codes: Dict[str, np.ndarray] = {}
+        self.counts: Dict[str, Dict[Any, int]] = {}
+
+    def _add_field(self, field: str, values: List[Any], codes: np.ndarray) -> None:
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(values) + 1))
+        self._postings[field] = {v: order[bounds[c]:bounds[c + 1]] for c, v in enumerate(values)}
+        self._values[field] = values
+        self._codes[field] = codes
+        self.counts[field] = {v: len(self._postings[field][v]) for v in values}
+
+    def values(self, field: str) -> List[Any]:
+        """Distinct values of `field`, sorted."""
+        return self._values[field]
+
+    def ids_for(self, field: str, *values) -> np.ndarray:
+        """Sorted IDs whose `field` equals any of `values`."""
+        postings = self._postings[field]
+        arrays = [postings[v] for v in values if v in postings]
+        if not arrays:
+            return _EMPTY
+        if len(arrays) == 1:
+            return arrays[0]
+        return np.unique(np.concatenate(arrays))
+
+    def ids_in_range(self, field: str, low=None, high=None) -> np.ndarray:
+        """Sorted IDs whose (orderable) `field` value lies in [low, high]."""
+        wanted = [v for v in self._values[field]
+                  if (low is None or v >= low) and (high is None or v <= high)]
+        return self.ids_for(field, *wanted)
+
+    def filter_range(self, ids: np.ndarray, column: str, low=None, high=None) -> np.ndarray:
+        """Keep the IDs whose numeric `column` lies in [low, high] (order preserved)."""
+        values = self.numeric[column][ids]
+        mask = np.ones(len(ids), dtype=bool)
+        if low is not None:
+            mask &= values >= low
+        if high is not None:
+            mask &= values <= high
+        return ids[mask]
+
+    @staticmethod
+    def intersect(id_sets: Iterable[np.ndarray], universe: np.ndarray) -> np.ndarray:
+        """Intersect sorted ID arrays, smallest first; `universe` when there are none."""
+        result = None
+        for ids in sorted(id_sets, key=len):
+            result = ids if result is None else np.intersect1d(result, ids, assume_unique=True)
+            if not len(result):
+                break
+        return universe if result is None else result
+
+    def facet_counts(self, field: str, ids: np.ndarray) -> Dict[Any, int]:
+        """Value -> number of records in `ids` carrying it."""
+        codes = self._codes[field][ids]
+        counts = np.bincount(codes[codes >= 0], minlength=len(self._values[field]))
+        return {v: int(n) for v, n in zip(self._values[field], counts) if n}
+
+
+def paginate(ids: np.ndarray, limit: int | None = None, offset: int = 0,
+             after: int | None = None) -> Tuple[np.ndarray, int | None]:
+    """
+    Slice a sorted ID array into one page.
+
+    `after` (a cursor: the last ID of the previous page) takes precedence
+    over `offset`. Returns the page IDs and the cursor of the next page, or
+    None when this page reaches the end.
+    """
+    start = int(np.searchsorted(ids, after, side='right')) if after is not None else max(0, offset)
+    stop = len(ids) if not limit or limit <= 0 else min(len(ids), start + limit)
+    page = ids[start:stop]
+    next_cursor = int(page[-1]) if stop < len(ids) and len(page) else None
+    return page, next_cursor
+
+
+def attraction_index(attractions: Sequence[Dict]) -> RecordIndex:
+    return RecordIndex(attractions, {
+        'city': lambda a: a.get('city'),
+        'wilaya': lambda a: a.get('wilaya'),
+        'category': lambda a: a.get('category', 'Unknown'),
+    })
+
+
+def hotel_query_index(hotels: Sequence[Dict]) -> RecordIndex:
+    return RecordIndex(hotels, {
+        'city': lambda h: h.get('city') or None,
+        'wilaya': lambda h: h.get('wilaya'),
+        'stars': star_bucket,
+    }, numeric={'avg_review': hotel_stars})
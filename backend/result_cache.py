@@ -0,0 +1,145 @@
+"""
+Result cache for itinerary generation
+
+Requests that differ only in the order of their activities, a few metres
+of start location or a few DZD of budget are mapped to one canonical
+request, solved once, and served from an LRU/TTL cache afterwards.
+"""
+
+import hashlib
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Tuple
+
+# Start locations are snapped to this grid (degrees, ~1 km)
+LOCATION_GRID_DEG = 0.01
+# Budgets are rounded down to a multiple of this (DZD)
+BUDGET_STEP_DZD = 100.0
+
+RESULT_CACHE_SIZE = int(os.environ.get('RESULT_CACHE_SIZE', 256))
+RESULT_CACHE_TTL_SEC = float(os.environ.get('RESULT_CACHE_TTL_SEC', 600.0))
+
+
+def canonicalize_spec(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Return the canonical form of a solver spec.
+
+    Activities are de-duplicated and sorted, the start location is snapped
+    to `LOCATION_GRID_DEG` and the budget is rounded *down* to
+    `BUDGET_STEP_DZD`. The canonical spec is what gets solved, so a cached
+    plan never exceeds the budget of any request that maps onto it.
+    """
+    activities = sorted(set(spec['activities']))
+    lat, lon = spec['start_location']
+    start_location = (round(round(lat / LOCATION_GRID_DEG) * LOCATION_GRID_DEG, 6),
+                      round(round(lon / LOCATION_GRID_DEG) * LOCATION_GRID_DEG, 6))
+    constraints = dict(spec['constraints'])
+    constraints['max_total_budget'] = math.floor(constraints['max_total_budget'] / BUDGET_STEP_DZD) * BUDGET_STEP_DZD
+    user_prefs = dict(spec['user_prefs'], categories=activities)
+    return dict(spec, activities=activities, start_location=start_location,
+                constraints=constraints, user_prefs=user_prefs)
+
+
+def cache_key(spec: Dict[str, Any]) -> Tuple:
+    """Hashable key of a canonical spec; only fields that change the plan are included."""
+    key = (
+        spec['algorithm'],
+        tuple(spec['activities']),
+        tuple(spec['start_location']),
+        tuple(sorted(spec['constraints'].items())),
+    )
+    if spec['algorithm'] == 'beam':
+        key += (spec['beam_width'], spec['max_nodes'])
+    elif spec['algorithm'] == 'anneal':
+        # the plan found depends on how long the search runs
+        key += (spec['time_limit'], spec.get('max_iterations'))
+    return key
+
+
+def shared_key(spec: Dict[str, Any]) -> Tuple:
+    """
+    Key of everything in a canonical spec except the start location and budget.
+
+    Requests with equal shared keys plan over the same attractions with the
+    same preferences, so they can share one planning problem and CSP domain.
+    """
+    constraints = tuple(sorted((k, v) for k, v in spec['constraints'].items() if k != 'max_total_budget'))
+    key = (spec['algorithm'], tuple(spec['activities']), constraints)
+    if spec['algorithm'] == 'beam':
+        key += (spec['beam_width'], spec['max_nodes'])
+    elif spec['algorithm'] == 'anneal':
+        # the plan found depends on how long the search runs
+        key += (spec['time_limit'], spec.get('max_iterations'))
+    return key
+
+
+def seed_for(key: Hashable) -> int:
+    """Stable 63-bit seed derived from a cache key (same across processes and restarts)."""
+    digest = hashlib.blake2b(repr(key).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') >> 1
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache with a per-entry TTL, bound to one dataset version.
+
+    Passing a different `version` to `get`/`put` drops every entry, so
+    results computed against an old dataset are never served.
+    """
+
+    def __init__(self, maxsize: int = RESULT_CACHE_SIZE, ttl: float = RESULT_CACHE_TTL_SEC):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version = None
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _check_version(self, version) -> None:
+        if version != self.version:
+            self._entries.clear()
+            self.version = version
+
+    def get(self, key: Hashable, version) -> Any:
+        """Return the cached value or None (counted as a miss)."""
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any, version) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
@@ -0,0 +1,614 @@
+"""
+Out-of-process execution of the itinerary solvers
+
+The searches in itinerary_planner.py are CPU-bound and hold the GIL, so
+running them in the Flask request thread stalls every other request the
+worker serves. `SolverPool` keeps a set of pre-warmed worker processes that
+each hold the attraction catalog; the request thread only ships a small
+request spec and waits on a pipe (GIL released) for the resulting state.
+
+The distance matrix, by far the largest piece of catalog data, is placed in
+a `multiprocessing.shared_memory` block once per catalog version and mapped
+by every worker; the parent's catalog switches to the same block, so there
+is a single copy. A catalog loaded from a compiled catalog file is mapped by
+the workers from that same file; otherwise the attraction records are sent
+once per worker at start up. Nothing catalog-sized is sent per task.
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+from multiprocessing import get_context, parent_process
+from multiprocessing.shared_memory import SharedMemory
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+from catalog import AttractionCatalog, check_distance_matrix
+from compiled_catalog import open_catalog
+from itinerary_planner import (
+    Node,
+    PlanState,
+    SearchInterrupted,
+    SearchProgress,
+    SolverStats,
+    TourCSP,
+    TourPlanningProblem,
+    a_star_search,
+    anneal_search,
+    beam_search,
+    create_initial_state,
+    csp_constructive_plan,
+)
+
+logger = logging.getLogger(__name__)
+
+# Number of solver processes; 0 runs solves inline in the request thread
+SOLVER_WORKERS = int(os.environ.get('SOLVER_WORKERS', min(4, os.cpu_count() or 1)))
+# Requests allowed to wait for a free worker before new ones are rejected
+SOLVER_MAX_QUEUE = int(os.environ.get('SOLVER_MAX_QUEUE', 32))
+# Hard limit for solves without their own deadline (A* mode)
+SOLVER_TIMEOUT_SEC = float(os.environ.get('SOLVER_TIMEOUT_SEC', 60.0))
+# Extra time a deadline-aware solver gets to return its best-so-far before it is killed
+SOLVER_GRACE_SEC = float(os.environ.get('SOLVER_GRACE_SEC', 2.0))
+# Most requests accepted in one batch
+SOLVER_BATCH_MAX = int(os.environ.get('SOLVER_BATCH_MAX', 50))
+# Algorithms whose solve is bounded by the spec's time_limit
+DEADLINE_ALGORITHMS = ('csp', 'beam', 'anneal')
+
+
+class _SharedBlock(SharedMemory):
+    """
+    SharedMemory whose close() leaves the mapping alone while arrays still view it.
+
+    The parent's catalog keeps using the distance block after its pool is
+    replaced; the mapping is then released with the last such array.
+    """
+
+    def close(self) -> None:
+        try:
+            super().close()
+        except BufferError:
+            pass
+
+
+class PoolBusy(RuntimeError):
+    """Raised when the wait queue for solver workers is full."""
+
+
+class SolveTimeout(TimeoutError):
+    """Raised when a solve did not finish in time and its worker was killed."""
+
+
+# -------- Solving (shared by the workers and the inline path) --------
+
+def build_problem(catalog: AttractionCatalog, spec: Dict[str, Any]) -> TourPlanningProblem:
+    """Build the planning problem described by a request spec."""
+    activities = spec['activities']
+    ids = np.flatnonzero(catalog.category_mask(activities)) if activities else np.arange(len(catalog))
+    initial_state = create_initial_state(tuple(spec['start_location']), spec['user_prefs'])
+    return TourPlanningProblem(initial_state, None, spec['user_prefs'],
+                               spec['constraints'], catalog=catalog, attraction_ids=ids)
+
+
+def rebase_problem(problem: TourPlanningProblem, spec: Dict[str, Any]) -> TourPlanningProblem:
+    """Problem for `spec` derived from one built for a spec with the same `shared_key`."""
+    initial_state = create_initial_state(tuple(spec['start_location']), spec['user_prefs'])
+    return problem.rebased(initial_state, spec['constraints'])
+
+
+def build_csp(problem: TourPlanningProblem, spec: Dict[str, Any], deadline: float = None,
+              cancel=None) -> TourCSP:
+    """Build the CSP (pool and domain template) for `problem`, within `deadline`."""
+    return TourCSP(
+        start_location=problem.initial_state['current_location'],
+        attractions=None,
+        constraints=problem.constraints,
+        user_prefs=problem.user_prefs,
+        catalog=problem.catalog,
+        seed=spec.get('seed'),
+        attraction_ids=problem.attraction_ids,
+        deadline=deadline,
+        cancel=cancel,
+    )
+
+
+def run_solver(problem: TourPlanningProblem, spec: Dict[str, Any], deadline: float = None,
+               cancel=None, progress: SearchProgress = None, csp: TourCSP = None,
+               stats: SolverStats = None) -> Node:
+    """
+    Run the algorithm selected in `spec` on `problem`.
+
+    "beam" runs beam search alone; "anneal" runs simulated annealing from a
+    greedy seed until the deadline (or `max_iterations` moves); "csp" tries
+    the constructive CSP first and falls back to A* (within the same
+    deadline, recorded as a "fallback.astar" event); anything else runs A*.
+    `cancel`, `progress` and `stats` are handed to the solvers; `csp` is a
+    prebuilt CSP whose domain is reused (see `csp_constructive_plan`).
+    """
+    algorithm = spec['algorithm']
+    if algorithm == 'beam':
+        # bounded memory/latency mode: no A* fallback
+        return beam_search(problem, beam_width=spec['beam_width'], max_nodes=spec['max_nodes'],
+                           deadline=deadline, cancel=cancel, progress=progress, stats=stats)
+    if algorithm == 'anneal':
+        # fixed latency mode: searches until the deadline, no A* fallback
+        return anneal_search(problem, deadline=deadline, seed=spec.get('seed'),
+                             max_iterations=spec.get('max_iterations'), cancel=cancel,
+                             progress=progress, stats=stats)
+
+    goal_node = None
+    if algorithm == 'csp':
+        try:
+            time_limit = spec['time_limit'] if deadline is None else max(0.0, deadline - time.monotonic())
+            goal_node = csp_constructive_plan(problem, time_limit_sec=time_limit, cancel=cancel,
+                                              seed=spec.get('seed'), progress=progress, csp=csp, stats=stats)
+            if goal_node is None:
+                logger.info('CSP failed to find solution, falling back to A*')
+        except Exception:
+            logger.exception('CSP failed with exception; falling back to A*')
+        if goal_node is None and stats is not None:
+            stats.event('fallback.astar')
+
+    if goal_node is None:
+        logger.info('Using A* search as fallback')
+        goal_node = a_star_search(problem, deadline=deadline, cancel=cancel, progress=progress, stats=stats)
+    return goal_node
+
+
+def _solve_spec(catalog: AttractionCatalog, spec: Dict[str, Any], conn) -> Dict[str, Any] | None:
+    remaining = spec.get('remaining_sec')
+    deadline = time.monotonic() + remaining if remaining is not None else None
+    progress = None
+    if spec.get('report_progress'):
+        progress = SearchProgress(lambda info: conn.send(('progress', info)))
+    stats = SolverStats() if spec.get('collect_stats') else None
+    node = run_solver(build_problem(catalog, spec), spec, deadline, _PipeCancel(conn), progress, stats=stats)
+    result = None if node is None else {'state': node.state.to_dict(), 'approximate': bool(node.approximate)}
+    if stats is not None:
+        # stats travel back even when no plan was found
+        return {'result': result, 'stats': stats.to_dict()}
+    return result
+
+
+def solve_group(catalog: AttractionCatalog, specs: List[Dict[str, Any]], on_item: Callable,
+                problems: List[TourPlanningProblem] = None, cancel=None) -> None:
+    """
+    Solve specs that share one `shared_key` one after another.
+
+    The planning problem and, in CSP mode, the CSP domain are built for the
+    first spec and rebased onto the start location and budget of the others.
+    Each spec gets its own `time_limit`, counted from when its solve starts.
+    `on_item(i, node, error)` is called as soon as spec `i` is done; a
+    failure of one spec does not stop the rest.
+    """
+    base = csp = None
+    for i, spec in enumerate(specs):
+        try:
+            if problems is not None:
+                problem = problems[i]
+            elif base is None:
+                problem = base = build_problem(catalog, spec)
+            else:
+                problem = rebase_problem(base, spec)
+            deadline = time.monotonic() + spec['time_limit'] if spec['algorithm'] in DEADLINE_ALGORITHMS else None
+            if spec['algorithm'] == 'csp' and csp is None:
+                try:
+                    csp = build_csp(problem, spec, deadline, cancel)
+                except SearchInterrupted:
+                    logger.info('Building the shared CSP domain ran out of time')
+                except Exception:
+                    # csp_constructive_plan retries per spec and falls back to A*
+                    logger.exception('Building the shared CSP domain failed')
+            node = run_solver(problem, spec, deadline, cancel, csp=csp)
+        except Exception as e:
+            logger.exception('Batch item %d failed', i)
+            on_item(i, None, e)
+        else:
+            on_item(i, node, None)
+
+
+def _solve_batch(catalog: AttractionCatalog, message: Dict[str, Any], conn) -> None:
+    def send_item(i, node, error):
+        result = None if node is None else {'state': node.state.to_dict(), 'approximate': bool(node.approximate)}
+        conn.send(('item', (i, result, None if error is None else f'{type(error).__name__}: {error}')))
+
+    solve_group(catalog, message['batch'], send_item, cancel=_PipeCancel(conn))
+
+
+def _node_from_result(result: Dict[str, Any] | None) -> Node:
+    if result is None:
+        return None
+    node = Node(PlanState.from_dict(result['state']))
+    node.approximate = result['approximate']
+    return node
+
+
+# -------- Worker process --------
+
+class _PipeCancel:
+    """Event-like view of 'cancel' messages the parent sends while a solve runs."""
+    __slots__ = ('conn', 'calls', 'cancelled')
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.calls = 0
+        self.cancelled = False
+
+    def is_set(self) -> bool:
+        self.calls += 1
+        # polling the pipe is a syscall, so only every 64 search nodes
+        if not self.cancelled and self.calls & 63 == 0 and self.conn.poll():
+            self.cancelled = self.conn.recv() == 'cancel'
+        return self.cancelled
+
+
+def _worker_main(conn, data: List[Dict] | str, version: int, shm_name: str) -> None:
+    """
+    Worker loop: attach the shared catalog data, then solve specs until told to stop.
+
+    `data` is either the attraction records or the path of the compiled
+    catalog file they were loaded from.
+    """
+    if isinstance(data, str):
+        catalog = open_catalog(data).attraction_catalog()
+        if catalog.version != version:
+            raise RuntimeError(f'{data} no longer holds catalog version {version}')
+    else:
+        catalog = AttractionCatalog(data, version=version)
+    n = len(catalog)
+    # Spawned workers share the parent's resource tracker, which owns the block
+    shm = SharedMemory(name=shm_name)
+    catalog.use_distances(np.ndarray((n, n), dtype=np.float32, buffer=shm.buf))
+
+    while True:
+        try:
+            spec = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if spec is None:
+            break
+        if spec == 'cancel':
+            continue  # arrived after its solve had already finished
+        try:
+            if 'batch' in spec:
+                _solve_batch(catalog, spec, conn)
+                conn.send(('ok', None))
+            else:
+                conn.send(('ok', _solve_spec(catalog, spec, conn)))
+        except Exception as e:
+            logger.exception('Solver worker failed')
+            conn.send(('error', f'{type(e).__name__}: {e}'))
+
+
+class _Worker:
+    __slots__ = ('process', 'conn')
+
+    def __init__(self, ctx, data, version, shm_name):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn, data, version, shm_name),
+                                   name='solver-worker', daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def stop(self, kill: bool = False) -> None:
+        if kill:
+            self.process.kill()
+        else:
+            try:
+                self.conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        self.process.join(timeout=1.0)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class SolverPool:
+    """
+    Fixed-size pool of pre-warmed solver processes for one catalog version.
+
+    A request borrows an idle worker (waiting in a bounded queue if none is
+    free), sends its spec and waits for the result up to a timeout. A worker
+    that overruns is killed and replaced, so one runaway search cannot pin a
+    CPU or a worker slot. A catalog whose distance matrix would exceed
+    MAX_DISTANCE_MATRIX_MB raises CatalogTooLarge before anything is allocated.
+    """
+
+    def __init__(self, catalog: AttractionCatalog, workers: int = SOLVER_WORKERS,
+                 max_queue: int = SOLVER_MAX_QUEUE):
+        self.version = catalog.version
+        self.max_queue = max_queue
+        self._ctx = get_context('spawn')  # fork is unsafe in a threaded server
+        # workers map a compiled catalog themselves instead of unpickling the records
+        self._data = catalog.source if catalog.source is not None else catalog.records
+
+        # fail before building or copying the matrix rather than running out of memory
+        check_distance_matrix(len(catalog))
+        matrix = catalog.distances.matrix
+        self._shm = _SharedBlock(create=True, size=max(1, matrix.nbytes))
+        # frombuffer holds an export of the mapping, so the view stays valid after close()
+        shared = np.frombuffer(self._shm.buf, dtype=np.float32, count=matrix.size).reshape(matrix.shape)
+        shared[:] = matrix
+        # the parent switches to the shared block too, so the matrix exists once in RAM
+        catalog.use_distances(shared)
+        del matrix
+
+        self._cond = threading.Condition()
+        self._idle: List[_Worker] = [self._spawn() for _ in range(max(1, workers))]
+        self.size = len(self._idle)
+        self._waiting = 0
+        self._closed = False
+        self.completed = 0
+        self.killed = 0
+
+    def _spawn(self) -> _Worker:
+        return _Worker(self._ctx, self._data, self.version, self._shm.name)
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                'workers': self.size,
+                'busy': self.size - len(self._idle),
+                'queued': self._waiting,
+                'completed': self.completed,
+                'killed': self.killed,
+            }
+
+    def _acquire(self, timeout: float) -> _Worker:
+        end = time.monotonic() + timeout
+        with self._cond:
+            if self._closed:
+                raise PoolBusy('solver pool is shutting down')
+            if not self._idle and self._waiting >= self.max_queue:
+                raise PoolBusy(f'{self._waiting} solves already queued')
+            self._waiting += 1
+            try:
+                while not self._idle:
+                    remaining = end - time.monotonic()
+                    if remaining <= 0 or not self._cond.wait(remaining):
+                        if not self._idle:
+                            raise SolveTimeout('timed out waiting for a free solver worker')
+                return self._idle.pop()
+            finally:
+                self._waiting -= 1
+
+    def _release(self, worker: _Worker) -> None:
+        with self._cond:
+            if self._closed:
+                worker.stop()
+                return
+            self._idle.append(worker)
+            self._cond.notify()
+
+    def solve(self, spec: Dict[str, Any], timeout: float, deadline: float = None,
+              cancel=None, on_progress=None, stats: SolverStats = None) -> Node:
+        """
+        Solve `spec` in a worker process.
+
+        Args:
+            spec: Request spec (see `solve_plan`).
+            timeout: Seconds to wait, queueing included, before the solve is
+                abandoned and its worker killed.
+            deadline: Optional `time.monotonic()` limit for the search itself;
+                the worker gets whatever is left of it once dequeued.
+            cancel: Optional event; once set, the worker is asked to stop and
+                return its best-so-far plan.
+            on_progress: Optional callback for the worker's progress reports.
+            stats: Optional SolverStats receiving the worker's solver stats
+                and the time spent waiting for a free worker ("pool.queue").
+
+        Returns:
+            Node: Goal (or approximate) node, or None if no plan exists.
+        """
+        asked = time.perf_counter()
+
+        def message():
+            # called once a worker is free
+            if stats is not None:
+                stats.add_time('pool.queue', time.perf_counter() - asked)
+            remaining = max(0.0, deadline - time.monotonic()) if deadline is not None else None
+            return dict(spec, remaining_sec=remaining, report_progress=on_progress is not None,
+                        collect_stats=stats is not None)
+
+        result = self._exchange(message, timeout, cancel, {'progress': on_progress})
+        if stats is not None:
+            stats.merge(result['stats'])
+            result = result['result']
+        return _node_from_result(result)
+
+    def solve_batch(self, specs: List[Dict[str, Any]], timeout: float, on_item: Callable) -> None:
+        """
+        Solve specs sharing one `shared_key` in a single worker (see `solve_group`).
+
+        `on_item(i, node, error)` is called as each spec finishes, so a
+        timeout only loses the specs that had not finished yet.
+        """
+        def item(payload):
+            i, result, error = payload
+            on_item(i, _node_from_result(result), RuntimeError(error) if error else None)
+
+        self._exchange(lambda: {'batch': specs}, timeout, None, {'item': item})
+
+    def _exchange(self, message: Callable, timeout: float, cancel,
+                  handlers: Dict[str, Callable]) -> Any:
+        """
+        Send `message()` to an idle worker and wait for its final reply.
+
+        Intermediate replies are passed to `handlers[status]`.
+        """
+        end = time.monotonic() + timeout
+        worker = self._acquire(timeout)
+        try:
+            worker.conn.send(message())
+            cancel_sent = False
+            while True:
+                wait = end - time.monotonic()
+                if wait <= 0:
+                    raise SolveTimeout(f'solve exceeded {timeout:.1f}s')
+                if cancel is not None:
+                    wait = min(wait, 0.05)
+                if worker.conn.poll(wait):
+                    status, payload = worker.conn.recv()
+                    if status not in handlers:
+                        break
+                    if handlers[status] is not None:
+                        handlers[status](payload)
+                elif cancel is not None and not cancel_sent and cancel.is_set():
+                    worker.conn.send('cancel')
+                    cancel_sent = True
+        except (SolveTimeout, EOFError, OSError) as e:
+            logger.warning('Killing solver worker pid=%s: %s', worker.process.pid, e)
+            worker.stop(kill=True)
+            with self._cond:
+                self.killed += 1
+            worker = None if self._closed else self._spawn()
+            if isinstance(e, SolveTimeout):
+                raise
+            raise RuntimeError('solver worker died') from e
+        finally:
+            if worker is not None:
+                self._release(worker)
+
+        with self._cond:
+            self.completed += 1
+        if status == 'error':
+            raise RuntimeError(payload)
+        return payload
+
+    def close(self) -> None:
+        """Stop idle workers now (busy ones when they return) and free the shared block."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for worker in idle:
+            worker.stop()
+        # Workers keep their mapping after unlink, so in-flight solves are unaffected
+        self._shm.close()
+        self._shm.unlink()
+
+
+_POOL: SolverPool | None = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_pool(catalog: AttractionCatalog) -> SolverPool | None:
+    """
+    Return the pool serving `catalog`, starting (or replacing) it if needed.
+
+    Returns None when pooling is disabled (SOLVER_WORKERS=0) or when called
+    inside a worker process, in which case callers solve inline.
+    """
+    global _POOL
+    if SOLVER_WORKERS <= 0 or parent_process() is not None:
+        return None
+    with _POOL_LOCK:
+        if _POOL is None or _POOL.version != catalog.version:
+            old, _POOL = _POOL, SolverPool(catalog)
+            if old is not None:
+                old.close()
+            logger.info('Started %d solver workers for catalog %x', _POOL.size, catalog.version)
+        return _POOL
+
+
+def pool_stats() -> Dict[str, int]:
+    pool = _POOL
+    return pool.stats() if pool is not None else {'workers': 0, 'busy': 0, 'queued': 0}
+
+
+@atexit.register
+def _shutdown() -> None:
+    if _POOL is not None:
+        _POOL.close()
+
+
+def solve_plan(catalog: AttractionCatalog, spec: Dict[str, Any],
+               problem: TourPlanningProblem = None, cancel=None, on_progress=None,
+               stats: SolverStats = None) -> Node:
+    """
+    Solve an itinerary request, in the worker pool when it is enabled.
+
+    `spec` holds plain data only: start_location, user_prefs, constraints,
+    activities, algorithm, time_limit, beam_width, max_nodes, max_iterations
+    and an optional seed for the CSP domain sampling and annealing moves.
+    Solves with a deadline (`DEADLINE_ALGORITHMS`) are killed
+    `SOLVER_GRACE_SEC` after it; A* solves after `SOLVER_TIMEOUT_SEC`. Setting `cancel` stops the search
+    early (it then returns its best-so-far plan); `on_progress` receives
+    {"phase", "nodes", "elapsed"} reports while it runs; `stats` receives
+    the solver's timings and counters, from the worker when pooled.
+
+    Raises:
+        PoolBusy: Too many solves are already queued.
+        SolveTimeout: The solve overran and was killed.
+    """
+    # In CSP mode the time limit bounds the whole solve, A* fallback included;
+    # in anneal mode the search runs until it
+    deadline = time.monotonic() + spec['time_limit'] if spec['algorithm'] in DEADLINE_ALGORITHMS else None
+    pool = get_pool(catalog)
+    if pool is None:
+        progress = SearchProgress(on_progress) if on_progress is not None else None
+        return run_solver(problem or build_problem(catalog, spec), spec, deadline, cancel, progress, stats=stats)
+
+    timeout = spec['time_limit'] + SOLVER_GRACE_SEC if deadline is not None else SOLVER_TIMEOUT_SEC
+    return pool.solve(spec, timeout, deadline, cancel=cancel, on_progress=on_progress, stats=stats)
+
+
+def _spec_timeout(spec: Dict[str, Any]) -> float:
+    return spec['time_limit'] + SOLVER_GRACE_SEC if spec['algorithm'] in DEADLINE_ALGORITHMS else SOLVER_TIMEOUT_SEC
+
+
+def solve_batch(catalog: AttractionCatalog, groups: List[List[Dict[str, Any]]],
+                problems: List[List[TourPlanningProblem]] = None) -> List[List[Tuple[Node, Exception]]]:
+    """
+    Solve groups of specs, each group sharing one `shared_key`.
+
+    With the worker pool, every group is split into contiguous chunks so the
+    batch spreads over all workers; each chunk builds the shared structures
+    once (see `solve_group`) and chunks run in parallel. Inline, groups are
+    solved one after another on the given `problems`.
+
+    Returns:
+        Per group, per spec: (node, None) or (None, error). Errors are
+        PoolBusy, SolveTimeout or RuntimeError.
+    """
+    pending = (None, None)
+    outcomes = [[pending] * len(group) for group in groups]
+
+    def recorder(g: int, offset: int = 0):
+        def on_item(i, node, error):
+            outcomes[g][offset + i] = (node, error)
+        return on_item
+
+    pool = get_pool(catalog)
+    if pool is None:
+        for g, group in enumerate(groups):
+            solve_group(catalog, group, recorder(g), problems[g] if problems is not None else None)
+        return outcomes
+
+    total = sum(len(group) for group in groups)
+    if not total:
+        return outcomes
+    chunks = []
+    for g, group in enumerate(groups):
+        n_chunks = min(len(group), max(1, round(pool.size * len(group) / total)))
+        size = -(-len(group) // n_chunks)
+        chunks.extend((g, start, group[start:start + size]) for start in range(0, len(group), size))
+
+    def run(chunk):
+        g, start, specs = chunk
+        try:
+            pool.solve_batch(specs, sum(_spec_timeout(spec) for spec in specs), recorder(g, start))
+        except (PoolBusy, SolveTimeout, RuntimeError) as e:
+            for i in range(start, start + len(specs)):
+                if outcomes[g][i] is pending:
+                    outcomes[g][i] = (None, e)
+
+    with ThreadPoolExecutor(max_workers=min(len(chunks), pool.size), thread_name_prefix='batch-solve') as executor:
+        list(executor.map(run, chunks))
+    return outcomes
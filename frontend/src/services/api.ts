@@ -76,25 +76,46 @@ export interface ItineraryResponse {
   days: DayPlan[];
 }
 
-export interface AttractionsResponse {
-  success: boolean;
+export interface ItineraryProgress {
+  phase: string;
+  nodes: number;
+  elapsed: number;
+}
+
+export type ItineraryStreamEvent =
+  | { event: 'accepted'; algorithm: string }
+  | ({ event: 'progress' } & ItineraryProgress)
+  | { event: 'day'; day: DayPlan }
+  | { event: 'done'; data: Omit<ItineraryResponse, 'days'> }
+  | { event: 'error'; success: false; error: string; status: number };
+
+export interface PageInfo {
   count: number;
+  total?: number;
+  offset?: number;
+  nextCursor?: string | null;
+  facets?: Record<string, Record<string, number>>;
+}
+
+export interface AttractionsResponse extends PageInfo {
+  success: boolean;
   attractions: Attraction[];
 }
 
 export interface CategoriesResponse {
   success: boolean;
   categories: string[];
+  counts?: Record<string, number>;
 }
 
 export interface WilayasResponse {
   success: boolean;
   wilayas: string[];
+  counts?: Record<string, number>;
 }
 
-export interface HotelsResponse {
+export interface HotelsResponse extends PageInfo {
   success: boolean;
-  count: number;
   hotels: Hotel[];
 }
 
@@ -119,15 +140,20 @@ export interface ItineraryRequest {
   hasCar?: boolean;
 }
 
-export interface AttractionsRequest {
+export interface PageRequest {
+  limit?: number;
+  offset?: number;
+  cursor?: string;
+  facets?: boolean;
+}
+
+export interface AttractionsRequest extends PageRequest {
   wilaya?: string;
   category?: string;
-  limit?: number;
 }
 
-export interface HotelsRequest {
+export interface HotelsRequest extends PageRequest {
   wilaya?: string;
-  limit?: number;
   min_stars?: number;
   max_stars?: number;
 }
@@ -178,7 +204,17 @@ export async function checkHealth(): Promise<HealthResponse> {
 }
 
 /**
- * Get attractions with optional filtering
+ * Add limit/offset/cursor/facets query parameters for paginated listings
+ */
+function appendPageParams(searchParams: URLSearchParams, params: PageRequest): void {
+  if (params.limit) searchParams.append('limit', params.limit.toString());
+  if (params.offset) searchParams.append('offset', params.offset.toString());
+  if (params.cursor) searchParams.append('cursor', params.cursor);
+  if (params.facets) searchParams.append('facets', 'true');
+}
+
+/**
+ * Get attractions with optional filtering and pagination
  */
 export async function getAttractions(
   params: AttractionsRequest = {}
@@ -187,7 +223,7 @@ export async function getAttractions(
   
   if (params.wilaya) searchParams.append('wilaya', params.wilaya);
   if (params.category) searchParams.append('category', params.category);
-  if (params.limit) searchParams.append('limit', params.limit.toString());
+  appendPageParams(searchParams, params);
 
   const queryString = searchParams.toString();
   const endpoint = queryString ? `/api/attractions?${queryString}` : '/api/attractions';
@@ -217,7 +253,7 @@ export async function getCities(): Promise<WilayasResponse> {
 }
 
 /**
- * Get hotels with optional filtering
+ * Get hotels with optional filtering and pagination
  */
 export async function getHotels(
   params: HotelsRequest = {}
@@ -225,7 +261,7 @@ export async function getHotels(
   const searchParams = new URLSearchParams();
   
   if (params.wilaya) searchParams.append('wilaya', params.wilaya);
-  if (params.limit) searchParams.append('limit', params.limit.toString());
+  appendPageParams(searchParams, params);
   if (params.min_stars) searchParams.append('min_stars', params.min_stars.toString());
   if (params.max_stars) searchParams.append('max_stars', params.max_stars.toString());
 
@@ -247,6 +283,51 @@ export async function generateItinerary(
   });
 }
 
+/**
+ * Generate an itinerary through the streaming endpoint, calling `onEvent`
+ * for every progress/day event. Aborting `signal` cancels the solve.
+ */
+export async function generateItineraryStream(
+  request: ItineraryRequest,
+  onEvent: (event: ItineraryStreamEvent) => void,
+  signal?: AbortSignal
+): Promise<{ data: ItineraryResponse }> {
+  const response = await fetch(`${API_BASE_URL}/api/itinerary/generate-stream`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(request),
+    signal,
+  });
+
+  if (!response.ok || !response.body) {
+    const errorData = await response.json().catch(() => ({}));
+    throw new Error(errorData.error || `HTTP error! status: ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  const days: DayPlan[] = [];
+  let buffer = '';
+
+  for (;;) {
+    const { done, value } = await reader.read();
+    buffer += decoder.decode(value, { stream: !done });
+    const lines = buffer.split('\n');
+    buffer = done ? '' : lines.pop() ?? '';
+
+    for (const line of lines) {
+      if (!line.trim()) continue;
+      const event = JSON.parse(line) as ItineraryStreamEvent;
+      onEvent(event);
+      if (event.event === 'day') days.push(event.day);
+      if (event.event === 'error') throw new Error(event.error);
+      if (event.event === 'done') return { data: { ...event.data, days } };
+    }
+    if (done) break;
+  }
+  throw new Error('The itinerary stream ended unexpectedly');
+}
+
 /**
  * Utility function to validate GPS coordinates
  */